@@ -0,0 +1,351 @@
+"""A simple bot for the solitaire game
+
+Functions:
+    weight_move(game, move): ranks a move, lower is better
+    shuffle_hidden(state, rng, recycles): deals the cards of a snapshot()
+        the player has not seen again
+Classes:
+    AutoMove: makes the best ranked move each time it is called
+    GreedyMove: like AutoMove, but weights every move afresh
+    LookaheadMove: plays out every move before choosing one, within a
+        node or time budget
+"""
+import math
+import random
+from timeit import default_timer as timer
+
+
+def weight_move(game, move):
+    """Takes a move and weights it according to how productive the move will be, lower weight holds higher precedence
+    Weights:
+    0: move card to foundation
+    1: move card from waste to tableau
+    2: move whole pile from tableau to tableau
+    3: move partial pile from tableau to tableau
+    4: move card from foundation to tableau
+    5: deal cards from deck to waste
+    99: lowest precedence to prevent pile switching loop
+    Returns (int): precedence
+
+    Args:
+        game (Solitaire): The game currently being played
+        move (tuple): (from pile, destination pile)
+    """
+    # move home
+    if move[1] in game.homes:
+        return 0
+    # move from home
+    elif move[0] in game.homes:
+        return 5
+    # deal from deck
+    elif move[1] is game.deck:
+        return 4
+    # move from waste
+    elif move[0] is game.deck:
+        return 1
+    # top king to empty pile
+    elif len(move[1]) == 0 and move[0].flip == 0:
+        return 99
+    # full pile
+    elif len(move[1]) == 0 or move[1][-1].value - 1 == move[0][move[0].flip].value:
+        return 2
+    # partial pile
+    else:
+        return 3
+
+
+class AutoMove(object):
+    """A bot that plays one move at a time, always picking the move with
+    the lowest weight_move() weight.  Moves that are still valid are
+    remembered between calls so a move that undoes the last move can be
+    pushed to the back of the queue.  Only moves from or to the piles that
+    changed since the last call are looked at again, the others are known
+    to be as valid as they were
+    """
+    def __init__(self):
+        self.moves = {}
+        self.best_move = None
+        self.first_cycle = None
+        self.game = None
+        self.version = 0
+        # The moves in moves from or to each pile number
+        self.touching = [set() for _ in range(12)]
+
+    def __call__(self, game):
+        """Makes one valid move
+        Return True if a move was performed
+
+        Args:
+            game (Solitaire): The game where the cards will be moved
+        """
+        if game is not self.game:
+            self.game = game
+            self.version = 0
+        changed = game.changed_piles(self.version)
+        self.version = game.version
+        piles = game.all_piles
+        legal = [(piles[source], piles[destination])
+                 for source, destination in game.legal_moves(changed)]
+        valid = set(legal)
+        touching = self.touching
+        if (self.best_move is not None and self.best_move[0] is not game.deck and
+                (self.best_move[1], self.best_move[0]) in valid):
+            self._add((self.best_move[1], self.best_move[0]), 99)
+        while changed:
+            number = (changed & -changed).bit_length() - 1
+            changed &= changed - 1
+            if touching[number]:
+                for move in touching[number] - valid:
+                    self._remove(move)
+        for move in legal:
+            if move not in self.moves:
+                self._add(move, weight_move(game, move))
+        if not self.moves:
+            return False
+        self.best_move = min(self.moves, key=self.moves.get)
+        self._remove(self.best_move)
+        if self.best_move[1] is game.deck:
+            return game.deal()
+        else:
+            return game.move_pile(*self.best_move)
+
+    def _add(self, move, weight):
+        self.moves[move] = weight
+        self.touching[move[0].number].add(move)
+        self.touching[move[1].number].add(move)
+
+    def _remove(self, move):
+        del self.moves[move]
+        self.touching[move[0].number].discard(move)
+        self.touching[move[1].number].discard(move)
+
+
+class GreedyMove(object):
+    """A bot that makes the legal move with the lowest weight_move()
+    weight, ties going to the first move in legal_moves() order.  Like
+    AutoMove it does not undo its own moves: every move, except a move
+    from the draw pile, weights the move that would undo it 99 until the
+    game makes progress, a card going to a foundation pile or a face down
+    card being turned over.  The batch engine plays the same policy
+    """
+    def __init__(self):
+        self.game = None
+        self.penalised = set()
+        self.progress = None
+
+    def __call__(self, game):
+        """Makes one valid move
+        Return True if a move was performed
+
+        Args:
+            game (Solitaire): The game where the cards will be moved
+        """
+        progress = (sum([len(pile) for pile in game.homes]),
+                    -sum([pile.flip for pile in game.piles]))
+        if game is not self.game:
+            self.game = game
+            self.penalised = set()
+        elif progress[0] > self.progress[0] or progress[1] > self.progress[1]:
+            self.penalised.clear()
+        self.progress = progress
+        piles = game.all_piles
+        penalised = self.penalised
+        best_move = None
+        best_weight = None
+        for move in game.legal_moves():
+            if move in penalised:
+                weight = 99
+            else:
+                weight = weight_move(game, (piles[move[0]], piles[move[1]]))
+            if best_weight is None or weight < best_weight:
+                best_move, best_weight = move, weight
+        if best_move is None:
+            return False
+        if best_move[0] != 0:
+            penalised.add((best_move[1], best_move[0]))
+        return game.make_move(best_move)
+
+
+def shuffle_hidden(state, rng=random, recycles=0):
+    """Returns a snapshot() with the cards the player has not seen
+    shuffled among themselves: the face down tableau cards and the cards
+    of the draw pile that have not been dealt.  Once the waste pile has
+    been turned over every card of the draw pile has been dealt, so their
+    order is known and kept.  Every face up card stays where it is
+
+    Args:
+        state (bytes): a position returned by Solitaire.snapshot()
+        rng (optional, random.Random): the source of randomness, default is
+            the random module
+        recycles (optional, int): the times the waste pile has been turned
+            over, default is 0
+    """
+    state = bytearray(state)
+    slots = []
+    offset = 24
+    for number in range(8):
+        if number or not recycles:
+            slots.extend(range(offset, offset + state[2 * number + 1]))
+        offset += state[2 * number]
+    cards = [state[slot] for slot in slots]
+    rng.shuffle(cards)
+    for slot, card in zip(slots, cards):
+        state[slot] = card
+    return bytes(state)
+
+
+class LookaheadMove(object):
+    """A bot that tries its moves before making one.  Every legal move is
+    played out many times on a copy of the game by a greedy rollout policy:
+    the GreedyMove choice, or a random legal move one time in 1 / epsilon.
+    A rollout scores the share of the cards it got to the foundation
+    piles, 1 for a win.  Rollouts go to the moves with the best upper
+    confidence bound (UCB1) until the budget runs out, and the move tried
+    most often is made.  Moves back to a position the game has already
+    been in are not made, so the bot does not go round in circles
+
+    When honest, each rollout deals the cards the player has not seen
+    again with shuffle_hidden(), so the bot only uses what a player knows.
+
+    Attributes:
+        max_time (float): the most seconds per move, None for no limit
+        max_nodes (int): the most rollout moves per move, None for no limit
+        depth (int): the most moves in one rollout
+        epsilon (float): the chance of a random move in a rollout
+        exploration (float): the UCB1 exploration constant
+        honest (bool): True if rollouts shuffle the face down cards
+        nodes (int): the rollout moves made by the last call
+        rollouts (int): the rollouts made by the last call
+    """
+    def __init__(self, max_time=None, max_nodes=2000, depth=40, epsilon=0.1,
+                 exploration=0.5, honest=True, seed=None):
+        """
+        Args:
+            max_time (optional, float): the most seconds per move, default
+                is None (no limit)
+            max_nodes (optional, int): the most rollout moves per move,
+                default is 2000
+            depth (optional, int): the most moves in one rollout, default
+                is 40
+            epsilon (optional, float): the chance of a random move in a
+                rollout, default is 0.1
+            exploration (optional, float): the UCB1 exploration constant,
+                default is 0.5
+            honest (optional, bool): True if rollouts shuffle the face down
+                cards, default is True
+            seed (optional, int): seeds the rollouts, default is None
+        """
+        if max_time is None and max_nodes is None:
+            raise ValueError('LookaheadMove needs max_time or max_nodes')
+        self.max_time = max_time
+        self.max_nodes = max_nodes
+        self.depth = depth
+        self.epsilon = epsilon
+        self.exploration = exploration
+        self.honest = honest
+        self.random = random.Random(seed)
+        self.nodes = 0
+        self.rollouts = 0
+        self.game = None
+        self.seen = set()
+        self._scratch = None
+
+    def __call__(self, game):
+        """Makes one valid move
+        Return True if a move was performed
+
+        Args:
+            game (Solitaire): The game where the cards will be moved
+        """
+        if game is not self.game:
+            self.game = game
+            self.seen = set()
+        self.seen.add(game.state_hash)
+        state = game.snapshot()
+        if self._scratch is None or self._scratch.rules is not game.rules:
+            from .solitaire import Solitaire
+            self._scratch = Solitaire.from_snapshot(state, game.rules)
+        scratch = self._scratch
+        scratch.restore(state)
+        scratch.recycles = game.recycles
+        piles = game.all_piles
+        # [move, weight, rollouts, total score]
+        candidates = []
+        for move in game.legal_moves():
+            scratch.make_move(move)
+            if scratch.state_hash not in self.seen:
+                candidates.append([move, weight_move(
+                    game, (piles[move[0]], piles[move[1]])), 0, 0.0])
+            scratch.undo()
+        self.nodes = self.rollouts = 0
+        if not candidates:
+            return False
+        if len(candidates) > 1:
+            self._search(state, game.recycles, candidates)
+        best = max(candidates, key=lambda candidate: (
+            candidate[2], candidate[3] / max(candidate[2], 1), -candidate[1]))
+        return game.make_move(best[0])
+
+    def _search(self, state, recycles, candidates):
+        """Shares the rollouts out between the candidates"""
+        deadline = None
+        if self.max_time is not None:
+            deadline = timer() + self.max_time
+        scratch = self._scratch
+        # Untried moves first, the best weighted first
+        untried = sorted(candidates, key=lambda candidate: candidate[1])
+        while ((self.max_nodes is None or self.nodes < self.max_nodes) and
+               (deadline is None or timer() < deadline)):
+            if untried:
+                candidate = untried.pop(0)
+            else:
+                scale = self.exploration * math.sqrt(math.log(self.rollouts))
+                candidate = max(candidates, key=lambda candidate: (
+                    candidate[3] / candidate[2] +
+                    scale / math.sqrt(candidate[2])))
+            scratch.restore(shuffle_hidden(state, self.random, recycles)
+                            if self.honest else state)
+            scratch.recycles = recycles
+            scratch.make_move(candidate[0])
+            candidate[2] += 1
+            candidate[3] += self._rollout(scratch, candidate[0])
+            self.rollouts += 1
+
+    def _rollout(self, game, move):
+        """Plays game on from move with the rollout policy.  Returns the
+        score of the position reached
+        """
+        rng = self.random
+        piles = game.all_piles
+        homes = game.homes
+        seen = set()
+        last_move = move if move[0] != 0 else None
+        for _ in range(self.depth):
+            if game.state_hash in seen:
+                break
+            seen.add(game.state_hash)
+            moves = game.legal_moves()
+            if not moves:
+                break
+            if rng.random() < self.epsilon:
+                move = rng.choice(moves)
+            else:
+                reverse = None
+                if last_move is not None:
+                    reverse = (last_move[1], last_move[0])
+                move = None
+                best_weight = None
+                for legal in moves:
+                    if legal == reverse:
+                        weight = 99
+                    else:
+                        weight = weight_move(game, (piles[legal[0]],
+                                                    piles[legal[1]]))
+                    if best_weight is None or weight < best_weight:
+                        move, best_weight = legal, weight
+            game.make_move(move)
+            self.nodes += 1
+            last_move = move if move[0] != 0 else None
+            if game.check_win():
+                return 1.0
+        return sum([len(home) for home in homes]) / 52.0
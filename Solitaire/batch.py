@@ -0,0 +1,412 @@
+"""Lock-step batch engine that plays thousands of games at once with NumPy
+
+Every game is a row of NumPy arrays, so legality, weights and moves are
+computed for all games with a handful of array operations per move.  The
+rules are the rules of Solitaire.move_pile, move_home and deal, and the
+policy is automove.GreedyMove.  play_objects() plays the same games with
+Solitaire objects and gives identical results.
+
+Requires numpy.
+
+Moves are numbered slots: slot 0 is a deal, slot 1 + source * 11 + rank
+is a move from pile number source (see Solitaire.all_piles) to the
+destination of that rank, foundation piles 8-11 first and then tableau
+piles 1-7.  This is the order of Solitaire.legal_moves().
+
+Functions:
+    play_greedy(deal_numbers, max_moves, stall_limit): plays deals with
+        the batch engine
+    play_objects(deal_numbers, max_moves, stall_limit): plays deals with
+        Solitaire objects
+Classes:
+    BatchGames: the arrays of a batch of games
+
+Command line:
+    python -m Solitaire.batch 100000 --start 0
+"""
+from __future__ import print_function, division
+import argparse
+import time
+
+import numpy as np
+
+from .automove import GreedyMove
+from .playing_cards import (CARD_COLOR, CARD_SUIT, CARD_VALUE, Deck,
+                            deal_permutation)
+from .solitaire import CardPile, Solitaire
+
+NO_CARD = 52
+CAPACITY = 24
+SLOTS = 1 + 12 * 11
+ILLEGAL = 255
+
+# Card tables with an extra entry for NO_CARD
+VALUE = np.array(CARD_VALUE + (0,), dtype=np.int16)
+COLOR = np.array(CARD_COLOR + (2,), dtype=np.int16)
+SUIT = np.array(CARD_SUIT + (4,), dtype=np.int16)
+
+_DESTINATIONS = (8, 9, 10, 11, 1, 2, 3, 4, 5, 6, 7)
+SOURCE = np.zeros(SLOTS, dtype=np.int16)
+DESTINATION = np.zeros(SLOTS, dtype=np.int16)
+for _source in range(12):
+    for _rank, _destination in enumerate(_DESTINATIONS):
+        SOURCE[1 + _source * 11 + _rank] = _source
+        DESTINATION[1 + _source * 11 + _rank] = _destination
+# The slot that undoes each slot, -1 for deals and moves from the draw pile
+REVERSE = np.full(SLOTS, -1, dtype=np.int16)
+for _slot in range(1 + 11, SLOTS):
+    _source, _destination = SOURCE[_slot], DESTINATION[_slot]
+    if _destination != 0:
+        REVERSE[_slot] = (1 + _destination * 11 +
+                          _DESTINATIONS.index(_source))
+# weight_move() weights that do not depend on the position
+WEIGHTS = np.full(SLOTS, 3, dtype=np.int16)
+WEIGHTS[SOURCE == 0] = 1
+WEIGHTS[SOURCE >= 8] = 5
+WEIGHTS[DESTINATION >= 8] = 0
+WEIGHTS[0] = 4
+_PILES = np.arange(1, 8)
+
+
+def _deal_layout():
+    """Returns (pile, position) arrays giving where the card at each
+    position of a shuffled Deck is dealt by Solitaire()
+    """
+    deck = Deck()
+    piles = [CardPile(deck, amount) for amount in range(1, 8)]
+    piles.insert(0, CardPile(deck))
+    pile_of = np.zeros(52, dtype=np.intp)
+    position_of = np.zeros(52, dtype=np.intp)
+    for number, pile in enumerate(piles):
+        for position, card in enumerate(pile.pile):
+            pile_of[card.index] = number
+            position_of[card.index] = position
+    return pile_of, position_of
+
+_LAYOUT_PILE, _LAYOUT_POSITION = _deal_layout()
+
+
+class BatchGames(object):
+    """K games held as arrays
+
+    Attributes:
+        cards (array of int8, shape (K, 12, 24)): the card indexes of every
+            pile, NO_CARD past the end of the pile
+        length (array of int16, shape (K, 12)): the length of every pile
+        flip (array of int16, shape (K, 12)): the flip of every pile
+        penalised (array of bool, shape (K, SLOTS)): the slots that undo a
+            move made since the game last made progress
+        moves (array of int32, shape (K,)): the number of moves made
+        stall (array of int32, shape (K,)): moves since a card went to a
+            foundation pile or a face down card was turned over
+        active (array of bool, shape (K,)): games that are still playing
+    """
+    def __init__(self, deal_numbers):
+        """Deals the games
+
+        Args:
+            deal_numbers (sequence of ints): the deal of every game
+        """
+        count = len(deal_numbers)
+        permutations = np.array([deal_permutation(deal_number)
+                                 for deal_number in deal_numbers],
+                                dtype=np.int8).reshape(count, 52)
+        self.cards = np.full((count, 12, CAPACITY), NO_CARD, dtype=np.int8)
+        rows = np.repeat(np.arange(count), 52)
+        self.cards[rows, np.tile(_LAYOUT_PILE, count),
+                   np.tile(_LAYOUT_POSITION, count)] = permutations.ravel()
+        self.length = np.zeros((count, 12), dtype=np.int16)
+        self.length[:, 0] = 24
+        self.length[:, 1:8] = np.arange(1, 8)
+        self.flip = self.length.copy()
+        self.flip[:, 1:8] -= 1
+        self.penalised = np.zeros((count, SLOTS), dtype=bool)
+        self.moves = np.zeros(count, dtype=np.int32)
+        self.stall = np.zeros(count, dtype=np.int32)
+        self.active = np.ones(count, dtype=bool)
+        self._rows = np.arange(count)
+
+    def __len__(self):
+        return len(self.cards)
+
+    def home_cards(self):
+        """Returns the number of cards on the foundation piles of every
+        game
+        """
+        return self.length[:, 8:].sum(axis=1)
+
+    def won(self):
+        return self.home_cards() == 52
+
+    def _tops(self, games):
+        """Returns (tops, waste, bases): the top card of every pile, the top
+        waste card and the first face up card of every pile of the games
+        """
+        rows = games[:, None]
+        piles = np.arange(12)[None, :]
+        length = self.length[games]
+        flip = self.flip[games]
+        tops = self.cards[rows, piles, np.maximum(length - 1, 0)]
+        tops = np.where(length > 0, tops, NO_CARD).astype(np.int16)
+        bases = self.cards[rows, piles, np.minimum(flip, CAPACITY - 1)]
+        bases = np.where(flip < length, bases, NO_CARD).astype(np.int16)
+        return tops, bases[:, 0], bases
+
+    def legal(self, games=None):
+        """Returns a (len(games), SLOTS) bool array of the legal moves
+
+        Args:
+            games (optional, array of ints): the rows of the games, default
+                is None (every game)
+        """
+        if games is None:
+            games = self._rows
+        return self._legal(games, self._tops(games))
+
+    def weights(self, legal, games=None):
+        """Returns a (len(games), SLOTS) array of GreedyMove weights,
+        ILLEGAL where the move is not legal
+
+        Args:
+            legal (array of bool): legal(games)
+            games (optional, array of ints): the rows of the games, default
+                is None (every game)
+        """
+        if games is None:
+            games = self._rows
+        return self._weights(legal, games, self._tops(games))
+
+    def _legal(self, games, position):
+        """legal() given position = _tops(games)"""
+        tops, waste, bases = position
+        length = self.length[games]
+        count = len(games)
+        # Every source is treated as a run of face up cards from base down
+        # to top, the draw and foundation piles only offer their top card
+        top = tops.copy()
+        top[:, 0] = waste
+        top[:, 1:8] = np.where(bases[:, 1:8] != NO_CARD, tops[:, 1:8],
+                               NO_CARD)
+        base = bases.copy()
+        base[:, 8:] = tops[:, 8:]
+        present = (top != NO_CARD)[:, :, None]
+        legal = np.zeros((count, SLOTS), dtype=bool)
+        legal[:, 0] = length[:, 0] > 0
+        moves = legal[:, 1:].reshape(count, 12, 11)
+        # Foundation piles take the next card of their suit
+        home_tops = tops[:, None, 8:]
+        moves[:, :8, :4] = (present[:, :8] & np.where(
+            length[:, None, 8:] == 0, (VALUE[top[:, :8]] == 1)[:, :, None],
+            (top[:, :8, None] == home_tops + 1) & (VALUE[home_tops] < 13)))
+        # A run fits on a tableau pile when the card the pile needs is in
+        # the run, the colors of a run alternate
+        pile_tops = tops[:, None, 1:8]
+        pile_empty = length[:, None, 1:8] == 0
+        needed = VALUE[pile_tops] - 1
+        base_value = VALUE[base][:, :, None]
+        color = COLOR[base][:, :, None] ^ ((base_value - needed) & 1)
+        on_top = (~pile_empty & (VALUE[top][:, :, None] <= needed) &
+                  (needed <= base_value) & (color != COLOR[pile_tops]))
+        on_top[:, :8] |= pile_empty & (base_value[:, :8] == 13)
+        on_top &= present
+        on_top[:, _PILES, _PILES - 1] = False
+        moves[:, :, 4:] = on_top
+        return legal
+
+    def _weights(self, legal, games, position):
+        """weights() given position = _tops(games)"""
+        tops, _, bases = position
+        weights = np.where(legal, WEIGHTS, ILLEGAL).astype(np.uint8)
+        # Moves between tableau piles, shaped (games, source, destination)
+        length = self.length[games, None, 1:8]
+        empty = length == 0
+        whole = empty | (VALUE[tops[:, None, 1:8]] - 1 ==
+                         VALUE[bases[:, 1:8, None]])
+        king = empty & (self.flip[games, 1:8, None] == 0)
+        block = np.where(king, 99, np.where(whole, 2, 3))
+        moves = weights[:, 1:].reshape(len(games), 12, 11)
+        moves[:, 1:8, 4:] = np.where(
+            moves[:, 1:8, 4:] != ILLEGAL, block, ILLEGAL)
+        weights[legal & self.penalised[games]] = 99
+        return weights
+
+    def apply(self, slots, games):
+        """Makes one move in each of the given games
+
+        Args:
+            slots (array of ints): the slot to play in each game
+            games (array of ints): the rows of the games
+        """
+        deal = slots == 0
+        rows = games[deal]
+        flip = self.flip[rows, 0]
+        self.flip[rows, 0] = np.where(flip == 0, self.length[rows, 0],
+                                      np.maximum(flip - 3, 0))
+        self.stall[rows] += 1
+        slots = slots[~deal]
+        games = games[~deal]
+        source = SOURCE[slots]
+        destination = DESTINATION[slots]
+        homes_before = self.length[games, 8:].sum(axis=1)
+        single = (source == 0) | (source >= 8) | (destination >= 8)
+        self._move_single(games[single], source[single], destination[single])
+        run = ~single
+        self._move_run(games[run], source[run], destination[run])
+        tableau = (source >= 1) & (source <= 7)
+        rows = games[tableau]
+        piles = source[tableau]
+        length = self.length[rows, piles]
+        flip = self.flip[rows, piles]
+        turned = (length > 0) & (flip > length - 1)
+        self.flip[rows[turned], piles[turned]] -= 1
+        progress = self.length[games, 8:].sum(axis=1) > homes_before
+        progress[tableau] |= turned
+        self.stall[games] = np.where(progress, 0, self.stall[games] + 1)
+        # Progress lifts the penalties, otherwise the move that undoes this
+        # one is penalised
+        self.penalised[games[progress]] = False
+        undone = ~progress & (source != 0)
+        self.penalised[games[undone], REVERSE[slots[undone]]] = True
+
+    def _move_single(self, games, source, destination):
+        """Moves the top card of source, or the top waste card, to the end
+        of destination
+        """
+        from_deck = source == 0
+        index = np.where(from_deck, self.flip[games, source],
+                         self.length[games, source] - 1)
+        card = self.cards[games, source, index]
+        deck_rows = games[from_deck]
+        if len(deck_rows):
+            positions = np.arange(CAPACITY)[None, :]
+            shifted = positions + (positions >= index[from_deck][:, None])
+            shifted = np.minimum(shifted, CAPACITY - 1)
+            row = np.take_along_axis(self.cards[deck_rows, 0], shifted, 1)
+            self.cards[deck_rows, 0] = row
+            self.cards[deck_rows, 0, self.length[deck_rows, 0] - 1] = NO_CARD
+        other = ~from_deck
+        self.cards[games[other], source[other], index[other]] = NO_CARD
+        self.length[games, source] -= 1
+        self.cards[games, destination, self.length[games, destination]] = card
+        self.length[games, destination] += 1
+
+    def _move_run(self, games, source, destination):
+        """Moves the face up cards of source, from the card that fits on
+        destination, to the end of destination
+        """
+        flip = self.flip[games, source]
+        base = self.cards[games, source, flip].astype(np.int16)
+        target_length = self.length[games, destination]
+        target_top = self.cards[games, destination,
+                                np.maximum(target_length - 1, 0)]
+        index = np.where(target_length == 0, flip,
+                         flip + VALUE[base] - VALUE[target_top] + 1)
+        count = self.length[games, source] - index
+        for offset in range(13):
+            moving = offset < count
+            if not moving.any():
+                break
+            rows = games[moving]
+            self.cards[rows, destination[moving],
+                       target_length[moving] + offset] = \
+                self.cards[rows, source[moving], index[moving] + offset]
+            self.cards[rows, source[moving], index[moving] + offset] = NO_CARD
+        self.length[games, destination] += count
+        self.length[games, source] = index
+
+    def play_greedy(self, max_moves=1000, stall_limit=100):
+        """Plays every game until it is won, has no legal move, made
+        stall_limit moves without progress or made max_moves moves
+        """
+        while self.active.any():
+            games = np.nonzero(self.active)[0]
+            position = self._tops(games)
+            weights = self._weights(self._legal(games, position), games,
+                                    position)
+            slots = weights.argmin(axis=1)
+            has_move = weights[np.arange(len(games)), slots] != ILLEGAL
+            self.active[games[~has_move]] = False
+            games = games[has_move]
+            self.apply(slots[has_move].astype(np.int16), games)
+            self.moves[games] += 1
+            self.active &= ~self.won()
+            self.active &= self.moves < max_moves
+            self.active &= self.stall < stall_limit
+
+
+def play_greedy(deal_numbers, max_moves=1000, stall_limit=100):
+    """Plays deals with GreedyMove in the batch engine.  Returns
+    (won, moves, home_cards) arrays
+
+    Args:
+        deal_numbers (sequence of ints): the deals to play
+        max_moves (optional, int): the most moves per game, default is 1000
+        stall_limit (optional, int): the most moves in a row without a
+            card going to a foundation pile or a face down card being
+            turned over, default is 100
+    """
+    games = BatchGames(deal_numbers)
+    games.play_greedy(max_moves, stall_limit)
+    return games.won(), games.moves, games.home_cards()
+
+
+def play_objects(deal_numbers, max_moves=1000, stall_limit=100):
+    """Plays deals with GreedyMove on Solitaire objects, stopping the same
+    way play_greedy() does.  Returns (won, moves, home_cards) lists
+    """
+    won = []
+    moves = []
+    home_cards = []
+    for deal_number in deal_numbers:
+        game = Solitaire(deal_number)
+        greedy_move = GreedyMove()
+        game_moves = stall = 0
+        progress = (sum(len(pile) for pile in game.homes),
+                    -sum(pile.flip for pile in game.piles))
+        while (not game.check_win() and game_moves < max_moves and
+               stall < stall_limit):
+            if not greedy_move(game):
+                break
+            game_moves += 1
+            homes = sum(len(pile) for pile in game.homes)
+            face_down = -sum(pile.flip for pile in game.piles)
+            if homes > progress[0] or face_down > progress[1]:
+                stall = 0
+            else:
+                stall += 1
+            progress = (homes, face_down)
+        won.append(game.check_win())
+        moves.append(game_moves)
+        home_cards.append(sum(len(pile) for pile in game.homes))
+    return won, moves, home_cards
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Play numbered deals with the NumPy batch engine')
+    parser.add_argument('games', type=int, help='number of deals to play')
+    parser.add_argument('--start', type=int, default=0,
+                        help='first deal number, default is 0')
+    parser.add_argument('--batch', type=int, default=10000,
+                        help='games played in lock step, default is 10000')
+    parser.add_argument('--max-moves', type=int, default=1000,
+                        help='most moves per game, default is 1000')
+    args = parser.parse_args(argv)
+    began = time.time()
+    games = wins = moves = 0
+    for first in range(args.start, args.start + args.games, args.batch):
+        deal_numbers = range(first, min(first + args.batch,
+                                        args.start + args.games))
+        won, game_moves, _ = play_greedy(deal_numbers, args.max_moves)
+        games += len(won)
+        wins += int(won.sum())
+        moves += int(game_moves.sum())
+    seconds = time.time() - began
+    print('Games:          {0}'.format(games))
+    print('Wins:           {0} ({1:.2%})'.format(wins, wins / games))
+    print('Moves per game: {0:.1f}'.format(moves / games))
+    print('Games / second: {0:.1f}'.format(games / seconds))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Canonical keys of solitaire positions
+
+Positions that only differ in which tableau pile holds which cards, or
+which foundation pile holds which suit, play the same: a king led stack
+in the second empty pile is as good as one in the first.  A canonical
+key is the same for all of them, so searches and caches keyed by it
+treat them as one position.
+
+canonical_key() packs a position into bytes: the stock cursor, the draw
+and waste pile, the foundation height of every suit, then the tableau
+piles, each as its length, flip and cards, sorted.  canonical_hash() is
+the 64 bit Zobrist hash of the same thing, see zobrist.py; the solver
+keeps it up to date move by move.
+
+Functions:
+    canonical_key(state): returns the canonical key of a snapshot()
+    canonical_hash(state): returns the canonical Zobrist hash of a
+        snapshot()
+"""
+from .playing_cards import CARD_SUIT
+from .zobrist import (BOTTOM, CARD_KEYS, FACE_UP_KEYS, FLIP_KEYS,
+                      FOUNDATION_BOTTOM, TABLEAU_BOTTOM)
+
+
+def _piles(state):
+    """Returns the (cards, flip) of every pile of a snapshot() in
+    all_piles order
+    """
+    state = bytearray(state)
+    piles = []
+    offset = 24
+    for number in range(12):
+        length = state[2 * number]
+        piles.append((state[offset:offset + length], state[2 * number + 1]))
+        offset += length
+    return piles
+
+
+def _heights(piles):
+    """Returns the foundation height of every suit"""
+    heights = bytearray(4)
+    for cards, _ in piles[8:]:
+        if cards:
+            heights[CARD_SUIT[cards[0]]] = len(cards)
+    return heights
+
+
+def canonical_key(state):
+    """Returns the canonical key of a position as bytes, at most 72 long
+
+    Args:
+        state (bytes): a position returned by Solitaire.snapshot()
+    """
+    piles = _piles(state)
+    stock, cursor = piles[0]
+    tableau = sorted(bytes(bytearray((len(cards), flip)) + cards)
+                     for cards, flip in piles[1:8])
+    return (bytes(bytearray((cursor, len(stock))) + stock +
+                  _heights(piles)) + b''.join(tableau))
+
+
+def canonical_hash(state):
+    """Returns the canonical Zobrist hash of a position, equal for the
+    positions with equal canonical_key()
+
+    Args:
+        state (bytes): a position returned by Solitaire.snapshot()
+    """
+    piles = _piles(state)
+    stock, cursor = piles[0]
+    state_hash = FLIP_KEYS[cursor]
+    under = BOTTOM
+    for card in stock:
+        state_hash ^= CARD_KEYS[card * 64 + under]
+        under = card
+    for cards, flip in piles[1:8]:
+        under = TABLEAU_BOTTOM
+        for card in cards:
+            state_hash ^= CARD_KEYS[card * 64 + under]
+            under = card
+        if flip < len(cards):
+            state_hash ^= FACE_UP_KEYS[cards[flip]]
+    for suit, height in enumerate(_heights(piles)):
+        under = FOUNDATION_BOTTOM
+        for card in range(suit * 13, suit * 13 + height):
+            state_hash ^= CARD_KEYS[card * 64 + under]
+            under = card
+    return state_hash
@@ -0,0 +1,153 @@
+"""Monte Carlo estimate of the chance that a position can be won
+
+The cards a player has not seen, the face down tableau cards and the
+draw pile cards not dealt yet, are dealt again at random among their
+places (automove.shuffle_hidden) and every sample is played out with
+AutoMove, like simulate.play_game().
+Samples are played in batches across a pool of worker processes, and the
+estimate stops early once its confidence interval is narrow enough.
+
+Functions:
+    estimate_win_probability(game, n_samples, workers, confidence,
+        tolerance, max_moves, seed): returns a WinEstimate
+    play_sample(state, seed, max_moves, rules, recycles): plays out one
+        sample of a position
+    wilson_interval(wins, samples, z): returns a confidence interval
+Classes:
+    WinEstimate: the estimate and its confidence interval
+"""
+from __future__ import division
+import collections
+import math
+import multiprocessing
+import random
+import time
+
+from .automove import AutoMove, shuffle_hidden
+from .solitaire import Solitaire
+
+WinEstimate = collections.namedtuple(
+    'WinEstimate', 'probability low high wins samples seconds')
+WinEstimate.__doc__ = """A win probability estimate
+
+    probability (float): the share of samples that were won
+    low, high (float): the Wilson score confidence interval
+    wins (int): the samples that were won
+    samples (int): the samples played
+    seconds (float): the time taken
+"""
+
+# Two sided normal quantiles of the common confidence levels
+_Z = {0.8: 1.2816, 0.9: 1.6449, 0.95: 1.9600, 0.98: 2.3263, 0.99: 2.5758}
+
+
+def wilson_interval(wins, samples, z=1.96):
+    """Returns the (low, high) Wilson score interval of wins in samples"""
+    if not samples:
+        return 0.0, 1.0
+    share = wins / samples
+    denominator = 1 + z * z / samples
+    centre = share + z * z / (2 * samples)
+    spread = z * math.sqrt(share * (1 - share) / samples +
+                           z * z / (4 * samples * samples))
+    return (max(0.0, (centre - spread) / denominator),
+            min(1.0, (centre + spread) / denominator))
+
+
+def play_sample(state, seed, max_moves=1000, rules=None, recycles=0):
+    """Shuffles the unseen cards of a position and plays it out with
+    AutoMove until it is won, AutoMove has no move, a position repeats or
+    max_moves moves have been made.  Returns True if the sample was won
+
+    Args:
+        state (bytes): a position returned by Solitaire.snapshot()
+        seed (int): picks the arrangement of the face down cards
+        max_moves (optional, int): the most moves to make, default is 1000
+        rules (optional, rules.Rules): the rule variant, default is None
+            (rules.STANDARD)
+        recycles (optional, int): the times the waste pile has been turned
+            over, default is 0
+    """
+    game = Solitaire.from_snapshot(
+        shuffle_hidden(state, random.Random(seed), recycles), rules, recycles)
+    auto_move = AutoMove()
+    seen = set()
+    moves = 0
+    while moves < max_moves and not game.check_win():
+        if game.state_hash in seen:
+            break
+        seen.add(game.state_hash)
+        if not auto_move(game):
+            break
+        moves += 1
+    return game.check_win()
+
+
+def _play_batch(args):
+    """Worker task: plays the samples with the seeds given.  Returns
+    (samples, wins)
+    """
+    state, seeds, max_moves, rules, recycles = args
+    return len(seeds), sum(play_sample(state, seed, max_moves, rules,
+                                       recycles) for seed in seeds)
+
+
+def estimate_win_probability(game, n_samples=1000, workers=None,
+                             confidence=0.95, tolerance=0.02, max_moves=1000,
+                             seed=None, batch_size=50):
+    """Estimates the chance that AutoMove wins the position of game when
+    the face down cards are unknown.  Returns a WinEstimate.  The game is
+    not changed
+
+    Args:
+        game (Solitaire): the position
+        n_samples (optional, int): the most samples to play, default is
+            1000
+        workers (optional, int): the number of worker processes, default
+            is None (one per cpu).  1 plays every sample in this process
+        confidence (optional, float): the confidence level of the
+            interval, one of 0.8, 0.9, 0.95, 0.98 and 0.99, default is 0.95
+        tolerance (optional, float): stop once the interval is at most
+            this far from the estimate on both sides, 0 plays every sample,
+            default is 0.02
+        max_moves (optional, int): the most moves per sample, default is
+            1000
+        seed (optional, int): seeds the samples, default is None
+        batch_size (optional, int): the samples sent to a worker at a
+            time, default is 50
+    """
+    if confidence not in _Z:
+        raise ValueError('confidence must be one of {0}'.format(
+            ', '.join(str(level) for level in sorted(_Z))))
+    z = _Z[confidence]
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    rng = random.Random(seed)
+    state = game.snapshot()
+    tasks = [(state, [rng.getrandbits(64) for _ in
+                      range(min(batch_size, n_samples - first))], max_moves,
+              game.rules, game.recycles)
+             for first in range(0, n_samples, batch_size)]
+    began = time.time()
+    if workers == 1:
+        results = (_play_batch(task) for task in tasks)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(workers)
+        results = pool.imap(_play_batch, tasks)
+    samples = wins = 0
+    low, high = 0.0, 1.0
+    try:
+        for batch_samples, batch_wins in results:
+            samples += batch_samples
+            wins += batch_wins
+            low, high = wilson_interval(wins, samples, z)
+            if tolerance and max(wins / samples - low,
+                                 high - wins / samples) <= tolerance:
+                break
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+    return WinEstimate(wins / samples if samples else 0.0, low, high, wins,
+                       samples, time.time() - began)
@@ -0,0 +1,233 @@
+"""Opt-in counters and timers for the solitaire engine
+
+enable() replaces the methods of Solitaire, CardPile, AutoMove and
+GreedyMove with wrappers that count calls and time them, and keeps
+counters for every game.  disable() puts the original methods back, so
+when instrumentation is off the engine runs its own code untouched.
+
+Latencies go into histograms of power of two buckets: bucket k counts
+calls that took at least 2 ** (k - 1) and less than 2 ** k microseconds,
+bucket 0 counts calls under a microsecond.  Timings of a method include
+the methods it calls.
+
+Game counters:
+    probes: move_pile and move_home calls that only check a move
+    moves: moves between piles (not counting undo and redo)
+    deals: deals from the draw pile, including recycles
+    recycles: deals that turned the waste pile over
+    flips: face down cards turned over by a move
+    undos, redos: successful undo() and redo() calls
+
+Functions:
+    enable(): starts counting
+    disable(): stops counting, the counts are kept
+    enabled(): returns True while counting
+    reset(): clears every count
+    stats(): returns the counts as a dict that json can save
+    start_dump(path, interval): saves stats() to path every interval
+        seconds from a background thread
+    stop_dump(): stops saving stats()
+"""
+from __future__ import division
+import functools
+import json
+import os
+import threading
+import weakref
+from timeit import default_timer as timer
+
+from .automove import AutoMove, GreedyMove
+from .solitaire import CardPile, Solitaire
+
+BUCKETS = 24
+GAME_COUNTERS = ('probes', 'moves', 'deals', 'recycles', 'flips', 'undos',
+                 'redos')
+
+# Methods that are wrapped, by class
+METHODS = ((Solitaire, ('deal', 'move_pile', 'move_home', 'cascade_home',
+                        'check_win', 'legal_moves', 'make_move', 'undo',
+                        'redo', 'snapshot', 'restore', 'rehash', '_move',
+                        '_record', '_update', '__str__')),
+           (CardPile, ('update', 'set_flip', 'get_face_up', 'move_card',
+                       'move_cards')),
+           (AutoMove, ('__call__',)),
+           (GreedyMove, ('__call__',)))
+
+_originals = []
+_methods = {}
+_games = weakref.WeakKeyDictionary()
+_candidates = {}
+_dump = None
+
+
+def enable():
+    """Wraps the engine methods, calling it again does nothing"""
+    if _originals:
+        return
+    for cls, names in METHODS:
+        for name in names:
+            original = cls.__dict__[name]
+            _originals.append((cls, name, original))
+            setattr(cls, name, _wrap(cls, name, original))
+
+
+def disable():
+    """Puts the original engine methods back"""
+    while _originals:
+        cls, name, original = _originals.pop()
+        setattr(cls, name, original)
+
+
+def enabled():
+    return bool(_originals)
+
+
+def reset():
+    for record in _methods.values():
+        record[0] = 0
+        record[1] = 0.0
+        record[2][:] = [0] * BUCKETS
+    _games.clear()
+    _candidates.clear()
+
+
+def stats():
+    """Returns a dict with the keys:
+        methods: {'Class.method': {'calls', 'seconds', 'histogram'}}
+        games: a list of {'deal_number', counters} for every live game
+        totals: the game counters added up over the live games
+        candidates: {size: calls} of the AutoMove candidate dict after
+            each call
+    """
+    methods = {}
+    for name, (calls, seconds, histogram) in _methods.items():
+        methods[name] = {'calls': calls,
+                         'seconds': seconds,
+                         'histogram': list(histogram)}
+    games = []
+    totals = dict((counter, 0) for counter in GAME_COUNTERS)
+    for game, counters in list(_games.items()):
+        entry = dict(counters)
+        entry['deal_number'] = game.deal_number
+        games.append(entry)
+        for counter in GAME_COUNTERS:
+            totals[counter] += counters[counter]
+    return {'methods': methods,
+            'games': games,
+            'totals': totals,
+            'candidates': dict((str(size), calls) for size, calls in
+                               sorted(_candidates.items()))}
+
+
+def start_dump(path, interval=10.0):
+    """Saves stats() as JSON to path every interval seconds until
+    stop_dump() is called, and once more when it is called
+
+    Args:
+        path (str): the file to write, it is replaced each time
+        interval (optional, float): seconds between saves, default is 10
+    """
+    global _dump
+    stop_dump()
+    stop = threading.Event()
+    thread = threading.Thread(target=_dump_loop, args=(path, interval, stop))
+    thread.daemon = True
+    _dump = (thread, stop, path)
+    thread.start()
+
+
+def stop_dump():
+    global _dump
+    if _dump is not None:
+        thread, stop, path = _dump
+        _dump = None
+        stop.set()
+        thread.join()
+        _save(path)
+
+
+def _dump_loop(path, interval, stop):
+    while not stop.wait(interval):
+        _save(path)
+
+
+def _save(path):
+    temporary = path + '.tmp'
+    with open(temporary, 'w') as dump_file:
+        json.dump(stats(), dump_file, indent=2, sort_keys=True)
+    os.rename(temporary, path)
+
+
+def _counters(game):
+    """Returns the counters of game, creating them on first use"""
+    counters = _games.get(game)
+    if counters is None:
+        counters = _games[game] = dict((counter, 0)
+                                       for counter in GAME_COUNTERS)
+    return counters
+
+
+def _wrap(cls, name, original):
+    """Returns original wrapped to count and time its calls, and to update
+    the game counters for the methods that have them
+    """
+    record = _methods.setdefault('{0}.{1}'.format(cls.__name__, name),
+                                 [0, 0.0, [0] * BUCKETS])
+    hook = _HOOKS.get((cls, name))
+
+    @functools.wraps(original)
+    def wrapper(*args, **kwargs):
+        began = timer()
+        try:
+            result = original(*args, **kwargs)
+        finally:
+            elapsed = timer() - began
+            record[0] += 1
+            record[1] += elapsed
+            record[2][min(int(elapsed * 1e6).bit_length(), BUCKETS - 1)] += 1
+        if hook is not None:
+            hook(result, *args, **kwargs)
+        return result
+    return wrapper
+
+
+def _probe(result, game, source_pile, *args, **kwargs):
+    """move_pile and move_home have move as their last argument"""
+    move = kwargs.get('move', args[-1] if args and
+                      isinstance(args[-1], bool) else True)
+    if not move:
+        _counters(game)['probes'] += 1
+
+
+def _record(result, game, entry):
+    counters = _counters(game)
+    source, destination, count, flipped = entry
+    if source == destination:
+        counters['deals'] += 1
+        counters['recycles'] += flipped
+    else:
+        counters['moves'] += 1
+        counters['flips'] += flipped
+
+
+def _undo(result, game):
+    if result:
+        _counters(game)['undos'] += 1
+
+
+def _redo(result, game):
+    if result:
+        _counters(game)['redos'] += 1
+
+
+def _auto_move(result, auto_move, game):
+    size = len(auto_move.moves)
+    _candidates[size] = _candidates.get(size, 0) + 1
+
+
+_HOOKS = {(Solitaire, 'move_pile'): _probe,
+          (Solitaire, 'move_home'): _probe,
+          (Solitaire, '_record'): _record,
+          (Solitaire, 'undo'): _undo,
+          (Solitaire, 'redo'): _redo,
+          (AutoMove, '__call__'): _auto_move}
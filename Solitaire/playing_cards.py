@@ -1,75 +1,104 @@
 """Playing Cards is used to make representations of playing cards and
 playing card decks
+The 52 cards are shared objects, and the CARD_* tables give the value,
+suit, color and glyph of a card from its index without touching the object.
 Examples:
     Card(5, 'Diamond') : Creates the 5 of Diamonds
     Card(11, 'Heart') : Creates the Jack of Hearts
     Deck() : Creates a deck of cards containing all 52 standard cards
+    Deck().shuffle(7) : Arranges the deck in the order of deal number 7
 """
 from __future__ import print_function
+import binascii
+import hashlib
 import random
-import nose.tools as nose
-import sys
 
-try:
-    from colorama import init
-    init()
-except ImportError:
-    if sys.platform.startswith('win'):
-        sys.exit("colorama required for windows use")
+SUITS = ('Spade', 'Heart', 'Club', 'Diamond')
+RANKS = ('A', '2', '3', '4', '5', '6', '7', '8', '9', 'T', 'J', 'Q', 'K')
+BLACK, RED = 0, 1
+
+# Lookup tables indexed by card index (suit * 13 + value - 1).  The suit
+# order matches the order cards are created in a new Deck
+CARD_VALUE = tuple(value for _ in SUITS for value in range(1, 14))
+CARD_SUIT = tuple(suit for suit in range(4) for _ in range(13))
+CARD_COLOR = tuple(RED if SUITS[suit] in ('Heart', 'Diamond') else BLACK
+                   for suit in CARD_SUIT)
+CARD_GLYPH = tuple(
+    ('\033[47;31m' if CARD_COLOR[index] == RED else '\033[47;30m') +
+    '{0} {1}\033[0m'.format(RANKS[CARD_VALUE[index] - 1],
+                            SUITS[CARD_SUIT[index]][0])
+    for index in range(52))
+_SUIT_INDEX = dict((suit, index) for index, suit in enumerate(SUITS))
+_FACTORIALS = [1]
+for _n in range(1, 53):
+    _FACTORIALS.append(_FACTORIALS[-1] * _n)
+
 
 class Card(object):
-    """A Card is a representation of a playing card from a standard deck
+    """A Card is a representation of a playing card from a standard deck.
+    There are only ever 52 Card objects, calling Card(value, suit) returns
+    the shared instance for that card.
 
     Attributes:
         value (int): a number from 1 to 13 that represents the value of
             card. 1 is Ace, 11 is Jack, 12 is Queen, and 13 is King
         suit (str): a string representing the suit of the card.  It is
             always capitalized and the singular variation
+        index (int): a number from 0 to 51 that identifies the card,
+            used to index the CARD_* lookup tables
+        color (int): RED or BLACK
     """
-    def __init__(self, value=1, suit='Spade'):
-        """Creates a card object that has a numeric value and a string suit
+    __slots__ = ('value', 'suit', 'index', 'color')
+
+    def __new__(cls, value=1, suit='Spade'):
+        """Returns the card object that has a numeric value and a string suit
 
         Attributes:
-            value (int, optional): A number from 1 to 14, defaults to 1.
+            value (int, optional): A number from 1 to 13, defaults to 1.
             suit (str, optional): One of the following strings:
                 'Spade', 'Heart', 'Club', or 'Diamond', defaults to 'Spade'
         """
-
-        if 0 < value < 14:
-            self.value = value
-        else:
+        if not 0 < value < 14:
             raise ValueError('{} not a valid card value'.format(value))
-        suits = ['Spade', 'Heart', 'Club', 'Diamond']
-        if suit in suits or (suit.endswith('s') and suit[:-1] in suits):
-            self.suit = suit
-        else:
+        if suit not in _SUIT_INDEX:
             raise ValueError('{} not a valid card suit'.format(suit))
+        return CARDS[_SUIT_INDEX[suit] * 13 + value - 1]
 
     def __repr__(self):
         return repr('Value = {0}, Suit = {1}'.format(self.value, self.suit))
 
     def __str__(self):
-        if self.suit == 'Heart' or self.suit == 'Diamond':
-            suit = '\033[47;31m'
-        else:
-            suit = '\033[47;30m'
-        values = {1: 'A',
-                  2: '2',
-                  3: '3',
-                  4: '4',
-                  5: '5',
-                  6: '6',
-                  7: '7',
-                  8: '8',
-                  9: '9',
-                  10: 'T',
-                  11: 'J',
-                  12: 'Q',
-                  13: 'K'}
-        return suit + '{0} {1}\033[0m'.format(values[self.value], self.suit[0])
+        return CARD_GLYPH[self.index]
 
     def __eq__(self, other):
-        return self.suit == other.suit and self.value == other.value
+        return self is other
+
+    def __ne__(self, other):
+        return self is not other
+
+    def __hash__(self):
+        return self.index
+
+    def __reduce__(self):
+        return Card, (self.value, self.suit)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+def _make_card(index):
+    card = object.__new__(Card)
+    card.value = CARD_VALUE[index]
+    card.suit = SUITS[CARD_SUIT[index]]
+    card.index = index
+    card.color = CARD_COLOR[index]
+    return card
+
+
+CARDS = tuple(_make_card(index) for index in range(52))
 
 
 class Deck(object):
@@ -92,12 +121,8 @@ class Deck(object):
             deal(): removes and returns end card in deck
         """
         if cards is None:
-            self.deck = []
-            suits = ['Spade', 'Heart', 'Club', 'Diamond']
-            for suit in suits:
-                for value in range(1, 14):
-                    self.deck.append(Card(value, suit))
-        elif all([card is type(Card) for card in cards]):
+            self.deck = list(CARDS)
+        elif all([isinstance(card, Card) for card in cards]):
             self.deck = cards
         else:
             raise TypeError("List contains non card items")
@@ -127,159 +152,57 @@ class Deck(object):
                 TypeError is raised in non cards are passed
         """
         for card in args:
-            if card is type(Card):
+            if isinstance(card, Card):
                 self.deck.append(card)
             else:
                 raise TypeError('{} is not a valid card'.format(card))
 
-    def shuffle(self):
-        """Shuffles the deck"""
-        random.shuffle(self.deck)
+    def shuffle(self, deal_number=None):
+        """Shuffles the deck
+
+        Args:
+            deal_number (optional, int): arranges the deck in the order
+                given by deal_permutation(deal_number), default is None
+                (random order)
+        """
+        if deal_number is None:
+            random.shuffle(self.deck)
+        else:
+            self.deck = [self.deck[index] for index in
+                         deal_permutation(deal_number, len(self.deck))]
 
     def deal(self):
         """Removes the last card from the deck and returns it"""
         return self.deck.pop()
 
 
-# Tests
-def test_default_card_creation():
-    """Tests if card constructor with no arguments creates the Ace of Spades"""
-    test_card = Card()
-    ace_spades = Card(1, 'Spade')
-    nose.assert_equal(test_card, ace_spades)
-
-
-def test_card_repr_all_52():
-    """Tests creation of all 52 cards"""
-    spades = [Card(x, 'Spade') for x in range(1, 14)]
-    hearts = [Card(x, 'Heart') for x in range(1, 14)]
-    clubs = [Card(x, 'Club') for x in range(1, 14)]
-    diamonds = [Card(x, 'Diamond') for x in range(1, 14)]
-    spades_repr = [repr('Value = 1, Suit = Spade'),
-                   repr('Value = 2, Suit = Spade'),
-                   repr('Value = 3, Suit = Spade'),
-                   repr('Value = 4, Suit = Spade'),
-                   repr('Value = 5, Suit = Spade'),
-                   repr('Value = 6, Suit = Spade'),
-                   repr('Value = 7, Suit = Spade'),
-                   repr('Value = 8, Suit = Spade'),
-                   repr('Value = 9, Suit = Spade'),
-                   repr('Value = 10, Suit = Spade'),
-                   repr('Value = 11, Suit = Spade'),
-                   repr('Value = 12, Suit = Spade'),
-                   repr('Value = 13, Suit = Spade')]
-    hearts_repr = [repr('Value = 1, Suit = Heart'),
-                   repr('Value = 2, Suit = Heart'),
-                   repr('Value = 3, Suit = Heart'),
-                   repr('Value = 4, Suit = Heart'),
-                   repr('Value = 5, Suit = Heart'),
-                   repr('Value = 6, Suit = Heart'),
-                   repr('Value = 7, Suit = Heart'),
-                   repr('Value = 8, Suit = Heart'),
-                   repr('Value = 9, Suit = Heart'),
-                   repr('Value = 10, Suit = Heart'),
-                   repr('Value = 11, Suit = Heart'),
-                   repr('Value = 12, Suit = Heart'),
-                   repr('Value = 13, Suit = Heart')]
-    clubs_repr = [repr('Value = 1, Suit = Club'),
-                  repr('Value = 2, Suit = Club'),
-                  repr('Value = 3, Suit = Club'),
-                  repr('Value = 4, Suit = Club'),
-                  repr('Value = 5, Suit = Club'),
-                  repr('Value = 6, Suit = Club'),
-                  repr('Value = 7, Suit = Club'),
-                  repr('Value = 8, Suit = Club'),
-                  repr('Value = 9, Suit = Club'),
-                  repr('Value = 10, Suit = Club'),
-                  repr('Value = 11, Suit = Club'),
-                  repr('Value = 12, Suit = Club'),
-                  repr('Value = 13, Suit = Club')]
-    diamonds_repr = [repr('Value = 1, Suit = Diamond'),
-                     repr('Value = 2, Suit = Diamond'),
-                     repr('Value = 3, Suit = Diamond'),
-                     repr('Value = 4, Suit = Diamond'),
-                     repr('Value = 5, Suit = Diamond'),
-                     repr('Value = 6, Suit = Diamond'),
-                     repr('Value = 7, Suit = Diamond'),
-                     repr('Value = 8, Suit = Diamond'),
-                     repr('Value = 9, Suit = Diamond'),
-                     repr('Value = 10, Suit = Diamond'),
-                     repr('Value = 11, Suit = Diamond'),
-                     repr('Value = 12, Suit = Diamond'),
-                     repr('Value = 13, Suit = Diamond')]
-    nose.assert_equal([repr(x) for x in spades], spades_repr)
-    nose.assert_equal([repr(x) for x in hearts], hearts_repr)
-    nose.assert_equal([repr(x) for x in clubs], clubs_repr)
-    nose.assert_equal([repr(x) for x in diamonds], diamonds_repr)
-
-
-def test_card_string_all_52():
-    """Tests if the string representation of all cards is correct"""
-    spades = [Card(x, 'Spade') for x in range(1, 14)]
-    hearts = [Card(x, 'Heart') for x in range(1, 14)]
-    clubs = [Card(x, 'Club') for x in range(1, 14)]
-    diamonds = [Card(x, 'Diamond') for x in range(1, 14)]
-    spades_str = ['A S', '2 S', '3 S', '4 S', '5 S', '6 S', '7 S',
-                  '8 S', '9 S', 'T S', 'J S', 'Q S', 'K S']
-    hearts_str = ['A H', '2 H', '3 H', '4 H', '5 H', '6 H', '7 H',
-                  '8 H', '9 H', 'T H', 'J H', 'Q H', 'K H']
-    clubs_str = ['A C', '2 C', '3 C', '4 C', '5 C', '6 C', '7 C',
-                 '8 C', '9 C', 'T C', 'J C', 'Q C', 'K C']
-    diamonds_str = ['A D', '2 D', '3 D', '4 D', '5 D', '6 D', '7 D',
-                    '8 D', '9 D', 'T D', 'J D', 'Q D', 'K D']
-    nose.assert_equal([str(x) for x in spades], spades_str)
-    nose.assert_equal([str(x) for x in hearts], hearts_str)
-    nose.assert_equal([str(x) for x in clubs], clubs_str)
-    nose.assert_equal([str(x) for x in diamonds], diamonds_str)
-
-
-def test_invalid_cards():
-    """Tests if bad values in card creation will raise an exception"""
-    nose.assert_raises(ValueError, Card, 0, 'Spade')
-    nose.assert_raises(ValueError, Card, 1, 'Spades')
-    nose.assert_raises(ValueError, Card, 14, 'SPADE')
-
-
-def test_full_deck_creation():
-    """Tests that all 52 cards are created in order from the
-    default constructor
-    """
-    deck = Deck()
-    full_deck = Deck()
-    full_deck.deck = [Card(value, suit) for suit in
-                      ['Spade', 'Heart', 'Club', 'Diamond']
-                      for value in range(1, 14)]
-    nose.assert_equal(deck.deck, full_deck.deck)
-
-
-def test_deck_shuffle():
-    """Tests that the deck is shuffled each time shuffle() is called"""
-    deck = Deck()
-    deck_str = str(deck)
-    shuffled = str(deck)
-    nose.assert_equal(deck_str, shuffled)
-    for _ in range(10):
-        deck.shuffle()
-        shuffled = str(deck)
-        nose.assert_not_equal(deck_str, shuffled)
-        deck_str = shuffled
-
-
-def test_deck_deal():
-    """Tests that cards are dealt from the end of the deck and removed
-    when dealt
+def deal_permutation(deal_number, size=52):
+    """Returns the permutation of range(size) for deal number deal_number.
+    The deal number is hashed and the hash is used as the rank of a
+    permutation, so any deal can be built directly from its number and
+    the result is the same on every platform and python version
+
+    Args:
+        deal_number (int): a non negative number identifying the deal
+        size (optional, int): the number of cards to arrange, default is 52
     """
-    deck = Deck()
-    nose.assert_equal(Card(13, 'Diamond'), deck.deal())
-    nose.assert_not_equal(Card(13, 'Diamond'), deck.deal())
-    nose.assert_equal(Card(11, 'Diamond'), deck.deal())
+    digest = hashlib.sha512('{0}:{1}'.format(deal_number, size).encode())
+    rank = int(binascii.hexlify(digest.digest()), 16) % _FACTORIALS[size]
+    remaining = list(range(size))
+    permutation = []
+    for radix in range(size, 0, -1):
+        rank, choice = divmod(rank, radix)
+        permutation.append(remaining.pop(choice))
+    return permutation
 
 
-def test_empty_deck():
-    """Tests that IndexError is raised when trying to deal from an
-    empty deck
+def seed_deal_number(seed):
+    """Returns the 64 bit deal number for an arbitrary seed
+
+    Args:
+        seed (int, str or bytes): the seed, equal seeds give equal deals
     """
-    deck = Deck()
-    while len(deck) > 0:
-        deck.deal()
-    nose.assert_raises(IndexError, deck.deal)
+    if not isinstance(seed, bytes):
+        seed = '{0}'.format(seed).encode('utf-8')
+    return int(binascii.hexlify(hashlib.sha256(seed).digest()[:8]), 16)
+
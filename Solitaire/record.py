@@ -0,0 +1,231 @@
+"""Compact binary records of played games
+
+A corpus file starts with MAGIC and holds one record per game:
+
+    deal number     8 bytes, unsigned little endian
+    moves           1 byte each, see below
+    END             1 byte
+    result          1 byte, 1 if the game was won, 0 if not
+
+A move byte is source * 12 + destination using the Solitaire.all_piles
+numbers, the same numbers main.set_input_dict uses: 0 is the draw pile,
+1-7 the tableau piles and 8-11 the foundation piles.  A deal is 0 (source
+and destination both 0), UNDO and REDO stand for undo() and redo().
+Replaying the bytes with Solitaire(deal_number).make_move(), undo() and
+redo() plays the game again.  restore() can not be recorded, a game that
+is restored should not be recorded.
+
+Records are only written when a game is finished, in one append, so several
+processes can add games to the same file.
+
+Functions:
+    encode_move(source, destination): returns the byte of a move
+    decode_move(byte): returns (source, destination), UNDO or REDO
+    encode_record(deal_number, moves, won): returns the bytes of a record
+Classes:
+    GameRecord: a namedtuple of one record
+    RecordWriter: appends finished games to a corpus file
+    GameRecorder: collects the moves of one game for a RecordWriter
+    RecordReader: iterates over the records of a memory mapped corpus file
+"""
+import collections
+import mmap
+import os
+import struct
+
+from .rules import STANDARD
+
+MAGIC = b'SOLREC\x00\x01'
+UNDO = 0xF0
+REDO = 0xF1
+END = 0xFF
+_DEAL_NUMBER = struct.Struct('<Q')
+
+GameRecord = collections.namedtuple('GameRecord',
+                                    'deal_number moves won offset')
+GameRecord.__doc__ = """A recorded game
+
+    deal_number (int): the deal the game was played from
+    moves (bytes): the move bytes
+    won (bool): True if the game was won
+    offset (int): the position of the record in the corpus file
+"""
+
+
+def encode_move(source, destination):
+    return source * 12 + destination
+
+
+def decode_move(byte):
+    """Returns (source, destination) for a move byte, or UNDO or REDO"""
+    if byte == UNDO or byte == REDO:
+        return byte
+    return divmod(byte, 12)
+
+
+def encode_record(deal_number, moves, won):
+    """Returns the bytes of a record
+
+    Args:
+        deal_number (int): the deal, 0 to 2 ** 64 - 1
+        moves (bytes or bytearray): the move bytes
+        won (bool): True if the game was won
+    """
+    if not 0 <= deal_number < 1 << 64:
+        raise ValueError('deal number {0} does not fit in 64 bits'.format(
+            deal_number))
+    return (_DEAL_NUMBER.pack(deal_number) + bytes(moves) +
+            bytes(bytearray((END, 1 if won else 0))))
+
+
+class RecordWriter(object):
+    """Appends finished games to a corpus file, creating the file if needed
+
+    Attributes:
+        path (str): the corpus file
+        games (int): the number of games this writer has appended
+
+    Public Methods:
+        record(game): starts recording a game
+        write(deal_number, moves, won): appends one record
+        close(): finishes the games still being recorded and closes the file
+    """
+    def __init__(self, path):
+        """
+        Args:
+            path (str): the corpus file
+        """
+        self.path = path
+        self.games = 0
+        self._recorders = []
+        self._fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND,
+                           0o644)
+        if os.fstat(self._fd).st_size == 0:
+            os.write(self._fd, MAGIC)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def record(self, game):
+        """Starts recording game and returns its GameRecorder.  The record
+        is written by GameRecorder.finish() or close()
+
+        Args:
+            game (Solitaire): a game that has not been moved yet, played
+                with the standard rules
+        """
+        if game.rules != STANDARD:
+            raise ValueError('only games with the standard rules can be '
+                             'recorded')
+        recorder = GameRecorder(self, game)
+        self._recorders.append(recorder)
+        return recorder
+
+    def write(self, deal_number, moves, won):
+        """Appends one record, see encode_record()"""
+        os.write(self._fd, encode_record(deal_number, moves, won))
+        self.games += 1
+
+    def close(self):
+        while self._recorders:
+            self._recorders[-1].finish()
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class GameRecorder(object):
+    """Collects the move bytes of one game.  Solitaire calls move(), undo()
+    and redo() through its recorder attribute
+
+    Attributes:
+        game (Solitaire): the game being recorded, None once finished
+        moves (bytearray): the move bytes so far
+
+    Public Methods:
+        move(source, destination): records a move or a deal
+        undo(): records an undo
+        redo(): records a redo
+        finish(): writes the record and stops recording
+    """
+    def __init__(self, writer, game):
+        self.writer = writer
+        self.game = game
+        self.moves = bytearray()
+        game.recorder = self
+
+    def move(self, source, destination):
+        self.moves.append(encode_move(source, destination))
+
+    def undo(self):
+        self.moves.append(UNDO)
+
+    def redo(self):
+        self.moves.append(REDO)
+
+    def finish(self):
+        """Writes the record with the game's current result"""
+        if self.game is None:
+            return
+        game = self.game
+        self.game = None
+        game.recorder = None
+        self.writer._recorders.remove(self)
+        self.writer.write(game.deal_number, self.moves, game.check_win())
+
+
+class RecordReader(object):
+    """Iterates over the records of a corpus file.  The file is memory
+    mapped, so only the pages of the records being read are loaded
+
+    Public Methods:
+        record_at(offset): returns the record that starts at offset
+        close(): unmaps the file
+    """
+    def __init__(self, path):
+        """
+        Args:
+            path (str): the corpus file
+        """
+        with open(path, 'rb') as corpus:
+            if os.fstat(corpus.fileno()).st_size < len(MAGIC):
+                raise ValueError('{0} is not a game record file'.format(path))
+            self._map = mmap.mmap(corpus.fileno(), 0,
+                                  access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            self._map.close()
+            raise ValueError('{0} is not a game record file'.format(path))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __iter__(self):
+        offset = len(MAGIC)
+        size = len(self._map)
+        while offset < size:
+            record = self.record_at(offset)
+            yield record
+            offset += _DEAL_NUMBER.size + len(record.moves) + 2
+
+    def record_at(self, offset):
+        """Returns the GameRecord that starts at offset
+
+        Args:
+            offset (int): the offset of a record, see GameRecord.offset
+        """
+        start = offset + _DEAL_NUMBER.size
+        end = self._map.find(b'\xff', start)
+        if end < 0 or end + 1 >= len(self._map):
+            raise ValueError('truncated record at offset {0}'.format(offset))
+        deal_number = _DEAL_NUMBER.unpack_from(self._map, offset)[0]
+        return GameRecord(deal_number, self._map[start:end],
+                          self._map[end + 1] in (1, b'\x01'), offset)
+
+    def close(self):
+        self._map.close()
@@ -0,0 +1,211 @@
+"""Text rendering of a solitaire game
+
+The board is a grid of cells, each cell is a card glyph, a face down
+marker, an empty pile marker or blank, followed by two spaces.  Row 0 holds
+the draw, waste and foundation piles, row 1 is empty and the tableau piles
+start at row 2.  Cells are stored as codes: a card index, FACE_DOWN, EMPTY
+or BLANK, and GLYPHS turns a code into its text.
+
+The glyphs are ANSI escape codes.  init_terminal() makes the terminal
+understand them, with colorama, the first time a Renderer draws a frame,
+so games that are never drawn do not import it.
+
+Functions:
+    board(game): returns the whole board as text, used by Solitaire.__str__
+    init_terminal(): sets the terminal up for ANSI codes, once
+    terminal_rows(): returns the height of the terminal
+Classes:
+    Renderer: keeps the last frame drawn on an ANSI terminal and redraws
+        only the cells that changed
+"""
+import shutil
+import sys
+
+from .playing_cards import CARD_GLYPH
+
+FACE_DOWN, EMPTY, BLANK = 52, 53, 54
+GLYPHS = CARD_GLYPH + ('***', '---', '   ')
+CELLS = tuple(glyph + '  ' for glyph in GLYPHS)
+CELL_WIDTH = 5
+TABLEAU_ROW = 2
+# Rows the prompts, answers and messages of main.py take under the board
+PROMPT_ROWS = 5
+_terminal_ready = False
+
+
+def init_terminal():
+    """Starts colorama so the ANSI codes work on Windows terminals too.
+    Only the first call does anything.  colorama is required on Windows
+    """
+    global _terminal_ready
+    if _terminal_ready:
+        return
+    _terminal_ready = True
+    try:
+        from colorama import init
+        init()
+    except ImportError:
+        if sys.platform.startswith('win'):
+            sys.exit("colorama required for windows use")
+
+
+def terminal_rows():
+    """Returns the number of rows of the terminal, None if it is not known"""
+    try:
+        return shutil.get_terminal_size().lines
+    except AttributeError:      # Python 2
+        return None
+
+
+def top_row(game):
+    """Returns the codes of the draw, waste and foundation piles, with a
+    blank cell between waste and foundation piles
+    """
+    deck = game.deck
+    row = [FACE_DOWN if deck.flip > 0 else EMPTY,
+           deck.pile[deck.flip].index if deck.flip < len(deck.pile)
+           else EMPTY,
+           BLANK]
+    row.extend(home.pile[-1].index if home.pile else EMPTY
+               for home in game.homes)
+    return row
+
+
+def column(pile):
+    """Returns the codes of a tableau pile from the bottom card up"""
+    codes = [FACE_DOWN] * pile.flip
+    codes.extend(card.index for card in pile.pile[pile.flip:])
+    return codes
+
+
+def board(game):
+    """Returns the game as text, empty tableau cells are drawn as EMPTY"""
+    columns = [column(pile) for pile in game.piles]
+    board_lst = [CELLS[code] for code in top_row(game)]
+    board_lst.append('\n\n')
+    for row in range(max(len(codes) for codes in columns)):
+        for codes in columns:
+            board_lst.append(CELLS[codes[row]] if row < len(codes)
+                             else CELLS[EMPTY])
+        board_lst.append('\n')
+    return ''.join(board_lst)
+
+
+class Renderer(object):
+    """Draws a game at the top left of an ANSI terminal.  The first frame
+    clears the screen and draws every cell; later frames only move the
+    cursor to the cells that changed since the last frame and redraw them,
+    so the cost of a frame depends on how much of the board changed.
+    Each frame ends with the cursor below the board and the rest of the
+    screen cleared, ready for the next prompt.
+
+    Cells are drawn at absolute screen rows, so they are only where the
+    last frame left them while nothing scrolled the screen.  Printing
+    below() after each prompt keeps the prompts from piling up under the
+    board, and makes the next frame redraw the whole screen when the
+    terminal is too short to hold the board and the prompts.
+
+    Attributes:
+        top (list of ints): the top row codes of the last frame, None
+            before the first frame
+        columns (list of lists of ints): the tableau codes of the last frame
+        rows (int): the rows of the terminal, None asks the terminal
+        prompt_rows (int): the rows printed under the board between frames
+
+    Public Methods:
+        frame(game): returns the text that updates the terminal to game
+        frames(game, moves): yields a frame after each move
+        below(): returns the text that moves to the line under the board
+        reset(): makes the next frame redraw the whole screen
+    """
+    def __init__(self, rows=None, prompt_rows=PROMPT_ROWS):
+        """
+        Args:
+            rows (optional, int): the rows of the terminal, default is None
+                (asks the terminal when below() is called)
+            prompt_rows (optional, int): the rows printed under the board
+                between frames, default is PROMPT_ROWS
+        """
+        self.top = None
+        self.columns = []
+        self.rows = rows
+        self.prompt_rows = prompt_rows
+
+    def reset(self):
+        self.top = None
+        self.columns = []
+
+    def frame(self, game):
+        """Returns the ANSI text that changes the last frame into game
+
+        Args:
+            game (Solitaire): the game to draw
+        """
+        out = []
+        top = top_row(game)
+        if self.top is None:
+            init_terminal()
+            out.append('\033[2J\033[H')
+            self.top = [None] * len(top)
+            self.columns = [[] for _ in game.piles]
+        for index, code in enumerate(top):
+            if self.top[index] != code:
+                out.append(_cell(0, index, code))
+        self.top = top
+        columns = [column(pile) for pile in game.piles]
+        height = max(len(codes) for codes in columns)
+        old_height = len(self.columns[0])
+        for index, codes in enumerate(columns):
+            codes.extend([EMPTY] * (height - len(codes)))
+            old = self.columns[index]
+            if codes == old:
+                continue
+            for row in range(min(height, old_height)):
+                if old[row] != codes[row]:
+                    out.append(_cell(TABLEAU_ROW + row, index, codes[row]))
+        # Rows the board grows into are drawn whole, rows no pile reaches
+        # any more are cleared
+        for row in range(old_height, height):
+            out.append('\033[{0};1H\033[2K'.format(TABLEAU_ROW + row + 1))
+            out.extend(CELLS[codes[row]] for codes in columns)
+        for row in range(height, old_height):
+            out.append('\033[{0};1H\033[2K'.format(TABLEAU_ROW + row + 1))
+        self.columns = columns
+        out.append('\033[{0};1H\033[J'.format(TABLEAU_ROW + height + 1))
+        return ''.join(out)
+
+    def below(self):
+        """Returns the text that moves the cursor to the line under the last
+        frame and clears the rest of the screen, empty before the first
+        frame.  Printed after every prompt, so prompts do not pile up under
+        the board.  When the terminal has too few rows for the board and
+        prompt_rows more, the prompts may have scrolled the board, and the
+        next frame redraws the whole screen
+        """
+        if not self.columns:
+            return ''
+        height = len(self.columns[0])
+        rows = self.rows if self.rows is not None else terminal_rows()
+        if (rows is not None and
+                TABLEAU_ROW + height + self.prompt_rows >= rows):
+            self.reset()
+        return '\033[{0};1H\033[J'.format(TABLEAU_ROW + height + 1)
+
+    def frames(self, game, moves):
+        """Makes moves on game and yields the frame after each one.  Used
+        to animate moves that were made at once, like cascade_home(), on a
+        copy of the game from before them
+
+        Args:
+            game (Solitaire): the game before the moves, it is changed
+            moves (list of tuples): (source, destination) pile numbers
+        """
+        for move in moves:
+            game.make_move(move)
+            yield self.frame(game)
+
+
+def _cell(row, index, code):
+    """Returns the text that draws code at row of pile column index"""
+    return '\033[{0};{1}H{2}'.format(row + 1, index * CELL_WIDTH + 1,
+                                     GLYPHS[code])
@@ -0,0 +1,233 @@
+"""Rule variants of the solitaire game
+
+A Rules object holds the choices that differ between variants: cards
+dealt at a time, passes through the draw pile, how tableau piles are
+built, what fills an empty tableau pile, which suit each foundation pile
+takes, whether cards may come back from the foundation piles, and scoring.
+They are compiled once, when the Rules are created, into lookup tables
+indexed by card index, so Solitaire checks a move with a table lookup and
+a bit test whatever the variant.
+
+The solver, the batch engine and game records only know the standard
+rules.
+
+Classes:
+    Rules: the rules of a game and their lookup tables
+Constants:
+    STANDARD: draw 3, unlimited passes, the rules Solitaire uses by default
+    DRAW_ONE: draw 1, unlimited passes
+    VEGAS: draw 3, 3 passes, Vegas scoring
+    VEGAS_DRAW_ONE: draw 1, 1 pass, Vegas scoring
+    PRESETS: the rules above by name
+"""
+import struct
+
+from .playing_cards import CARD_COLOR, CARD_SUIT, CARD_VALUE
+
+# The table index of an empty pile, after the 52 card indexes
+EMPTY_PILE = 52
+BUILDS = ('alternate', 'suit', 'any')
+EMPTY_RULES = ('king', 'any')
+SCORINGS = ('cards', 'vegas')
+# draw, passes (0 for no limit), then the indexes of build, empty and
+# scoring in their choices and the two flags
+_PACKED = struct.Struct('<II5B')
+
+
+class Rules(object):
+    """The rules of a game of solitaire
+
+    Attributes:
+        draw (int): the cards dealt from the draw pile at a time
+        passes (int): the passes through the draw pile, None for no limit
+        build (str): how cards are put on tableau piles: 'alternate' for
+            one less in the other color, 'suit' for one less in the same
+            suit, 'any' for one less in any suit
+        empty (str): what can go on an empty tableau pile: 'king' or 'any'
+            card
+        home_suits (bool): True if each foundation pile only takes one
+            suit, Spade, Heart, Club, Diamond from left to right.  False if
+            an ace can start any empty foundation pile
+        from_home (bool): True if cards may be moved from the foundation
+            piles back to the tableau
+        scoring (str): 'cards', one point per card on the foundation piles,
+            or 'vegas', 5 per card less the 52 paid for the deal
+        tableau_accepts (tuple of ints): indexed by the top card index of a
+            tableau pile, or EMPTY_PILE, the bit mask of the card indexes
+            that can be put on it
+        tableau_cards (tuple of tuples): the same as tuples of card indexes
+        build_keys (tuple of ints): indexed by card index, a key that is
+            the same for cards that can be put on the same tableau cards
+        accept_keys (tuple of ints): indexed by the top card index of a
+            tableau pile, the build_keys of the cards it accepts, -1 for
+            none.  legal_moves() finds the piles a card can go on with a
+            dict of accept_keys
+        held_by (tuple of tuples): indexed by card index, the cards it can
+            be put on in the tableau
+        home_accepts (tuple of tuples of ints): home_accepts[home][top] is
+            the bit mask of the card indexes foundation pile home accepts
+            when its top card index is top, or EMPTY_PILE
+
+    Public Methods:
+        standard(): True if the solver knows the rules
+        recycle_allowed(recycles): True if the waste pile can be turned
+            over again
+        score(home_cards): returns the score of a game
+        pack(): returns the rules packed into bytes
+        unpack(data): creates the rules packed by pack()
+    """
+    def __init__(self, draw=3, passes=None, build='alternate', empty='king',
+                 home_suits=False, from_home=True, scoring='cards'):
+        """
+        Args:
+            draw (optional, int): cards dealt at a time, default is 3
+            passes (optional, int): passes through the draw pile, default
+                is None (no limit)
+            build (optional, str): 'alternate', 'suit' or 'any', default is
+                'alternate'
+            empty (optional, str): 'king' or 'any', default is 'king'
+            home_suits (optional, bool): one suit per foundation pile,
+                default is False
+            from_home (optional, bool): cards may leave the foundation
+                piles, default is True
+            scoring (optional, str): 'cards' or 'vegas', default is 'cards'
+        """
+        if draw < 1:
+            raise ValueError('draw must be at least 1, not {0}'.format(draw))
+        if passes is not None and passes < 1:
+            raise ValueError('passes must be at least 1, not {0}'.format(
+                passes))
+        for name, value, choices in (('build', build, BUILDS),
+                                     ('empty', empty, EMPTY_RULES),
+                                     ('scoring', scoring, SCORINGS)):
+            if value not in choices:
+                raise ValueError('{0} must be one of {1}, not {2!r}'.format(
+                    name, ', '.join(choices), value))
+        self.draw = draw
+        self.passes = passes
+        self.build = build
+        self.empty = empty
+        self.home_suits = home_suits
+        self.from_home = from_home
+        self.scoring = scoring
+        self._compile()
+
+    def __repr__(self):
+        return ('Rules(draw={0}, passes={1}, build={2!r}, empty={3!r}, '
+                'home_suits={4}, from_home={5}, scoring={6!r})'.format(
+                    self.draw, self.passes, self.build, self.empty,
+                    self.home_suits, self.from_home, self.scoring))
+
+    def __eq__(self, other):
+        return isinstance(other, Rules) and repr(self) == repr(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(repr(self))
+
+    def __reduce__(self):
+        return Rules, (self.draw, self.passes, self.build, self.empty,
+                       self.home_suits, self.from_home, self.scoring)
+
+    def standard(self):
+        """True if the rules are the standard rules apart from draw and
+        scoring, the rules the solver knows
+        """
+        return (self.passes is None and self.build == 'alternate' and
+                self.empty == 'king' and not self.home_suits and
+                self.from_home)
+
+    def recycle_allowed(self, recycles):
+        """True if the waste pile may be turned over after it has been
+        turned over recycles times
+        """
+        return self.passes is None or recycles < self.passes - 1
+
+    def score(self, home_cards):
+        """Returns the score of a game with home_cards cards on the
+        foundation piles
+        """
+        if self.scoring == 'vegas':
+            return 5 * home_cards - 52
+        return home_cards
+
+    def pack(self):
+        """Returns the rules packed into bytes, unpack() reads them back"""
+        return _PACKED.pack(self.draw, self.passes or 0,
+                            BUILDS.index(self.build),
+                            EMPTY_RULES.index(self.empty),
+                            SCORINGS.index(self.scoring),
+                            self.home_suits, self.from_home)
+
+    @classmethod
+    def unpack(cls, data):
+        """Creates the rules packed by pack()
+
+        Args:
+            data (bytes): rules returned by Rules.pack()
+        """
+        (draw, passes, build, empty, scoring, home_suits,
+         from_home) = _PACKED.unpack(bytes(data))
+        return cls(draw, passes or None, BUILDS[build], EMPTY_RULES[empty],
+                   bool(home_suits), bool(from_home), SCORINGS[scoring])
+
+    def _compile(self):
+        tableau_cards = []
+        for top in range(52):
+            tableau_cards.append(tuple(
+                card for card in range(52)
+                if CARD_VALUE[card] == CARD_VALUE[top] - 1 and
+                self._builds_on(card, top)))
+        tableau_cards.append(tuple(
+            card for card in range(52)
+            if self.empty == 'any' or CARD_VALUE[card] == 13))
+        self.tableau_cards = tuple(tableau_cards)
+        self.tableau_accepts = tuple(_mask(cards) for cards in tableau_cards)
+        if self.build == 'alternate':
+            self.build_keys = tuple(CARD_VALUE[card] * 2 + CARD_COLOR[card]
+                                    for card in range(52))
+        elif self.build == 'suit':
+            self.build_keys = tuple(range(52))
+        else:
+            self.build_keys = CARD_VALUE
+        self.accept_keys = tuple(
+            self.build_keys[tableau_cards[top][0]] if tableau_cards[top]
+            else -1 for top in range(52))
+        self.held_by = tuple(
+            tuple(top for top in range(52) if card in tableau_cards[top])
+            for card in range(52))
+        home_accepts = []
+        for home in range(4):
+            accepts = [_mask([top + 1]) if CARD_VALUE[top] < 13 else 0
+                       for top in range(52)]
+            accepts.append(_mask(
+                card for card in range(52) if CARD_VALUE[card] == 1 and
+                (not self.home_suits or CARD_SUIT[card] == home)))
+            home_accepts.append(tuple(accepts))
+        self.home_accepts = tuple(home_accepts)
+
+    def _builds_on(self, card, top):
+        if self.build == 'alternate':
+            return CARD_COLOR[card] != CARD_COLOR[top]
+        if self.build == 'suit':
+            return CARD_SUIT[card] == CARD_SUIT[top]
+        return True
+
+
+def _mask(cards):
+    mask = 0
+    for card in cards:
+        mask |= 1 << card
+    return mask
+
+
+STANDARD = Rules()
+DRAW_ONE = Rules(draw=1)
+VEGAS = Rules(draw=3, passes=3, scoring='vegas')
+VEGAS_DRAW_ONE = Rules(draw=1, passes=1, scoring='vegas')
+PRESETS = {'standard': STANDARD,
+           'draw-one': DRAW_ONE,
+           'vegas': VEGAS,
+           'vegas-draw-one': VEGAS_DRAW_ONE}
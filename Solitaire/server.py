@@ -0,0 +1,352 @@
+"""asyncio server that hosts many solitaire games over TCP or a Unix socket,
+and a small client to play on it.  Needs Python 3
+
+Every connection gets its own session with its own game and undo journal.
+Sessions are kept in a sessions.SessionStore.  When the server is given a
+directory, sessions outlive their connection and the idle ones are saved
+there until a command uses them again.  Commands are lines using the
+grammar of main.py:
+
+    1 or <blank>: deal
+    2 SOURCE DESTINATION: move cards, piles are 0, 1-7, H1-H4, or H as
+        destination for any foundation pile
+    3: move every card that can go to a foundation pile
+    4: undo
+    5 or 5 N: start a new game, or deal number N
+    a or a S: let AutoMove make a move, or LookaheadMove after looking
+        ahead for S seconds, at most MAX_LOOKAHEAD
+    resume N: continue session N, a game left open by another connection
+    0: quit, ending the session
+
+Every reply is one or more lines followed by a line holding only '.'.
+
+Classes:
+    Session: one game and the commands that play it
+    GameServer: accepts connections and runs their sessions
+    Client: a blocking client, one command at a time
+
+Command line:
+    python -m Solitaire.server serve --port 8765
+    python -m Solitaire.server play --port 8765
+"""
+from __future__ import print_function
+import argparse
+import asyncio
+import socket
+
+from .automove import AutoMove, LookaheadMove
+from .render import init_terminal
+from .sessions import SessionStore
+from .solitaire import Solitaire
+
+END_OF_REPLY = '.'
+# Sessions look ahead in the event loop's default executor, whose threads
+# every connection shares, so keep it short
+MAX_LOOKAHEAD = 2.0
+PILES = dict([('0', 0)] + [(str(number), number) for number in range(1, 8)] +
+             [('h' + str(number), 7 + number) for number in range(1, 5)])
+
+
+class Session(object):
+    """A game played through text commands
+
+    Attributes:
+        session_id (int): the number of the session
+        game (Solitaire): the game being played
+        auto_move (AutoMove): the bot used by the 'a' command
+        lookahead (LookaheadMove): the bot used by the 'a S' command
+        lock (asyncio.Lock): held by GameServer while a command plays, as
+            a command that looks ahead runs in another thread
+
+    Public Methods:
+        command(line): plays a command, returns the reply text
+        looks_ahead(line): True if the command runs LookaheadMove
+        save(): returns the session packed into bytes
+        load(session_id, data): creates the session packed by save()
+    """
+    def __init__(self, session_id, deal_number=None, game=None):
+        self.session_id = session_id
+        self.game = game if game is not None else Solitaire(deal_number)
+        self.auto_move = AutoMove()
+        self.lookahead = LookaheadMove(max_time=1.0, max_nodes=None)
+        self.lock = asyncio.Lock()
+
+    def save(self):
+        """Returns the session packed into bytes, AutoMove's memory of
+        earlier weights and LookaheadMove's of earlier positions are not
+        kept
+        """
+        return self.game.save()
+
+    @classmethod
+    def load(cls, session_id, data):
+        return cls(session_id, game=Solitaire.load(data))
+
+    @staticmethod
+    def looks_ahead(line):
+        selection = line.split()
+        return selection[:1] == ['a'] and len(selection) > 1
+
+    def command(self, line):
+        """Plays one command.  Returns the reply text, without END_OF_REPLY
+
+        Args:
+            line (str): the command
+        """
+        selection = line.split()
+        game = self.game
+        if not selection or selection[0] == '1':
+            game.deal()
+        elif selection[0] == '2':
+            if len(selection) != 3 or selection[1].lower() not in PILES:
+                return 'Usage: 2 SOURCE DESTINATION'
+            piles = game.all_piles
+            source = piles[PILES[selection[1].lower()]]
+            destination = selection[2].lower()
+            if destination == 'h':
+                moved = game.move_home(source)
+            elif destination in PILES and destination != '0':
+                moved = game.move_pile(source, piles[PILES[destination]])
+            else:
+                return 'Usage: 2 SOURCE DESTINATION'
+            if not moved:
+                return 'Illegal move'
+        elif selection[0] == '3':
+            game.cascade_home()
+        elif selection[0] == '4':
+            if not game.undo():
+                return 'Nothing to undo'
+        elif selection[0] == '5':
+            if len(selection) > 1 and selection[1].isdigit():
+                self.game = Solitaire(int(selection[1]))
+            else:
+                self.game = Solitaire()
+            self.auto_move = AutoMove()
+            return 'Deal {0}\n\n{1}'.format(self.game.deal_number,
+                                            self.game)
+        elif selection[0] == 'a':
+            bot = self.auto_move
+            if len(selection) > 1:
+                try:
+                    seconds = float(selection[1])
+                except ValueError:
+                    return 'Usage: a or a SECONDS'
+                if not seconds > 0:
+                    return 'Usage: a or a SECONDS'
+                self.lookahead.max_time = min(seconds, MAX_LOOKAHEAD)
+                bot = self.lookahead
+            if not bot(game):
+                return 'No move'
+        else:
+            return 'Unknown command'
+        if game.check_win():
+            return '{0}\nYOU WIN!!!!'.format(game)
+        return str(game)
+
+
+class GameServer(object):
+    """Runs a Session for every connection on one asyncio event loop
+
+    Attributes:
+        sessions (SessionStore): the sessions by session_id
+        idle_seconds (float): sessions unused this long are saved to disk
+
+    Public Methods:
+        serve(host, port, path): listens on TCP, or on a Unix socket if path
+            is given, until cancelled
+        handle(reader, writer): runs the sessions of one connection
+    """
+    def __init__(self, directory=None, max_sessions=1000, idle_seconds=300):
+        """
+        Args:
+            directory (optional, str): where idle sessions are saved,
+                default is None (sessions end with their connection)
+            max_sessions (optional, int): the most sessions kept in memory
+                when directory is given, default is 1000
+            idle_seconds (optional, float): sessions unused this long are
+                saved when directory is given, default is 300
+        """
+        self.sessions = SessionStore(Session, directory, max_sessions)
+        self.idle_seconds = idle_seconds
+
+    async def serve(self, host='127.0.0.1', port=8765, path=None):
+        if path is not None:
+            server = await asyncio.start_unix_server(self.handle, path)
+        else:
+            server = await asyncio.start_server(self.handle, host, port)
+        spill = asyncio.ensure_future(self._spill_idle())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            spill.cancel()
+
+    async def handle(self, reader, writer):
+        session = Session(self.sessions.next_id())
+        session_id = session.session_id
+        self.sessions.add(session)
+        try:
+            self._reply(writer, 'Session {0}, deal {1}\n\n{2}'.format(
+                session_id, session.game.deal_number, session.game))
+            await writer.drain()
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                selection = line.decode('utf-8', 'replace').split()
+                if selection == ['0']:
+                    self.sessions.remove(session_id)
+                    session_id = None
+                    self._reply(writer, 'Bye')
+                    await writer.drain()
+                    break
+                if selection[:1] == ['resume']:
+                    resume_id = (int(selection[1]) if len(selection) == 2 and
+                                 selection[1].isdigit() else None)
+                    if resume_id not in self.sessions:
+                        self._reply(writer, 'No session {0}'.format(
+                            ' '.join(selection[1:])))
+                    else:
+                        left = self.sessions.peek(session_id)
+                        game = self.sessions.get(resume_id).game
+                        # Keep the session being left only if it can be
+                        # resumed and has been played.  A session saved to
+                        # disk is kept without loading it to look
+                        if resume_id != session_id and (
+                                self.sessions.directory is None or
+                                left is not None and
+                                not left.game.undo_stack):
+                            self.sessions.remove(session_id)
+                        session_id = resume_id
+                        self._reply(writer, 'Session {0}, deal {1}\n\n{2}'
+                                    .format(session_id, game.deal_number,
+                                            game))
+                elif session_id not in self.sessions:
+                    # Another connection quit the session
+                    self._reply(writer, 'Session {0} has ended'.format(
+                        session_id))
+                else:
+                    self._reply(writer, await self._command(
+                        self.sessions.get(session_id), ' '.join(selection)))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            # Without a directory nobody could resume a session
+            if session_id is not None and self.sessions.directory is None:
+                self.sessions.remove(session_id)
+            writer.close()
+
+    @staticmethod
+    async def _command(session, line):
+        """Plays a command of session.  LookaheadMove runs in a thread, so
+        the other connections are not kept waiting
+        """
+        async with session.lock:
+            if session.looks_ahead(line):
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(None, session.command,
+                                                  line)
+            return session.command(line)
+
+    async def _spill_idle(self):
+        while True:
+            await asyncio.sleep(max(self.idle_seconds / 4, 1))
+            self.sessions.spill_idle(self.idle_seconds)
+
+    @staticmethod
+    def _reply(writer, text):
+        writer.write('{0}\n{1}\n'.format(text, END_OF_REPLY).encode('utf-8'))
+
+
+class Client(object):
+    """A blocking client for GameServer, for testing and playing
+
+    Attributes:
+        greeting (str): the reply sent when the connection was made
+
+    Public Methods:
+        command(line): sends a command and returns the reply
+        close(): closes the connection
+    """
+    def __init__(self, host='127.0.0.1', port=8765, path=None):
+        if path is not None:
+            self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._socket.connect(path)
+        else:
+            self._socket = socket.create_connection((host, port))
+        self._file = self._socket.makefile('rwb')
+        self.greeting = self._read()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @staticmethod
+    def looks_ahead(line):
+        selection = line.split()
+        return selection[:1] == ['a'] and len(selection) > 1
+
+    def command(self, line):
+        self._file.write(line.encode('utf-8') + b'\n')
+        self._file.flush()
+        return self._read()
+
+    def close(self):
+        self._file.close()
+        self._socket.close()
+
+    def _read(self):
+        lines = []
+        while True:
+            line = self._file.readline()
+            if not line:
+                break
+            line = line.decode('utf-8').rstrip('\n')
+            if line == END_OF_REPLY:
+                break
+            lines.append(line)
+        return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Host solitaire games, or play on a host')
+    parser.add_argument('mode', choices=('serve', 'play'))
+    parser.add_argument('--host', default='127.0.0.1',
+                        help='default is 127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765,
+                        help='default is 8765')
+    parser.add_argument('--unix', help='use a Unix socket at this path')
+    parser.add_argument('--sessions',
+                        help='keep sessions after disconnect, saving idle '
+                        'ones in this directory')
+    parser.add_argument('--max-sessions', type=int, default=1000,
+                        help='most sessions in memory, default is 1000')
+    parser.add_argument('--idle', type=float, default=300,
+                        help='seconds before an idle session is saved, '
+                        'default is 300')
+    args = parser.parse_args(argv)
+    if args.mode == 'serve':
+        server = GameServer(args.sessions, args.max_sessions, args.idle)
+        try:
+            asyncio.run(server.serve(args.host, args.port, args.unix))
+        except KeyboardInterrupt:
+            pass
+        return
+    init_terminal()
+    with Client(args.host, args.port, args.unix) as client:
+        print(client.greeting)
+        while True:
+            line = input('|1: Deal|2: Move Card|3: Move Cards Home'
+                         '|4: Undo|5:New Game|0: Quit\n: ')
+            reply = client.command(line)
+            print(reply)
+            if line.strip() == '0' or not reply:
+                break
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+"""A store of game sessions that keeps the recently used ones in memory and
+the rest on disk
+
+A session is any object with a session_id attribute, a save() method that
+returns bytes and a load(session_id, data) classmethod, like
+server.Session.  The store keeps at most max_sessions sessions in memory.
+When there are more, or when spill_idle() finds sessions that were not used
+for a while, the least recently used ones are saved to one small file each
+and dropped from memory.  get() loads them again.  A session with a lock
+attribute, like server.Session, is in use while its lock is held and stays
+in memory until it is released.
+
+Classes:
+    SessionStore: the sessions by session_id
+"""
+import collections
+import os
+import time
+
+SUFFIX = '.session'
+
+
+class SessionStore(object):
+    """Sessions by session_id, at most max_sessions of them in memory
+
+    Attributes:
+        directory (str): where sessions are saved, None keeps every session
+            in memory
+        max_sessions (int): the most sessions kept in memory
+        session_class (class): the class that load()s saved sessions
+        saves (int): the number of sessions saved to disk
+        loads (int): the number of sessions loaded from disk
+
+    Public Methods:
+        add(session): adds a new session
+        get(session_id): returns a session, loading it if it was saved
+        peek(session_id): returns a session if it is in memory
+        remove(session_id): forgets a session
+        spill_idle(seconds): saves the sessions not used for seconds
+        in_memory(): returns the number of sessions in memory
+        next_id(): returns a session_id that is not in use
+    """
+    def __init__(self, session_class, directory=None, max_sessions=1000):
+        """
+        Args:
+            session_class (class): the class of the sessions
+            directory (optional, str): where sessions are saved, default is
+                None (every session stays in memory)
+            max_sessions (optional, int): the most sessions kept in memory
+                when directory is given, default is 1000
+        """
+        self.session_class = session_class
+        self.directory = directory
+        self.max_sessions = max_sessions
+        self.saves = 0
+        self.loads = 0
+        self._hot = collections.OrderedDict()    # session_id: (session, used)
+        self._cold = set()
+        if directory is not None:
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+            for name in os.listdir(directory):
+                if name.endswith(SUFFIX) and name[:-len(SUFFIX)].isdigit():
+                    self._cold.add(int(name[:-len(SUFFIX)]))
+        self._last_id = max(self._cold) if self._cold else 0
+
+    def __len__(self):
+        return len(self._hot) + len(self._cold)
+
+    def __contains__(self, session_id):
+        return session_id in self._hot or session_id in self._cold
+
+    def in_memory(self):
+        """Returns the number of sessions in memory"""
+        return len(self._hot)
+
+    def next_id(self):
+        self._last_id += 1
+        return self._last_id
+
+    def add(self, session):
+        self._last_id = max(self._last_id, session.session_id)
+        self._hot[session.session_id] = (session, time.time())
+        self._spill_over()
+
+    def get(self, session_id):
+        """Returns the session, loading it from disk if it was saved and
+        marking it as recently used.  Raises KeyError for an unknown
+        session_id
+        """
+        if session_id in self._hot:
+            session = self._hot.pop(session_id)[0]
+        elif session_id in self._cold:
+            path = self._path(session_id)
+            with open(path, 'rb') as session_file:
+                session = self.session_class.load(session_id,
+                                                  session_file.read())
+            os.remove(path)
+            self._cold.remove(session_id)
+            self.loads += 1
+        else:
+            raise KeyError(session_id)
+        self._hot[session_id] = (session, time.time())
+        self._spill_over()
+        return session
+
+    def peek(self, session_id):
+        """Returns the session if it is in memory, else None.  Neither loads
+        it nor marks it as recently used
+        """
+        entry = self._hot.get(session_id)
+        return entry[0] if entry is not None else None
+
+    def remove(self, session_id):
+        if session_id in self._hot:
+            del self._hot[session_id]
+        elif session_id in self._cold:
+            os.remove(self._path(session_id))
+            self._cold.remove(session_id)
+
+    def spill_idle(self, seconds):
+        """Saves the sessions that were not used for seconds.  Returns the
+        number of sessions saved
+        """
+        if self.directory is None:
+            return 0
+        oldest = time.time() - seconds
+        count = 0
+        for session_id, (session, used) in list(self._hot.items()):
+            if used > oldest:
+                break
+            if not _in_use(session):
+                self._spill(session_id)
+                count += 1
+        return count
+
+    def _spill_over(self):
+        """Saves the least recently used sessions beyond max_sessions that
+        are not in use
+        """
+        if self.directory is None:
+            return
+        excess = len(self._hot) - self.max_sessions
+        for session_id, (session, _) in list(self._hot.items()):
+            if excess <= 0:
+                break
+            if not _in_use(session):
+                self._spill(session_id)
+                excess -= 1
+
+    def _spill(self, session_id):
+        session = self._hot.pop(session_id)[0]
+        path = self._path(session_id)
+        with open(path + '.tmp', 'wb') as session_file:
+            session_file.write(session.save())
+        os.rename(path + '.tmp', path)
+        self._cold.add(session_id)
+        self.saves += 1
+
+    def _path(self, session_id):
+        return os.path.join(self.directory, str(session_id) + SUFFIX)
+
+
+def _in_use(session):
+    """Returns True if session has a lock that is held"""
+    lock = getattr(session, 'lock', None)
+    return lock is not None and lock.locked()
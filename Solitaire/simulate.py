@@ -0,0 +1,237 @@
+"""Headless batch runner that plays numbered deals to completion with
+AutoMove, or LookaheadMove, across a pool of worker processes
+
+Functions:
+    play_game(deal_number, max_moves, writer, lookahead, move_time, rules,
+        stats): plays one deal, returns (won, moves, score)
+    simulate(n_games, workers, start, max_moves, record, lookahead,
+        move_time, rules, stats_path, stats_interval): plays a range of
+        deals and returns the win rate, moves and score per game, games per
+        second and a stats.GameStats of the games
+
+Command line:
+    python -m Solitaire.simulate 100000 --workers 8 --start 0
+    python -m Solitaire.simulate 1000 --lookahead 2000
+    python -m Solitaire.simulate 10000 --rules vegas
+    python -m Solitaire.simulate 100000000 --stats run.json --stats-interval 60
+"""
+from __future__ import print_function, division
+import argparse
+import collections
+import multiprocessing
+import time
+
+from .automove import AutoMove, LookaheadMove
+from .record import RecordWriter
+from .rules import PRESETS, STANDARD
+from .solitaire import Solitaire
+from .stats import METRICS, GameStats
+
+
+def play_game(deal_number, max_moves=1000, writer=None, lookahead=None,
+              move_time=None, rules=None, stats=None):
+    """Plays a deal with AutoMove until it is won, AutoMove has no move,
+    a position repeats or max_moves moves have been made.
+    Returns (won, moves, score)
+
+    Args:
+        deal_number (int): the deal to play
+        max_moves (optional, int): the most moves to make, default is 1000
+        writer (optional, record.RecordWriter): records the game, default
+            is None
+        lookahead (optional, int): play with LookaheadMove, making at most
+            this many rollout moves per move.  Its rollouts are seeded with
+            deal_number so games can be played again.  Default is None
+            (AutoMove)
+        move_time (optional, float): play with LookaheadMove, looking ahead
+            at most this many seconds per move, default is None
+        rules (optional, rules.Rules): the rule variant, default is None
+            (rules.STANDARD).  Only standard games can be recorded
+        stats (optional, stats.GameStats): the game is added to it, default
+            is None
+    """
+    game = Solitaire(deal_number, rules=rules)
+    if writer is not None:
+        recorder = writer.record(game)
+    if lookahead is None and move_time is None:
+        auto_move = AutoMove()
+    else:
+        auto_move = LookaheadMove(move_time, lookahead, seed=deal_number)
+    seen = set()
+    moves = 0
+    ending = 'max_moves'
+    while moves < max_moves:
+        if game.check_win():
+            ending = 'won'
+            break
+        position = game.state_hash
+        if position in seen:
+            ending = 'repeat'
+            break
+        seen.add(position)
+        if not auto_move(game):
+            ending = 'no_move'
+            break
+        moves += 1
+    else:
+        if game.check_win():
+            ending = 'won'
+    if writer is not None:
+        recorder.finish()
+    if stats is not None:
+        stats.add(game, moves, ending)
+    return ending == 'won', moves, game.score()
+
+
+def _play_range(args):
+    """Worker task: plays the deals in range(start, stop).
+    Returns their GameStats
+    """
+    start, stop, max_moves, record, lookahead, move_time, rules = args
+    writer = RecordWriter(record) if record else None
+    stats = GameStats()
+    try:
+        for deal_number in range(start, stop):
+            play_game(deal_number, max_moves, writer, lookahead, move_time,
+                      rules, stats)
+    finally:
+        if writer is not None:
+            writer.close()
+    return stats
+
+
+def _imap_bounded(pool, function, tasks, window):
+    """Like pool.imap(), but takes at most window tasks from the tasks
+    iterator ahead of the results, so the tasks are never all in memory
+    """
+    pending = collections.deque()
+    for task in tasks:
+        if len(pending) >= window:
+            yield pending.popleft().get()
+        pending.append(pool.apply_async(function, (task,)))
+    while pending:
+        yield pending.popleft().get()
+
+
+def simulate(n_games, workers=None, start=0, max_moves=1000, chunk_size=250,
+             record=None, lookahead=None, move_time=None, rules=None,
+             stats_path=None, stats_interval=60.0):
+    """Plays deals start to start + n_games - 1 and returns a dict with the
+    keys games, wins, win_rate, moves_per_game, score_per_game, seconds,
+    games_per_second and stats, the GameStats of every game.  The games
+    are summarised as the workers finish them, so memory does not grow
+    with n_games
+
+    Args:
+        n_games (int): the number of deals to play
+        workers (optional, int): the number of worker processes, default
+            is None (one per cpu).  1 plays every game in this process
+        start (optional, int): the first deal number, default is 0
+        max_moves (optional, int): the most moves per game, default is 1000
+        chunk_size (optional, int): the number of deals sent to a worker
+            at a time, default is 250
+        record (optional, str): a corpus file the games are appended to,
+            see record.py, default is None
+        lookahead (optional, int): the rollout moves per move of
+            LookaheadMove, see play_game(), default is None (AutoMove)
+        move_time (optional, float): the seconds per move of LookaheadMove,
+            see play_game(), default is None
+        rules (optional, rules.Rules): the rule variant, default is None
+            (rules.STANDARD).  Records only hold standard games
+        stats_path (optional, str): GameStats.save() writes the games
+            played so far to this CSV or JSON file every stats_interval
+            seconds and at the end, default is None
+        stats_interval (optional, float): seconds between saves of
+            stats_path, default is 60
+    """
+    if record and rules is not None and rules != STANDARD:
+        raise ValueError('only games with the standard rules can be recorded')
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    if record:
+        RecordWriter(record).close()    # Writes the header once
+    tasks = ((first, min(first + chunk_size, start + n_games), max_moves,
+              record, lookahead, move_time, rules)
+             for first in range(start, start + n_games, chunk_size))
+    stats = GameStats()
+    began = saved = time.time()
+    pool = None
+    if workers == 1:
+        results = (_play_range(task) for task in tasks)
+    else:
+        pool = multiprocessing.Pool(workers)
+        results = _imap_bounded(pool, _play_range, tasks, 2 * workers)
+    try:
+        for result in results:
+            stats.merge(result)
+            if stats_path and time.time() - saved >= stats_interval:
+                stats.save(stats_path)
+                saved = time.time()
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    seconds = time.time() - began
+    if stats_path:
+        stats.save(stats_path)
+    games = stats.games
+    return {'games': games,
+            'wins': stats.wins,
+            'win_rate': stats.wins / games if games else 0.0,
+            'moves_per_game': stats.moves / games if games else 0.0,
+            'score_per_game': stats.score / games if games else 0.0,
+            'seconds': seconds,
+            'games_per_second': games / seconds if seconds else 0.0,
+            'stats': stats}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Play numbered deals with AutoMove and report the win '
+        'rate')
+    parser.add_argument('games', type=int, help='number of deals to play')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='worker processes, default is one per cpu')
+    parser.add_argument('--start', type=int, default=0,
+                        help='first deal number, default is 0')
+    parser.add_argument('--max-moves', type=int, default=1000,
+                        help='most moves per game, default is 1000')
+    parser.add_argument('--record', help='append the games to a record file')
+    parser.add_argument('--lookahead', type=int, default=None,
+                        help='play with LookaheadMove, making at most this '
+                        'many rollout moves per move')
+    parser.add_argument('--move-time', type=float, default=None,
+                        help='play with LookaheadMove, looking ahead at most '
+                        'this many seconds per move')
+    parser.add_argument('--rules', choices=sorted(PRESETS),
+                        default='standard',
+                        help='the rule variant, default is standard')
+    parser.add_argument('--stats',
+                        help='save the game statistics to this .csv or .json '
+                        'file as the games are played')
+    parser.add_argument('--stats-interval', type=float, default=60.0,
+                        help='seconds between saves of --stats, default is 60')
+    args = parser.parse_args(argv)
+    result = simulate(args.games, args.workers, args.start, args.max_moves,
+                      record=args.record, lookahead=args.lookahead,
+                      move_time=args.move_time, rules=PRESETS[args.rules],
+                      stats_path=args.stats,
+                      stats_interval=args.stats_interval)
+    print('Games:          {0}'.format(result['games']))
+    print('Wins:           {0} ({1:.2%})'.format(result['wins'],
+                                                 result['win_rate']))
+    print('Moves per game: {0:.1f}'.format(result['moves_per_game']))
+    print('Score per game: {0:.1f}'.format(result['score_per_game']))
+    print('Games / second: {0:.1f}'.format(result['games_per_second']))
+    print('{0:<20}{1:>10}{2:>8}{3:>6}{4:>6}{5:>6}{6:>6}'.format(
+        'Metric', 'Count', 'Mean', 'p50', 'p90', 'p99', 'Max'))
+    for metric in METRICS:
+        summary = result['stats'].histograms[metric].summary()
+        if summary['count']:
+            print('{0:<20}{1:>10}{2:>8.1f}{3:>6}{4:>6}{5:>6}{6:>6}'.format(
+                metric, summary['count'], summary['mean'], summary['p50'],
+                summary['p90'], summary['p99'], summary['max']))
+
+
+if __name__ == '__main__':
+    main()
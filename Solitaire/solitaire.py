@@ -4,7 +4,20 @@ Classes:
     CardPile: a list of cards with a divider
     Solitaire: The solitaire game
 """
-from .playing_cards import Deck
+import heapq
+import random
+import struct
+
+from .canonical import canonical_key
+from .playing_cards import (CARD_SUIT, CARD_VALUE, CARDS, Deck,
+                            seed_deal_number)
+from .render import board
+from .rules import EMPTY_PILE, STANDARD, Rules
+from .zobrist import BOTTOM, CARD_KEYS, FLIP_KEYS
+
+ALL_PILES = 0xfff
+# Source and destination of the journal entry that closes a batch of moves
+BATCH = 12
 
 
 class CardPile(object):
@@ -17,9 +30,14 @@ class CardPile(object):
     Attributes:
         pile (list of Cards): the list of cards in the pile
         flip (int): the index where the cards flip from face down to face up
+        game (Solitaire): the game whose state_hash and pile_versions are
+            updated when the pile changes, None for a pile that is not in a
+            game
+        number (int): the number of the pile in game.all_piles
 
     Public Methods:
         update(): flips the top card face up if it was face down
+        set_flip(flip): changes where the face up cards start
         get_face_up(): iterates through the list of face up cards
         move_card(source_pile, index): moves single card to end of pile
         move_cards(source_pile, index): moves multiple cards to end of pile
@@ -37,6 +55,8 @@ class CardPile(object):
 
         self.pile = []
         self.flip = 0
+        self.game = None
+        self.number = 0
         if deck is not None:
             if amount <= 0:
                 amount = len(deck)
@@ -64,7 +84,21 @@ class CardPile(object):
     def update(self):
         """Flips over top card if face down"""
         if self.pile and self.flip > len(self.pile) - 1:
-            self.flip -= 1
+            self.set_flip(self.flip - 1)
+
+    def set_flip(self, flip):
+        """Sets the index where the face up cards start
+
+        Args:
+            flip (int): the new flip
+        """
+        game = self.game
+        if game is not None:
+            game.state_hash ^= (FLIP_KEYS[self.number * 53 + self.flip] ^
+                                FLIP_KEYS[self.number * 53 + flip])
+            game.version += 1
+            game.pile_versions[self.number] = game.version
+        self.flip = flip
 
     def get_face_up(self):
         """creates an iterator that returns tuples containing
@@ -75,15 +109,30 @@ class CardPile(object):
             yield (self.pile[index], index)
             index += 1
 
-    def move_card(self, source_pile, index):
+    def move_card(self, source_pile, index, position=None):
         """Move a single card from source_pile to the end of the pile
 
         Args:
             source_pile (CardPile): the pile that the cards will be moved from
             index (int): the index of the card in source_pile that will be
                 moved
+            position (optional, int): the index the card is inserted at,
+                default is None (end of the pile)
         """
-        self.pile.append(source_pile.pile.pop(index))
+        game = self.game
+        if game is not None:
+            if index < 0:
+                index += len(source_pile.pile)
+            card = source_pile.pile[index].index
+            game.state_hash ^= (source_pile._removal_key(index) ^
+                                self._insertion_key(card, position))
+            game.version += 1
+            game.pile_versions[self.number] = game.version
+            game.pile_versions[source_pile.number] = game.version
+        if position is None:
+            self.pile.append(source_pile.pile.pop(index))
+        else:
+            self.pile.insert(position, source_pile.pile.pop(index))
 
     def move_cards(self, source_pile, index):
         """Move multiple cards from source_pile.  This will move all cards
@@ -94,9 +143,49 @@ class CardPile(object):
             index (int): the index of the first card in source_pile that will
                 be moved
         """
+        game = self.game
+        if game is not None:
+            card = source_pile.pile[index].index
+            game.state_hash ^= (
+                CARD_KEYS[card * 64 + source_pile._under(index)] ^
+                CARD_KEYS[card * 64 + self._under(len(self.pile))])
+            game.version += 1
+            game.pile_versions[self.number] = game.version
+            game.pile_versions[source_pile.number] = game.version
         self.pile.extend(source_pile[index:])
         del source_pile.pile[index:]
 
+    def _under(self, index):
+        """Returns what the card at index sits on: the index of the card
+        below it or BOTTOM + number
+        """
+        if index > 0:
+            return self.pile[index - 1].index
+        return BOTTOM + self.number
+
+    def _removal_key(self, index):
+        """Returns the hash change of taking out the card at index"""
+        card = self.pile[index].index
+        under = self._under(index)
+        key = CARD_KEYS[card * 64 + under]
+        if index + 1 < len(self.pile):
+            above = self.pile[index + 1].index
+            key ^= CARD_KEYS[above * 64 + card] ^ CARD_KEYS[above * 64 + under]
+        return key
+
+    def _insertion_key(self, card, position):
+        """Returns the hash change of putting card index card at position,
+        None is the end of the pile
+        """
+        if position is None:
+            position = len(self.pile)
+        under = self._under(position)
+        key = CARD_KEYS[card * 64 + under]
+        if position < len(self.pile):
+            above = self.pile[position].index
+            key ^= CARD_KEYS[above * 64 + under] ^ CARD_KEYS[above * 64 + card]
+        return key
+
 
 class Solitaire(object):
     """A simple text based solitaire game
@@ -108,20 +197,84 @@ class Solitaire(object):
             the foundation piles of a solitaire game
         deck (CardPile): a CardPile that doubles as the draw pile and
             the waste pile
+        deal_number (int): the deal the game was created from, None if the
+            game was created from a snapshot
+        undo_stack (list of tuples): the journal of moves that undo() reverts
+        redo_stack (list of tuples): the journal of undone moves that redo()
+            applies again.  Cleared when a new move is made
+        state_hash (int): 64 bit Zobrist hash of the position, kept up to
+            date by the CardPile methods.  Equal positions have equal hashes
+        recorder (record.GameRecorder): told about every move, deal, undo
+            and redo, None if the game is not being recorded
+        version (int): counts the changes made to the piles
+        pile_versions (list of ints): the version of the last change to
+            every pile in all_piles order, see changed_piles()
+        rules (rules.Rules): the rule variant played
+        recycles (int): the times the waste pile was turned over, counted
+            against rules.passes.  It is not part of a snapshot(), restore()
+            keeps it and load() counts it from the undo journal
+
+    Every journal entry is a tuple (source, destination, count, flipped)
+    using the all_piles numbering.  A deal is (0, 0, count, recycled) where
+    count is the number of cards moved between draw and waste pile and
+    recycled is True when the waste pile was turned over.  For moves,
+    flipped is True when the move turned over a face down card.  The moves
+    of cascade_home() are followed by (BATCH, BATCH, count, False), so
+    undo() and redo() take the count moves before it back as one.
 
     Public Methods:
-        deal(amount):  moves cards from draw pile to waste pile, default 3
+        deal(amount):  moves cards from draw pile to waste pile, default
+            rules.draw
         move_pile(source_pile, destination_pile): move cards between piles
         move_home(source_pile): move card to foundation piles
+        cascade_home(safe_only): moves every card it can to the foundation
+            piles as one undoable move
         check_win(): returns True if game has been completed
+        score(): returns the score under the rules
+        legal_moves(piles): returns every legal (source, destination) move
+        changed_piles(since): returns the piles changed after a version
+        make_move(move): makes a (source, destination) move
+        solve(thoughtful, max_nodes, max_time, table_size, overflow,
+            checkpoint): searches for a win
+        estimate_win_probability(n_samples, workers): estimates the chance
+            of a win when the face down cards are unknown
+        undo(): reverts the last move
+        redo(): applies the last undone move again
+        snapshot(): returns the position packed into a bytes object
+        canonical_key(): returns a key that is the same for positions that
+            only differ in the order of the tableau or foundation piles
+        restore(state): returns the game to a position from snapshot()
+        save(): returns the game and its journals packed into bytes
+        load(data): creates the game packed by save()
+        rehash(): recomputes state_hash after piles were changed directly
     """
-    def __init__(self):
+    def __init__(self, deal_number=None, seed=None, rules=None):
         """Initiates a solitaire game.  Deals out the 7 tableau piles and
         flips over the top card.  Creates the 4 CardPiles that will be the
         foundation piles.  Deals the remaining cards to the draw pile
+
+        Args:
+            deal_number (optional, int): the deal to play, the same number
+                always gives the same game, default is None (random deal)
+            seed (optional, int, str or bytes): used instead of deal_number
+                to pick the deal, default is None
+            rules (optional, rules.Rules): the rule variant, default is
+                None (rules.STANDARD)
         """
+        if seed is not None:
+            deal_number = seed_deal_number(seed)
+        elif deal_number is None:
+            deal_number = random.getrandbits(64)
+        self.deal_number = deal_number
+        self.rules = rules if rules is not None else STANDARD
+        self.recycles = 0
+        self.undo_stack = []
+        self.redo_stack = []
+        self.recorder = None
+        self.version = 0
+        self.pile_versions = [0] * 12
         deck = Deck()
-        deck.shuffle()
+        deck.shuffle(deal_number)
         self.piles = [CardPile(deck, 1), CardPile(deck, 2),
                       CardPile(deck, 3), CardPile(deck, 4),
                       CardPile(deck, 5), CardPile(deck, 6),
@@ -129,54 +282,68 @@ class Solitaire(object):
         self._update()
         self.homes = [CardPile(), CardPile(), CardPile(), CardPile()]
         self.deck = CardPile(deck)
+        self.rehash()
+
+    @classmethod
+    def from_snapshot(cls, state, rules=None, recycles=0):
+        """Creates a game in the position returned by snapshot() without
+        dealing a new deck
+
+        Args:
+            state (bytes): a position returned by Solitaire.snapshot()
+            rules (optional, rules.Rules): the rule variant, default is
+                None (rules.STANDARD)
+            recycles (optional, int): the times the waste pile has been
+                turned over, default is 0
+        """
+        game = cls.__new__(cls)
+        game.deal_number = None
+        game.rules = rules if rules is not None else STANDARD
+        game.recycles = recycles
+        game.undo_stack = []
+        game.redo_stack = []
+        game.recorder = None
+        game.version = 0
+        game.pile_versions = [0] * 12
+        game.deck = CardPile()
+        game.piles = [CardPile() for _ in range(7)]
+        game.homes = [CardPile() for _ in range(4)]
+        game.restore(state)
+        return game
+
+    @property
+    def all_piles(self):
+        """The 12 piles in input order: draw pile, tableau piles, then
+        foundation piles
+        """
+        return [self.deck] + self.piles + self.homes
 
     def __str__(self):
-        board_lst = []
-        # Draw Pile
-        if self.deck.flip > 0:
-            board_lst.append('***  ')
-        else:
-            board_lst.append('---  ')
-        # Waste Pile
-        if self.deck.flip < len(self.deck):
-            board_lst.extend(
-                [str(next(self.deck.get_face_up())[0]), '  '])
-        else:
-            board_lst.append('---  ')
-        board_lst.append('     ')
-        # Foundation Piles
-        for index in range(4):
-            if len(self.homes[index].pile):
-                board_lst.extend([str(self.homes[index].pile[-1]), '  '])
-            else:
-                board_lst.append('---  ')
-        board_lst.append('\n\n')
-        for row in range(max([len(pile) for pile in self.piles])):
-            for column in range(7):
-                if self.piles[column].flip > row:
-                    board_lst.append('***  ')
-                elif len(self.piles[column]) > row:
-                    board_lst.extend([str(self.piles[column][row]), '  '])
-                else:
-                    board_lst.append('---  ')
-            board_lst.append('\n')
-        return ''.join(board_lst)
-
-    def deal(self, amount=3):
+        return board(self)
+
+    def deal(self, amount=None):
         """Deals cards from the draw pile to the waste pile.  If all cards
         will be dealt, only deals to the end of the pile.  If all cards have
-        been dealt, all cards are moved from waste to draw pile
+        been dealt, all cards are moved from waste to draw pile, unless the
+        rules allow no more passes.  Returns False if no cards could move
 
         Args:
             amount (optional, int): amount of cards to be moved from draw
-                to waste, default is 3 cards
+                to waste, default is None (rules.draw cards)
         """
+        if amount is None:
+            amount = self.rules.draw
+        flip = self.deck.flip
         if self.deck.flip == 0:        # All cards have been dealt
-            self.deck.flip = len(self.deck)
-        else:
-            self.deck.flip -= amount   # Deal, at most, amount cards
-            if self.deck.flip < 0:
-                self.deck.flip = 0
+            if not self.rules.recycle_allowed(self.recycles):
+                return False
+            self.deck.set_flip(len(self.deck))
+        else:                          # Deal, at most, amount cards
+            self.deck.set_flip(max(self.deck.flip - amount, 0))
+        if self.deck.flip != flip:
+            if flip == 0:
+                self.recycles += 1
+            self._record((0, 0, abs(self.deck.flip - flip), flip == 0))
         return True
 
     def move_pile(self, source_pile, destination_pile, move=True):
@@ -193,62 +360,43 @@ class Solitaire(object):
             move (Bool) : If True, then move is completed, otherwise only
                 move validity is returned
         """
-        if source_pile.flip == len(source_pile):
+        if (source_pile.flip == len(source_pile) or
+                source_pile is destination_pile):
             return False
-        cross_color = {'Spade': ['Heart', 'Diamond'],
-                       'Heart': ['Spade', 'Club'],
-                       'Club': ['Heart', 'Diamond'],
-                       'Diamond': ['Spade', 'Club']}
-        if len(destination_pile.pile) > 0:    # Check for empty pile
-            destination_card = destination_pile[-1]  # Set top card
-            if source_pile is self.deck or destination_pile in self.homes:
-                source_card = source_pile[-1]
-                if source_pile is self.deck:
-                    source_card = source_pile[source_pile.flip]
-                if ((destination_pile in self.homes and
-                        source_card.suit == destination_card.suit and
-                        source_card.value == destination_card.value + 1) or
-                    (destination_pile not in self.homes and
-                        source_card.value == destination_card.value - 1 and
-                        destination_card.suit in
-                        cross_color[source_card.suit])):
-                    if move:
-                        destination_pile.move_card(source_pile, source_pile.index(source_card))
-                        self._update()
-                    return True
-            else:
-                for card in source_pile.get_face_up():
-                    if (card[0].value == destination_card.value - 1 and
-                            destination_card.suit in
-                            cross_color[card[0].suit]):
-                        if move:
-                            destination_pile.move_cards(source_pile, card[1])
-                            self._update()
-                        return True
-        # Source card is King or Ace and destination is empty
+        rules = self.rules
+        pile = source_pile.pile
+        top = destination_pile.pile[-1].index if destination_pile.pile \
+            else EMPTY_PILE
+        if destination_pile in self.homes:
+            home = self.homes.index(destination_pile)
+            accepts = rules.home_accepts[home][top]
         else:
-            if destination_pile in self.homes:
-                source_card = (source_pile[-1], -1)
-                if source_pile is self.deck:
-                    source_card = next(source_pile.get_face_up())
-            else:
-                source_card = next(source_pile.get_face_up())
-            if ((destination_pile in self.piles and source_card[0].value == 13) or
-                    (destination_pile in self.homes and source_card[0].value == 1)):
+            accepts = rules.tableau_accepts[top]
+        # Only the top card can be moved from waste or foundation piles,
+        # or to a foundation pile
+        if source_pile is self.deck:
+            indexes = (source_pile.flip,)
+        elif source_pile in self.homes:
+            # Cards from foundation piles only go on tableau cards
+            if not rules.from_home or not destination_pile.pile:
+                return False
+            indexes = (len(pile) - 1,)
+        elif destination_pile in self.homes:
+            indexes = (len(pile) - 1,)
+        else:
+            indexes = range(source_pile.flip, len(pile))
+        for index in indexes:
+            if accepts >> pile[index].index & 1:
                 if move:
-                    if source_pile is self.deck or destination_pile in self.homes:
-                        destination_pile.move_card(source_pile, source_card[1])
-                    else:
-                        destination_pile.move_cards(source_pile, source_card[1])
-                    self._update()
+                    self._move(source_pile, destination_pile, index)
                 return True
-            return False
+        return False
 
     def move_home(self, source_pile, move=True):
         """Move card from source_pile to a foundation pile. Foundation pile
-        is determined by suit of top card on source pile.  The order is
-        Spade, Heart, Club, Diamond.  Returns True if move was successful,
-        False if move was illegal
+        is determined by suit of top card on source pile: the pile holding
+        the suit, or else the first empty pile the rules let the ace start.
+        Returns True if move was successful, False if move was illegal
 
         Args:
             source_pile (CardPile): the CardPile where the card will be
@@ -263,32 +411,504 @@ class Solitaire(object):
         # Card is face up card on waste pile
         if source_pile is self.deck:
             source_index = source_pile.flip
-        source_card = source_pile[source_index]
-        destination_pile = None
-        for pile in self.homes:
-            if len(pile) > 0 and pile[0].suit == source_card.suit:
-                destination_pile = pile
-                break
-        if destination_pile is None:
-            for pile in self.homes:
-                if len(pile) == 0:
-                    destination_pile = pile
-                    break
-        if ((len(destination_pile) == 0 and source_card.value == 1) or
-                (len(destination_pile) > 0 and
-                 source_card.value == destination_pile[-1].value + 1)):
-            if move:
-                destination_pile.move_card(source_pile, source_index)
-                self._update()
-            return True
+        card = source_pile[source_index].index
+        for home, destination_pile in enumerate(self.homes):
+            top = destination_pile.pile[-1].index if destination_pile.pile \
+                else EMPTY_PILE
+            if self.rules.home_accepts[home][top] >> card & 1:
+                if move:
+                    self._move(source_pile, destination_pile, source_index)
+                return True
         return False
 
+    def cascade_home(self, safe_only=False):
+        """Moves cards from the tableau piles and the waste pile to the
+        foundation piles until none can go, in the order repeated
+        move_home() calls would: the first tableau pile that has a card to
+        move, else the waste pile.  The moves are journaled as one, a
+        single undo() takes them all back.  Returns the (source,
+        destination) pile numbers of the moves, see all_piles
+
+        Args:
+            safe_only (optional, bool): only move cards that no card will
+                ever need to be put on: aces, twos, and cards whose every
+                card the rules let be put on them is on a foundation pile
+                already.  Default is False
+        """
+        piles = self.all_piles
+        rules = self.rules
+        heights = [0] * 4
+        homes = [None] * 4
+        for number in range(8, 12):
+            pile = piles[number].pile
+            if pile:
+                suit = CARD_SUIT[pile[0].index]
+                heights[suit] = len(pile)
+                homes[suit] = number
+        free = [number for number in range(8, 12) if not piles[number].pile]
+
+        def top(number):
+            """Returns the card index on top of a source pile, or -1"""
+            pile = piles[number]
+            if pile.flip >= len(pile.pile):
+                return -1
+            return pile.pile[pile.flip if number == 0 else -1].index
+
+        def playable(card):
+            suit = CARD_SUIT[card]
+            value = CARD_VALUE[card]
+            if value != heights[suit] + 1:
+                return False
+            return (not safe_only or value <= 2 or
+                    all(heights[CARD_SUIT[other]] >= value - 1
+                        for other in rules.tableau_cards[card]))
+
+        # Sources are keyed so the waste pile comes after the tableau piles
+        tops = {}
+        waiting = []
+        for number in range(8):
+            card = top(number)
+            if card >= 0:
+                tops[card] = number
+                if playable(card):
+                    waiting.append(number or 8)
+        heapq.heapify(waiting)
+        moves = []
+        while waiting:
+            number = heapq.heappop(waiting) % 8
+            card = top(number)
+            if card < 0 or tops.get(card) != number or not playable(card):
+                continue    # Already moved, or queued twice
+            suit = CARD_SUIT[card]
+            if homes[suit] is None:
+                homes[suit] = next(
+                    home for home in free
+                    if rules.home_accepts[home - 8][EMPTY_PILE] >> card & 1)
+                free.remove(homes[suit])
+            del tops[card]
+            self._move(piles[number], piles[homes[suit]],
+                       piles[number].flip if number == 0 else -1)
+            heights[suit] += 1
+            moves.append((number, homes[suit]))
+            # Only the card that was uncovered, the next card of the suit
+            # and, for safe moves, the cards the moved card could have been
+            # put on can have become movable
+            uncovered = top(number)
+            candidates = [uncovered, card + 1 if heights[suit] < 13 else -1]
+            if safe_only:
+                candidates.extend(rules.held_by[card])
+            if uncovered >= 0:
+                tops[uncovered] = number
+            for candidate in candidates:
+                if candidate in tops and playable(candidate):
+                    heapq.heappush(waiting, tops[candidate] or 8)
+        if len(moves) > 1:
+            self.undo_stack.append((BATCH, BATCH, len(moves), False))
+        return moves
+
     def check_win(self):
         """Checks if game has been completed.  Returns True if all
         foundation piles have 13 cards in them
         """
         return all([len(self.homes[x]) == 13 for x in range(4)])
 
+    def score(self):
+        """Returns the score of the game under rules.scoring"""
+        return self.rules.score(sum([len(home) for home in self.homes]))
+
+    def legal_moves(self, piles=ALL_PILES):
+        """Returns every move that move_pile() or deal() would accept as
+        (source, destination) pile numbers, see all_piles.  A deal is
+        (0, 0) and comes first, the other moves are ordered by source pile
+        and then by destination, foundation piles before tableau piles.
+        Moves between foundation piles are not included
+
+        Args:
+            piles (optional, int): a bit mask of pile numbers, only moves
+                from or to these piles are returned, default is ALL_PILES
+        """
+        all_piles = self.all_piles
+        rules = self.rules
+        moves = []
+        if (self.deck.pile and piles & 1 and
+                (self.deck.flip or rules.recycle_allowed(self.recycles))):
+            moves.append((0, 0))
+        if not piles & 0xffe:
+            # Only moves of the draw pile card can touch piles
+            if piles & 1:
+                moves.extend(self._deck_moves())
+            return moves
+        # Tableau piles indexed by the build key they accept
+        accepts = {}
+        empty = []
+        accept_keys = rules.accept_keys
+        build_keys = rules.build_keys
+        for number in range(1, 8):
+            pile = all_piles[number].pile
+            if pile:
+                accepts.setdefault(accept_keys[pile[-1].index],
+                                   []).append(number)
+            else:
+                empty.append(number)
+        empty_accepts = rules.tableau_accepts[EMPTY_PILE]
+        # Bit mask of the card indexes each foundation pile accepts
+        home_accepts = []
+        for number in range(8, 12):
+            pile = all_piles[number].pile
+            home_accepts.append((number, rules.home_accepts[number - 8][
+                pile[-1].index if pile else EMPTY_PILE]))
+        for number in range(12):
+            source_pile = all_piles[number]
+            pile = source_pile.pile
+            if source_pile.flip >= len(pile):
+                continue
+            if number > 7 and not rules.from_home:
+                break
+            # From a pile outside piles, only moves to piles in piles
+            wanted = ALL_PILES if piles >> number & 1 else piles
+            if not wanted & 0xffe:
+                continue
+            top = pile[source_pile.flip] if number == 0 else pile[-1]
+            if number < 8:
+                for home, mask in home_accepts:
+                    if mask >> top.index & 1 and wanted >> home & 1:
+                        moves.append((number, home))
+            if number == 0 or number > 7:
+                destinations = accepts.get(build_keys[top.index], [])
+                if number == 0 and empty_accepts >> top.index & 1:
+                    destinations = sorted(destinations + empty)
+                moves.extend([(number, destination) for destination in
+                              destinations if wanted >> destination & 1])
+                continue
+            destinations = []
+            for card in pile[source_pile.flip:]:
+                destinations.extend(accepts.get(build_keys[card.index],
+                                                ()))
+            if empty_accepts >> pile[source_pile.flip].index & 1:
+                destinations.extend(empty)
+            moves.extend([(number, destination) for destination in
+                          sorted(destinations) if destination != number and
+                          wanted >> destination & 1])
+        return moves
+
+    def _deck_moves(self):
+        """Returns the legal_moves() from the draw pile, matching its card
+        against the top card of every pile rather than building the tables
+        """
+        deck = self.deck
+        if deck.flip >= len(deck.pile):
+            return []
+        rules = self.rules
+        card = deck.pile[deck.flip].index
+        moves = []
+        for home, destination_pile in enumerate(self.homes):
+            pile = destination_pile.pile
+            if rules.home_accepts[home][
+                    pile[-1].index if pile else EMPTY_PILE] >> card & 1:
+                moves.append((0, home + 8))
+        for number, destination_pile in enumerate(self.piles, 1):
+            pile = destination_pile.pile
+            if rules.tableau_accepts[
+                    pile[-1].index if pile else EMPTY_PILE] >> card & 1:
+                moves.append((0, number))
+        return moves
+
+    def changed_piles(self, since):
+        """Returns a bit mask of the pile numbers, see all_piles, of the
+        piles that changed after version since.  Keep game.version to ask
+        again later
+
+        Args:
+            since (int): a value of version, 0 returns every pile
+        """
+        mask = 0
+        for number, version in enumerate(self.pile_versions):
+            if version > since:
+                mask |= 1 << number
+        return mask
+
+    def make_move(self, move):
+        """Makes a (source, destination) move from legal_moves().  Returns
+        True if the move was legal
+
+        Args:
+            move (tuple of ints): source and destination pile numbers,
+                (0, 0) deals
+        """
+        source, destination = move
+        if source == destination == 0:
+            return self.deal()
+        piles = self.all_piles
+        return self.move_pile(piles[source], piles[destination])
+
+    def solve(self, thoughtful=True, max_nodes=1000000, max_time=None,
+              table_size=None, overflow=None, checkpoint=None):
+        """Searches for a sequence of moves that wins the game from the
+        current position.  Returns a solver.SolveResult whose status is
+        'solved' with the winning (source, destination) pile moves,
+        'unsolvable', or 'unknown' if the budget ran out first.  The game
+        is not changed.  Raises ValueError if the rules are not ones the
+        solver knows, see Rules.standard()
+
+        Args:
+            thoughtful (optional, bool): True if the solver may look at
+                face down cards, default is True
+            max_nodes (optional, int): the most positions to search, None
+                for no limit, default is 1000000
+            max_time (optional, float): the most seconds to search, None
+                for no limit, default is None
+            table_size (optional, int): the most positions the solver
+                remembers in memory, default is None (no limit)
+            overflow (optional, str): a file for the positions that do
+                not fit in memory, only with a table_size, default is None
+            checkpoint (optional, str): a file solver.resume() can carry
+                on from if the budget runs out, default is None
+        """
+        from .solver import solve
+        if not self.rules.standard():
+            raise ValueError('the solver does not know {0!r}'.format(
+                self.rules))
+        return solve(self, thoughtful, max_nodes, max_time, self.rules.draw,
+                     table_size, overflow, checkpoint=checkpoint)
+
+    def estimate_win_probability(self, n_samples=1000, workers=None,
+                                 confidence=0.95, tolerance=0.02, seed=None):
+        """Estimates the chance that AutoMove wins from the current
+        position, playing it out with the face down cards and the draw
+        pile shuffled.  Returns an estimate.WinEstimate with the share of
+        samples won and its confidence interval.  Stops early once the
+        interval is within tolerance.  The game is not changed
+
+        Args:
+            n_samples (optional, int): the most samples to play, default is
+                1000
+            workers (optional, int): the number of worker processes,
+                default is None (one per cpu)
+            confidence (optional, float): the confidence level of the
+                interval, default is 0.95
+            tolerance (optional, float): the widest interval, either side
+                of the estimate, that stops early, default is 0.02
+            seed (optional, int): seeds the samples, default is None
+        """
+        from .estimate import estimate_win_probability
+        return estimate_win_probability(self, n_samples, workers, confidence,
+                                        tolerance, seed=seed)
+
+    def undo(self):
+        """Reverts the last move or deal, or the last cascade_home().
+        Returns True if a move was reverted, False if there is nothing to
+        undo
+        """
+        if not self.undo_stack:
+            return False
+        entry = self.undo_stack.pop()
+        if entry[0] == BATCH:
+            for _ in range(entry[2]):
+                self._undo(self.undo_stack.pop())
+            self.redo_stack.append(entry)
+        else:
+            self._undo(entry)
+        return True
+
+    def redo(self):
+        """Applies the last undone move, deal or cascade_home() again.
+        Returns True if a move was applied, False if there is nothing to
+        redo
+        """
+        if not self.redo_stack:
+            return False
+        entry = self.redo_stack.pop()
+        if entry[0] == BATCH:
+            for _ in range(entry[2]):
+                self._redo(self.redo_stack.pop())
+            self.undo_stack.append(entry)
+        else:
+            self._redo(entry)
+        return True
+
+    def snapshot(self):
+        """Packs the position into 76 bytes.  The first 24 bytes are the
+        length and flip of each pile in all_piles order, the last 52 bytes
+        are the card indexes of every pile in the same order
+        """
+        header = []
+        cards = []
+        for pile in self.all_piles:
+            header.append(len(pile.pile))
+            header.append(pile.flip)
+            cards.extend([card.index for card in pile.pile])
+        return bytes(bytearray(header + cards))
+
+    def canonical_key(self):
+        """Returns the canonical key of the position, see canonical.py.
+        Positions that only differ in which tableau pile or foundation pile
+        holds which cards have the same key
+        """
+        return canonical_key(self.snapshot())
+
+    def restore(self, state):
+        """Returns the game to a position returned by snapshot().  The
+        existing CardPile objects are reused and the journal is cleared.
+        recycles is not changed
+
+        Args:
+            state (bytes): a position returned by snapshot()
+        """
+        state = bytearray(state)
+        offset = 24
+        for number, pile in enumerate(self.all_piles):
+            length = state[2 * number]
+            pile.flip = state[2 * number + 1]
+            pile.pile[:] = [CARDS[index] for index in
+                            state[offset:offset + length]]
+            offset += length
+        del self.undo_stack[:]
+        del self.redo_stack[:]
+        self.rehash()
+
+    def save(self):
+        """Packs the whole game into bytes: the deal number, the snapshot()
+        of the position, the undo and redo journals and, unless they are
+        rules.STANDARD, the rules.  load() unpacks it
+        """
+        if self.deal_number is None:
+            deal = bytearray((255,))
+        else:
+            digits = str(self.deal_number).encode('ascii')
+            deal = bytearray((len(digits),)) + digits
+        journal = bytearray()
+        for entry in self.undo_stack + self.redo_stack:
+            journal.extend(entry)
+        if self.rules != STANDARD:
+            journal.extend(self.rules.pack())
+        return bytes(deal + self.snapshot() +
+                     struct.pack('<II', len(self.undo_stack),
+                                 len(self.redo_stack)) + journal)
+
+    @classmethod
+    def load(cls, data, rules=None):
+        """Creates the game packed by save()
+
+        Args:
+            data (bytes): a game returned by Solitaire.save()
+            rules (optional, rules.Rules): the rule variant when data holds
+                none, as saved by standard games and by earlier versions,
+                default is None (rules.STANDARD)
+        """
+        data = bytearray(data)
+        offset = data[0] + 1
+        state = data[offset:offset + 76]
+        deal = data[1:offset] if data[0] != 255 else None
+        offset += 76
+        undo_count, redo_count = struct.unpack_from('<II', bytes(data),
+                                                    offset)
+        offset += 8
+        end = offset + 4 * (undo_count + redo_count)
+        if len(data) > end:
+            rules = Rules.unpack(data[end:])
+        game = cls.from_snapshot(state, rules)
+        if deal is not None:
+            game.deal_number = int(bytes(deal).decode('ascii'))
+        journal = data[offset:end]
+        entries = [(journal[index], journal[index + 1], journal[index + 2],
+                    bool(journal[index + 3]))
+                   for index in range(0, len(journal), 4)]
+        game.undo_stack = entries[:undo_count]
+        game.redo_stack = entries[undo_count:undo_count + redo_count]
+        game.recycles = sum([1 for entry in game.undo_stack
+                             if entry[0] == entry[1] == 0 and entry[3]])
+        return game
+
+    def rehash(self):
+        """Attaches the piles to the game and recomputes state_hash from
+        scratch, every pile counts as changed.  Needed after cards or flips
+        were changed without the CardPile methods
+        """
+        state_hash = 0
+        self.version += 1
+        self.pile_versions[:] = [self.version] * 12
+        for number, pile in enumerate(self.all_piles):
+            pile.game = self
+            pile.number = number
+            state_hash ^= FLIP_KEYS[number * 53 + pile.flip]
+            under = BOTTOM + number
+            for card in pile.pile:
+                state_hash ^= CARD_KEYS[card.index * 64 + under]
+                under = card.index
+        self.state_hash = state_hash
+
+    def _move(self, source_pile, destination_pile, index):
+        """Moves the card at index, and every card above it unless
+        source_pile is the draw pile, then records the move in the journal
+        """
+        if index < 0:
+            index += len(source_pile)
+        count = 1 if source_pile is self.deck else len(source_pile) - index
+        flip = source_pile.flip
+        if count == 1:
+            destination_pile.move_card(source_pile, index)
+        else:
+            destination_pile.move_cards(source_pile, index)
+        self._update()
+        piles = self.all_piles
+        self._record((piles.index(source_pile),
+                      piles.index(destination_pile),
+                      count, source_pile.flip != flip))
+
+    def _undo(self, entry):
+        """Reverts one journal entry and moves it to the redo stack"""
+        source, destination, count, flipped = entry
+        if source == destination:
+            if flipped:
+                self.deck.set_flip(0)
+                self.recycles -= 1
+            else:
+                self.deck.set_flip(self.deck.flip + count)
+        else:
+            piles = self.all_piles
+            source_pile = piles[source]
+            destination_pile = piles[destination]
+            if source_pile is self.deck:
+                source_pile.move_card(destination_pile, -1, source_pile.flip)
+            else:
+                if flipped:
+                    source_pile.set_flip(source_pile.flip + 1)
+                source_pile.move_cards(destination_pile,
+                                       len(destination_pile) - count)
+        self.redo_stack.append(entry)
+        if self.recorder is not None:
+            self.recorder.undo()
+
+    def _redo(self, entry):
+        """Applies one journal entry again and moves it to the undo stack"""
+        source, destination, count, flipped = entry
+        if source == destination:
+            if flipped:
+                self.deck.set_flip(len(self.deck))
+                self.recycles += 1
+            else:
+                self.deck.set_flip(self.deck.flip - count)
+        else:
+            piles = self.all_piles
+            source_pile = piles[source]
+            destination_pile = piles[destination]
+            if source_pile is self.deck:
+                destination_pile.move_card(source_pile, source_pile.flip)
+            else:
+                destination_pile.move_cards(source_pile,
+                                            len(source_pile) - count)
+                source_pile.update()
+        self.undo_stack.append(entry)
+        if self.recorder is not None:
+            self.recorder.redo()
+
+    def _record(self, entry):
+        """Adds a move to the journal.  A new move clears the redo stack"""
+        self.undo_stack.append(entry)
+        del self.redo_stack[:]
+        if self.recorder is not None:
+            self.recorder.move(entry[0], entry[1])
+
     def _update(self):
         """Flips top card face up on all tableau piles"""
         for pile in self.piles:
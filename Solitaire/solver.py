@@ -0,0 +1,915 @@
+"""Exact solver for solitaire positions
+
+The solver copies a game into lists of card indexes and runs a depth
+first search over every legal move, remembering visited positions in a
+transposition table.  Positions are keyed canonically, see canonical.py,
+so positions that only differ in the order of the tableau piles or of
+the foundation piles are searched once.  Two modes are supported:
+    thoughtful: every card is known, including the face down tableau cards
+        and the order of the draw pile.  The search is plain reachability,
+        so an exhausted search proves the deal cannot be won
+    honest: face down cards are unknown until they are turned over.  A move
+        that turns over a card only wins if the game can be won whichever
+        unknown card shows up, so a solution is a strategy that wins for
+        every arrangement of the unknown cards
+
+The transposition table is a dict unless a table_size is given, then it
+is a transposition.TranspositionTable of that many entries, which forgets
+the oldest positions when full, optionally to an overflow table in a
+memory mapped file.  A search that runs out of budget or is interrupted
+can write a checkpoint file, and resume() carries on from it.
+
+Moves are (source, destination) pile numbers in Solitaire.all_piles order:
+0 is the draw pile, 1-7 the tableau piles and 8-11 the foundation piles.
+A deal is (0, 0).
+
+Functions:
+    solve(game, thoughtful, max_nodes, max_time, draw, table_size,
+        overflow, overflow_size, checkpoint): solves a position
+    resume(path, max_nodes, max_time): carries on with a checkpointed solve
+Classes:
+    SolveResult: status, moves, nodes, seconds and table counters of a
+        solve
+"""
+import collections
+import hashlib
+import os
+import pickle
+import sys
+import time
+
+from .playing_cards import BLACK, CARD_COLOR, CARD_SUIT, CARD_VALUE
+from .transposition import TranspositionTable
+from .zobrist import (BOTTOM, CARD_KEYS, FACE_UP_KEYS, FLIP_KEYS,
+                      FOUNDATION_BOTTOM, TABLEAU_BOTTOM)
+
+SOLVED = 'solved'
+UNSOLVABLE = 'unsolvable'
+UNKNOWN = 'unknown'
+
+SolveResult = collections.namedtuple(
+    'SolveResult', ['status', 'moves', 'nodes', 'seconds', 'table'])
+CHECKPOINT_VERSION = 2
+
+# Move kinds
+_DEAL, _WASTE_HOME, _WASTE_PILE, _PILE_HOME, _PILE_PILE, _HOME_PILE = range(6)
+
+# Suits of the opposite color, indexed by suit
+_OPPOSITE = tuple((1, 3) if CARD_COLOR[suit * 13] == BLACK else (0, 2)
+                  for suit in range(4))
+# Honest table values: a lost position, or a winning move packed by
+# _pack() plus the most moves the strategy needs to win shifted left 16.
+# Thoughtful table values are the generation, see Solver
+_LOST = 0
+_MOVE_LENGTHS = (1, 1, 2, 2, 4, 3)
+_HIDDEN = 52
+
+
+class _BudgetExceeded(Exception):
+    pass
+
+
+class Solver(object):
+    """Searches a copy of a game position for a win
+
+    Attributes:
+        tableau (list of lists of ints): card indexes of the 7 tableau piles
+        flips (list of ints): the flip of each tableau pile
+        stock (list of ints): card indexes of the draw and waste pile
+        cursor (int): the flip of the draw pile, stock[cursor] is the top
+            waste card
+        found (list of ints): foundation height of each suit
+        homes (list of ints): the foundation pile of each suit, -1 if the
+            suit has no foundation pile yet
+        known (int): bit mask of the cards that have been seen
+        hash (int): canonical Zobrist hash of the position, see
+            canonical.py
+        table (dict or TranspositionTable): the transposition table
+        nodes (int): the number of positions searched
+        checkpoint_path (str): the checkpoint file written every
+            checkpoint_interval seconds and when the search stops without
+            an answer, None for no checkpoints
+
+    Public Methods:
+        solve(): searches the position, or carries on searching it
+        checkpoint(path): writes the search so far to a file
+    """
+    def __init__(self, game, thoughtful=True, max_nodes=1000000,
+                 max_time=None, draw=3, table=None, checkpoint_path=None,
+                 checkpoint_interval=300.0):
+        """Copies the position of game
+
+        Args:
+            game (Solitaire): the position to solve
+            thoughtful (optional, bool): True if the face down cards are
+                known, default is True
+            max_nodes (optional, int): the most positions to search, None
+                for no limit, default is 1000000
+            max_time (optional, float): the most seconds to search, None
+                for no limit, default is None
+            draw (optional, int): the number of cards dealt at a time,
+                default is 3
+            table (optional, TranspositionTable): the transposition table,
+                default is None (a dict)
+            checkpoint_path (optional, str): see checkpoint_path, default
+                is None
+            checkpoint_interval (optional, float): seconds between
+                checkpoints, default is 300
+        """
+        self._root = game.snapshot()
+        state = bytearray(self._root)
+        piles = []
+        offset = 24
+        for number in range(12):
+            length = state[2 * number]
+            piles.append((list(state[offset:offset + length]),
+                          state[2 * number + 1]))
+            offset += length
+        self.stock, self.cursor = piles[0]
+        self.tableau = [pile for pile, _ in piles[1:8]]
+        self.flips = [flip for _, flip in piles[1:8]]
+        self.found = [0, 0, 0, 0]
+        self.homes = [-1, -1, -1, -1]
+        for home, (pile, _) in enumerate(piles[8:]):
+            if pile:
+                self.found[CARD_SUIT[pile[0]]] = len(pile)
+                self.homes[CARD_SUIT[pile[0]]] = home
+        self.home_count = sum(self.found)
+        self.rehash()
+        self.known = 0
+        for card in range(52):
+            self.known |= 1 << card
+        for pile, flip in zip(self.tableau, self.flips):
+            for card in pile[:flip]:
+                self.known &= ~(1 << card)
+        for card in self.stock[:self.cursor]:
+            self.known &= ~(1 << card)
+        self.thoughtful = thoughtful
+        self.draw = draw
+        self.max_nodes = max_nodes
+        self.max_time = max_time
+        self.table = {} if table is None else table
+        self.nodes = 0
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_interval = checkpoint_interval
+        self._deadline = None
+        self._next_checkpoint = None
+        # The thoughtful search: the moves left to try at every depth, the
+        # records of the moves made and, for a table that forgets, the
+        # keys of the positions on the path
+        self._stack = None
+        self._path = None
+        self._on_path = None
+        # Thoughtful entries hold the generation, counting checkpoints,
+        # they were stored in.  A table in a file may hold entries stored
+        # after the checkpoint a search resumed from, their generations
+        # are stale
+        self._generation = 1
+        self._stale = None
+
+    def solve(self):
+        """Searches the position, a thoughtful search carries on where
+        it stopped if it ran out of budget before.  Returns a SolveResult
+        """
+        began = time.time()
+        self._deadline = None
+        if self.max_time is not None:
+            self._deadline = began + self.max_time
+        if self.checkpoint_path is not None:
+            self._next_checkpoint = began + self.checkpoint_interval
+        try:
+            if self.thoughtful:
+                moves = self._search()
+            else:
+                moves = self._search_honest()
+        except _BudgetExceeded:
+            status, moves = UNKNOWN, None
+            if self.checkpoint_path is not None:
+                self.checkpoint(self.checkpoint_path)
+        except KeyboardInterrupt:
+            if self.checkpoint_path is not None:
+                self.checkpoint(self.checkpoint_path)
+            raise
+        else:
+            status = UNSOLVABLE if moves is None else SOLVED
+        return SolveResult(status, moves, self.nodes, time.time() - began,
+                           self._table_stats())
+
+    def checkpoint(self, path):
+        """Writes the search so far to path, replacing it, so resume()
+        can carry on with it.  A thoughtful search carries on from the
+        position it stopped at; an honest search starts again from the
+        top, with the positions already in the table known
+
+        Args:
+            path (str): the checkpoint file
+        """
+        bounded = isinstance(self.table, TranspositionTable)
+        overflow = self.table.overflow if bounded else None
+        state = {'version': CHECKPOINT_VERSION,
+                 'root': self._root,
+                 'thoughtful': self.thoughtful,
+                 'draw': self.draw,
+                 'nodes': self.nodes,
+                 'table': None if bounded else self.table,
+                 'table_path': self.table.path if bounded else None,
+                 'overflow_path': overflow.path if overflow else None,
+                 'has_overflow': overflow is not None,
+                 'generation': self._generation,
+                 'stale': sorted(self._stale or ())}
+        if self.thoughtful and self._stack is not None:
+            state['path'] = [record[0] for record in self._path]
+            state['stack'] = self._stack
+        temporary = path + '.tmp'
+        with open(temporary, 'wb') as checkpoint_file:
+            pickle.dump(state, checkpoint_file, 2)
+            if bounded:
+                if overflow:
+                    overflow.dump(checkpoint_file)
+                self.table.dump(checkpoint_file)
+        os.rename(temporary, path)
+        self._generation = min(self._generation + 1, 0xffffffff)
+
+    def won(self):
+        return self.home_count == 52
+
+    def key(self):
+        """Returns the transposition table key of the position, its 64 bit
+        canonical Zobrist hash.  This is canonical.canonical_hash() of the
+        position
+        """
+        return self.hash
+
+    def rehash(self):
+        """Computes the canonical hash of the position from scratch"""
+        state_hash = FLIP_KEYS[self.cursor]
+        under = BOTTOM
+        for card in self.stock:
+            state_hash ^= CARD_KEYS[card * 64 + under]
+            under = card
+        for pile, flip in zip(self.tableau, self.flips):
+            under = TABLEAU_BOTTOM
+            for card in pile:
+                state_hash ^= CARD_KEYS[card * 64 + under]
+                under = card
+            if flip < len(pile):
+                state_hash ^= FACE_UP_KEYS[pile[flip]]
+        for suit in range(4):
+            under = FOUNDATION_BOTTOM
+            for card in range(suit * 13, suit * 13 + self.found[suit]):
+                state_hash ^= CARD_KEYS[card * 64 + under]
+                under = card
+        self.hash = state_hash
+        return state_hash
+
+    def honest_key(self):
+        """Returns the transposition table key of the position with the
+        unknown cards hidden, positions that only differ in where the
+        unknown cards are, or in the order of the tableau piles, have the
+        same value
+        """
+        known = self.known
+        stock = [card if known >> card & 1 else _HIDDEN
+                 for card in self.stock]
+        return (bytes(bytearray(stock)) +
+                bytes(bytearray([self.cursor] + self.found)) +
+                b'\xff'.join(sorted(self._honest_piles())))
+
+    def _honest_piles(self):
+        """Returns every tableau pile as bytes with the unknown cards
+        hidden
+        """
+        return [bytes(bytearray([_HIDDEN] * flip + pile[flip:]))
+                for pile, flip in zip(self.tableau, self.flips)]
+
+    def _honest_order(self):
+        """Returns the tableau pile numbers in the order honest_key()
+        sorts them
+        """
+        piles = self._honest_piles()
+        return sorted(range(7), key=piles.__getitem__)
+
+    def moves(self):
+        """Returns the legal moves, the most promising move is last.  If a
+        tableau card can be moved to its foundation pile without ever
+        being needed again, that is the only move returned
+        """
+        tableau = self.tableau
+        flips = self.flips
+        found = self.found
+        stock = self.stock
+        cursor = self.cursor
+        home_moves = []
+        reveal_moves = []
+        waste_moves = []
+        other_moves = []
+        back_moves = []
+        for source in range(7):
+            pile = tableau[source]
+            if pile:
+                card = pile[-1]
+                suit = CARD_SUIT[card]
+                if CARD_VALUE[card] == found[suit] + 1:
+                    if self._safe(card):
+                        return [(_PILE_HOME, source)]
+                    home_moves.append((_PILE_HOME, source))
+        if cursor < len(stock):
+            card = stock[cursor]
+            value = CARD_VALUE[card]
+            color = CARD_COLOR[card]
+            if value == found[CARD_SUIT[card]] + 1:
+                home_moves.append((_WASTE_HOME,))
+            empty_done = False
+            for destination in range(7):
+                pile = tableau[destination]
+                if pile:
+                    top = pile[-1]
+                    if (CARD_VALUE[top] == value + 1 and
+                            CARD_COLOR[top] != color):
+                        waste_moves.append((_WASTE_PILE, destination))
+                elif value == 13 and not empty_done:
+                    waste_moves.append((_WASTE_PILE, destination))
+                    empty_done = True
+        for source in range(7):
+            pile = tableau[source]
+            flip = flips[source]
+            size = len(pile)
+            if flip == size:
+                continue
+            base_value = CARD_VALUE[pile[flip]]
+            empty_done = False
+            for destination in range(7):
+                if destination == source:
+                    continue
+                target = tableau[destination]
+                if target:
+                    top = target[-1]
+                    index = flip + base_value - CARD_VALUE[top] + 1
+                    if (flip <= index < size and
+                            CARD_VALUE[pile[index]] == CARD_VALUE[top] - 1 and
+                            CARD_COLOR[pile[index]] != CARD_COLOR[top]):
+                        move = (_PILE_PILE, source, index, destination)
+                        if index == flip and flip > 0:
+                            reveal_moves.append(move)
+                        else:
+                            other_moves.append(move)
+                elif base_value == 13 and flip > 0 and not empty_done:
+                    reveal_moves.append((_PILE_PILE, source, flip,
+                                         destination))
+                    empty_done = True
+        for suit in range(4):
+            value = found[suit]
+            if value == 0:
+                continue
+            card = suit * 13 + value - 1
+            if self._safe(card):
+                continue
+            color = CARD_COLOR[card]
+            for destination in range(7):
+                pile = tableau[destination]
+                if (pile and CARD_VALUE[pile[-1]] == value + 1 and
+                        CARD_COLOR[pile[-1]] != color):
+                    back_moves.append((_HOME_PILE, suit, destination))
+        moves = back_moves + other_moves + waste_moves + reveal_moves
+        if stock:
+            moves.insert(0, (_DEAL,))
+        return moves + home_moves
+
+    def apply(self, move):
+        """Makes a move returned by moves().  Returns the record that
+        undo() needs to take the move back: (move, extra, flipped, home,
+        hash) where extra is the old cursor of a deal or the number of
+        cards moved between tableau piles
+        """
+        kind = move[0]
+        flipped = False
+        home = -1
+        extra = None
+        old_hash = state_hash = self.hash
+        if kind == _DEAL:
+            extra = cursor = self.cursor
+            if cursor == 0:
+                self.cursor = len(self.stock)
+            else:
+                self.cursor = max(0, cursor - self.draw)
+            self.hash ^= FLIP_KEYS[cursor] ^ FLIP_KEYS[self.cursor]
+            return (move, extra, flipped, home, old_hash)
+        tableau = self.tableau
+        if kind == _WASTE_HOME or kind == _WASTE_PILE:
+            stock = self.stock
+            index = self.cursor
+            under = stock[index - 1] if index else BOTTOM
+            card = stock.pop(index)
+            state_hash ^= CARD_KEYS[card * 64 + under]
+            if index < len(stock):
+                above = stock[index]
+                state_hash ^= (CARD_KEYS[above * 64 + card] ^
+                               CARD_KEYS[above * 64 + under])
+        elif kind == _PILE_HOME:
+            source = move[1]
+            pile = tableau[source]
+            card = pile.pop()
+            state_hash ^= CARD_KEYS[card * 64 + (
+                pile[-1] if pile else TABLEAU_BOTTOM)]
+            if self.flips[source] == len(pile):
+                state_hash ^= FACE_UP_KEYS[card]
+        elif kind == _PILE_PILE:
+            source, index, destination = move[1:]
+            pile = tableau[source]
+            target = tableau[destination]
+            card = pile[index]
+            extra = len(pile) - index
+            state_hash ^= (
+                CARD_KEYS[card * 64 + (
+                    pile[index - 1] if index else TABLEAU_BOTTOM)] ^
+                CARD_KEYS[card * 64 + (
+                    target[-1] if target else TABLEAU_BOTTOM)])
+            # The first face up card of the source may become the first
+            # face up card of an empty destination
+            if (index == self.flips[source]) != (not target):
+                state_hash ^= FACE_UP_KEYS[card]
+            target.extend(pile[index:])
+            del pile[index:]
+        else:
+            suit, destination = move[1:]
+            home = self.homes[suit]
+            self.found[suit] -= 1
+            self.home_count -= 1
+            card = suit * 13 + self.found[suit]
+            state_hash ^= CARD_KEYS[card * 64 + (
+                card - 1 if self.found[suit] else FOUNDATION_BOTTOM)]
+            if self.found[suit] == 0:
+                self.homes[suit] = -1
+        if kind == _WASTE_HOME or kind == _PILE_HOME:
+            suit = CARD_SUIT[card]
+            if self.found[suit] == 0:
+                self.homes[suit] = self._free_home()
+            home = self.homes[suit]
+            state_hash ^= CARD_KEYS[card * 64 + (
+                card - 1 if self.found[suit] else FOUNDATION_BOTTOM)]
+            self.found[suit] += 1
+            self.home_count += 1
+        elif kind == _WASTE_PILE or kind == _HOME_PILE:
+            destination = move[-1]
+            target = tableau[destination]
+            if target:
+                state_hash ^= CARD_KEYS[card * 64 + target[-1]]
+            else:
+                state_hash ^= (CARD_KEYS[card * 64 + TABLEAU_BOTTOM] ^
+                               FACE_UP_KEYS[card])
+            target.append(card)
+        if kind == _PILE_HOME or kind == _PILE_PILE:
+            source = move[1]
+            flip = self.flips[source]
+            pile = tableau[source]
+            if pile and flip > len(pile) - 1:
+                self.flips[source] = flip - 1
+                state_hash ^= FACE_UP_KEYS[pile[flip - 1]]
+                flipped = True
+        self.hash = state_hash
+        return (move, extra, flipped, home, old_hash)
+
+    def undo(self, record):
+        """Takes back the move that returned record"""
+        move, extra, flipped, home, self.hash = record
+        kind = move[0]
+        if kind == _DEAL:
+            self.cursor = extra
+            return
+        if kind == _WASTE_HOME or kind == _PILE_HOME:
+            suit = self._home_suit(home)
+            self.found[suit] -= 1
+            self.home_count -= 1
+            card = suit * 13 + self.found[suit]
+            if self.found[suit] == 0:
+                self.homes[suit] = -1
+            if kind == _WASTE_HOME:
+                self.stock.insert(self.cursor, card)
+            else:
+                if flipped:
+                    self.flips[move[1]] += 1
+                self.tableau[move[1]].append(card)
+        elif kind == _WASTE_PILE:
+            self.stock.insert(self.cursor, self.tableau[move[1]].pop())
+        elif kind == _PILE_PILE:
+            source, index, destination = move[1:]
+            if flipped:
+                self.flips[source] += 1
+            pile = self.tableau[destination]
+            self.tableau[source].extend(pile[-extra:])
+            del pile[-extra:]
+        else:
+            suit, destination = move[1:]
+            self.tableau[destination].pop()
+            if self.found[suit] == 0:
+                self.homes[suit] = home
+            self.found[suit] += 1
+            self.home_count += 1
+
+    def pile_move(self, record):
+        """Returns the (source, destination) pile numbers of an applied
+        move
+        """
+        move, _, _, home, _ = record
+        kind = move[0]
+        if kind == _DEAL:
+            return (0, 0)
+        if kind == _WASTE_HOME:
+            return (0, 8 + home)
+        if kind == _WASTE_PILE:
+            return (0, 1 + move[1])
+        if kind == _PILE_HOME:
+            return (1 + move[1], 8 + home)
+        if kind == _PILE_PILE:
+            return (1 + move[1], 1 + move[3])
+        return (8 + home, 1 + move[2])
+
+    def _search(self):
+        """Thoughtful depth first search.  Returns the winning list of
+        pile moves or None if the position cannot be won.  Its stack is
+        kept, so after _BudgetExceeded it can carry on
+        """
+        if self.won():
+            return []
+        table = self.table
+        if self._stack is None:
+            table[self.key()] = self._generation
+            self._stack = [self.moves()]
+            self._path = []
+            if isinstance(table, TranspositionTable):
+                # The table may forget positions on the path, which would
+                # let the search go round in circles
+                self._on_path = set([self.key()])
+        stack = self._stack
+        path = self._path
+        on_path = self._on_path
+        stale = self._stale
+        while stack:
+            moves = stack[-1]
+            if not moves:
+                stack.pop()
+                if on_path is not None:
+                    on_path.discard(self.key())
+                if path:
+                    self.undo(path.pop())
+                continue
+            record = self.apply(moves.pop())
+            key = self.key()
+            if stale is None:
+                seen = key in table
+            else:
+                entry = table.get(key)
+                seen = entry is not None and entry not in stale
+            if seen or on_path is not None and key in on_path:
+                self.undo(record)
+                continue
+            table[key] = self._generation
+            if on_path is not None:
+                on_path.add(key)
+            path.append(record)
+            stack.append(self.moves())
+            self._count_node()
+            if self.won():
+                return [self.pile_move(record) for record in path]
+        return None
+
+    def _search_honest(self):
+        """Honest search.  Returns the moves the winning strategy makes
+        for the actual arrangement of the unknown cards, or None if no
+        strategy wins for every arrangement
+        """
+        limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(max(limit, 50000))
+        try:
+            distance, _ = self._honest(set())
+            if distance is None:
+                return None
+            solution = []
+            played = set()
+            while not self.won():
+                self._check_budget()
+                key = self._table_key()
+                entry = self.table.get(key)
+                if not entry or entry >> 16 > distance:
+                    # A bounded table forgot the move, or replaced it with
+                    # a longer one found later that may lead back to a
+                    # position already played: search again without going
+                    # back.  If that fails, or the moves went round, find
+                    # a move that wins in distance moves, one exists.  The
+                    # distance only goes up at a new position, so the
+                    # moves cannot go round for ever
+                    found = None
+                    if key not in played:
+                        found, _ = self._honest_moves(key, set(played))
+                    if found is None:
+                        self._honest_moves(key, set(), distance)
+                    entry = self.table.get(key)
+                played.add(key)
+                distance = (entry >> 16) - 1
+                record = self.apply(_translate(_unpack(entry & 0xffff),
+                                               self._honest_order()))
+                for cards, index in self._revealed(record):
+                    self.known |= 1 << cards[index]
+                solution.append(self.pile_move(record))
+        finally:
+            sys.setrecursionlimit(limit)
+        return solution
+
+    def _honest(self, path, limit=None):
+        """Returns (distance, depends_on_path), where distance is the most
+        moves the strategy found needs to win, None if none was found.  A
+        loss that was only found because a position on the current path
+        was treated as lost, or because limit ran out, is not stored in
+        the table
+
+        Args:
+            path (set): the keys of the positions on the current path
+            limit (optional, int): the most moves to win in, default is
+                None (no limit)
+        """
+        if self.won():
+            return 0, False
+        key = self._table_key()
+        if key in path:
+            return None, True
+        entry = self.table.get(key)
+        if entry == _LOST:
+            return None, False
+        if entry is not None and (limit is None or entry >> 16 <= limit):
+            return entry >> 16, False
+        if limit is not None and limit <= 0:
+            return None, True
+        return self._honest_moves(key, path, limit)
+
+    def _honest_moves(self, key, path, limit=None):
+        """Tries the moves of the position for _honest(), whatever the
+        table holds for key, and stores what it finds
+        """
+        self._count_node()
+        path.add(key)
+        cyclic = False
+        next_limit = None if limit is None else limit - 1
+        for move in reversed(self.moves()):
+            record = self.apply(move)
+            distance, depends = self._reveal(self._revealed(record), path,
+                                             next_limit)
+            self.undo(record)
+            if distance is not None:
+                path.discard(key)
+                # Stored with the tableau piles in honest_key() order, as
+                # the same key may come up with the piles in another order
+                order = self._honest_order()
+                ranks = [0] * 7
+                for rank, pile in enumerate(order):
+                    ranks[pile] = rank
+                self.table[key] = (_pack(_translate(move, ranks)) |
+                                   distance + 1 << 16)
+                return distance + 1, False
+            cyclic = cyclic or depends
+        path.discard(key)
+        if not cyclic:
+            self.table[key] = _LOST
+        return None, cyclic
+
+    def _revealed(self, record):
+        """Returns the (list, index) slots holding unknown cards that the
+        move turned face up
+        """
+        move, cursor, flipped, _, _ = record
+        known = self.known
+        if move[0] == _DEAL:
+            if cursor == 0:
+                return []
+            return [(self.stock, index)
+                    for index in range(self.cursor, cursor)
+                    if not known >> self.stock[index] & 1]
+        if flipped:
+            source = move[1]
+            pile = self.tableau[source]
+            return [(pile, self.flips[source])]
+        return []
+
+    def _reveal(self, slots, path, limit):
+        """Checks every unknown card that could be in the first slot, the
+        actual card first.  Returns (distance, depends_on_path), distance
+        is the most for any card
+        """
+        if not slots:
+            return self._honest(path, limit)
+        cards, index = slots[0]
+        actual = cards[index]
+        unknown = [actual] + [card for card in range(52)
+                              if card != actual and
+                              not self.known >> card & 1]
+        most = 0
+        for card in unknown:
+            if card != actual:
+                other, other_index = self._locate(card)
+                other[other_index], cards[index] = actual, card
+            self.known |= 1 << card
+            distance, depends = self._reveal(slots[1:], path, limit)
+            self.known &= ~(1 << card)
+            if card != actual:
+                other[other_index], cards[index] = card, actual
+            if distance is None:
+                return None, depends
+            most = max(most, distance)
+        return most, False
+
+    def _locate(self, card):
+        """Returns the (list, index) slot of an unknown card"""
+        for pile, flip in zip(self.tableau, self.flips):
+            if card in pile[:flip]:
+                return pile, pile.index(card)
+        return self.stock, self.stock.index(card)
+
+    def _safe(self, card):
+        """True if no card will ever need to be put on card"""
+        value = CARD_VALUE[card]
+        if value <= 2:
+            return True
+        first, second = _OPPOSITE[CARD_SUIT[card]]
+        return self.found[first] >= value - 1 and \
+            self.found[second] >= value - 1
+
+    def _update(self, source):
+        """Flips the top card of a tableau pile.  Returns True if it was
+        face down
+        """
+        pile = self.tableau[source]
+        if pile and self.flips[source] > len(pile) - 1:
+            self.flips[source] -= 1
+            return True
+        return False
+
+    def _free_home(self):
+        for home in range(4):
+            if home not in self.homes:
+                return home
+
+    def _home_suit(self, home):
+        return self.homes.index(home)
+
+    def _table_key(self):
+        """Returns the honest_key() of the position, as a 64 bit digest
+        for a TranspositionTable
+        """
+        key = self.honest_key()
+        if isinstance(self.table, TranspositionTable):
+            return int(hashlib.blake2b(key, digest_size=8).hexdigest(), 16)
+        return key
+
+    def _table_stats(self):
+        if isinstance(self.table, TranspositionTable):
+            return self.table.stats()
+        return {'entries': len(self.table)}
+
+    def _count_node(self):
+        self.nodes += 1
+        if self.max_nodes is not None and self.nodes > self.max_nodes:
+            raise _BudgetExceeded()
+        if not self.nodes & 1023:
+            if self._deadline is not None and time.time() > self._deadline:
+                raise _BudgetExceeded()
+            if (self._next_checkpoint is not None and
+                    time.time() > self._next_checkpoint):
+                self.checkpoint(self.checkpoint_path)
+                self._next_checkpoint = time.time() + self.checkpoint_interval
+
+    def _check_budget(self):
+        """Raises _BudgetExceeded if the node or time budget ran out"""
+        if (self.max_nodes is not None and self.nodes > self.max_nodes or
+                self._deadline is not None and time.time() > self._deadline):
+            raise _BudgetExceeded()
+
+
+def _translate(move, piles):
+    """Returns move with every tableau pile number p replaced by
+    piles[p]
+    """
+    kind = move[0]
+    if kind == _WASTE_PILE or kind == _PILE_HOME:
+        return (kind, piles[move[1]])
+    if kind == _PILE_PILE:
+        return (kind, piles[move[1]], move[2], piles[move[3]])
+    if kind == _HOME_PILE:
+        return (kind, move[1], piles[move[2]])
+    return move
+
+
+def _pack(move):
+    """Packs a move into a table value from 1 to 32767"""
+    value = move[0]
+    for field, shift in zip(move[1:], (3, 6, 12)):
+        value |= field << shift
+    return value + 1
+
+
+def _unpack(value):
+    """Returns the move packed by _pack()"""
+    value -= 1
+    move = (value & 7, value >> 3 & 7, value >> 6 & 63, value >> 12 & 7)
+    return move[:_MOVE_LENGTHS[move[0]]]
+
+
+def solve(game, thoughtful=True, max_nodes=1000000, max_time=None, draw=3,
+          table_size=None, overflow=None, overflow_size=None,
+          checkpoint=None):
+    """Solves the position of game.  Returns a SolveResult whose status is
+    SOLVED with the winning moves, UNSOLVABLE, or UNKNOWN if the node or
+    time budget ran out first
+
+    Args:
+        game (Solitaire): the position to solve, it is not changed
+        thoughtful (optional, bool): True if the face down cards are known,
+            default is True
+        max_nodes (optional, int): the most positions to search, None for
+            no limit, default is 1000000
+        max_time (optional, float): the most seconds to search, None for
+            no limit, default is None
+        draw (optional, int): the number of cards dealt at a time,
+            default is 3
+        table_size (optional, int): the most positions the transposition
+            table holds in memory, transposition.ENTRY_BYTES bytes each,
+            default is None (no limit)
+        overflow (optional, str): a file for the positions that do not fit
+            in memory, only with a table_size, default is None (they are
+            forgotten)
+        overflow_size (optional, int): the most positions the overflow
+            file holds, default is None (8 * table_size)
+        checkpoint (optional, str): a checkpoint file written every 300
+            seconds and when the search stops without an answer, resume()
+            carries on from it, default is None
+    """
+    if overflow is not None and table_size is None:
+        raise ValueError('an overflow file needs a table_size')
+    table = None
+    if table_size is not None:
+        if overflow is not None:
+            overflow = TranspositionTable(overflow_size or 8 * table_size,
+                                          overflow)
+        table = TranspositionTable(table_size, overflow=overflow)
+    try:
+        return Solver(game, thoughtful, max_nodes, max_time, draw, table,
+                      checkpoint).solve()
+    finally:
+        if table is not None:
+            table.close()
+
+
+def resume(path, max_nodes=1000000, max_time=None, checkpoint=None):
+    """Carries on with the solve that wrote checkpoint file path.
+    Returns a SolveResult like solve(), counting the nodes of every run
+
+    Args:
+        path (str): a checkpoint file, see Solver.checkpoint()
+        max_nodes (optional, int): the most positions to search in this
+            run, None for no limit, default is 1000000
+        max_time (optional, float): the most seconds to search in this
+            run, None for no limit, default is None
+        checkpoint (optional, str): where to write checkpoints, default is
+            None (path)
+    """
+    from .solitaire import Solitaire
+    with open(path, 'rb') as checkpoint_file:
+        state = pickle.load(checkpoint_file)
+        if state.get('version') != CHECKPOINT_VERSION:
+            raise ValueError('{0} is not a checkpoint this solver can '
+                             'resume'.format(path))
+        table = state['table']
+        bounded = table is None
+        if bounded:
+            overflow = None
+            if state['has_overflow']:
+                overflow = TranspositionTable.undump(checkpoint_file,
+                                                     state['overflow_path'])
+            table = TranspositionTable.undump(
+                checkpoint_file, state['table_path'], overflow)
+    solver = Solver(Solitaire.from_snapshot(state['root']),
+                    state['thoughtful'], None, max_time, state['draw'],
+                    table, path if checkpoint is None else checkpoint)
+    solver.nodes = state['nodes']
+    if max_nodes is not None:
+        solver.max_nodes = solver.nodes + max_nodes
+    stale = set(state['stale'])
+    generation = state['generation'] + 1
+    if bounded and (state['table_path'] or state['overflow_path']):
+        # The file may have been written to after the checkpoint
+        stale.add(generation)
+        generation += 1
+    solver._generation = generation
+    solver._stale = frozenset(stale) or None
+    if 'stack' in state:
+        solver._stack = state['stack']
+        solver._path = []
+        if bounded:
+            solver._on_path = set([solver.key()])
+        for move in state['path']:
+            solver._path.append(solver.apply(move))
+            if bounded:
+                solver._on_path.add(solver.key())
+    try:
+        return solver.solve()
+    finally:
+        if bounded:
+            table.close()
@@ -0,0 +1,258 @@
+"""Streaming statistics of played games in fixed memory
+
+Workers add every game they finish to a GameStats and send it back when
+their chunk of deals is done; the parent merges the summaries as they
+arrive.  No per game results are kept, so the memory used does not grow
+with the number of games.
+
+A Histogram counts non-negative integers.  Values below its exact limit
+get a bin each, larger values share log bins, SUB_BINS to every power of
+two, so a quantile is exact below the limit and within 1 / SUB_BINS of the
+value above it.  Histograms of the same limit merge by adding their bins.
+
+Game metrics:
+    moves_to_win: the moves made by the games that were won
+    passes: the passes through the draw pile, the first pass counts
+    cards_left_on_loss: the cards not on the foundation piles at the end
+        of the games that were lost
+    stuck_depth: the moves made before a lost game could not go on
+
+Game endings:
+    won: every card reached the foundation piles
+    no_move: the bot had no move
+    repeat: a position came back
+    max_moves: the move limit was reached
+
+Classes:
+    Histogram: counts of integers in fixed memory, with quantiles
+    GameStats: game counters and a Histogram of every metric
+"""
+from __future__ import division
+import csv
+import json
+import os
+
+METRICS = ('moves_to_win', 'passes', 'cards_left_on_loss', 'stuck_depth')
+ENDINGS = ('won', 'no_move', 'repeat', 'max_moves')
+QUANTILES = (0.5, 0.9, 0.99)
+SUB_BINS = 8
+_SUB_BITS = 3                   # SUB_BINS == 2 ** _SUB_BITS
+
+
+class Histogram(object):
+    """Counts of non-negative integers in bins that are exact below limit
+    and get wider above it
+
+    Attributes:
+        limit (int): values below it have a bin each, a power of two
+        count (int): the values added
+        total (int): the sum of the values added
+        low, high (int): the smallest and largest value added, None if
+            there are none
+        bins (dict): the count of every bin in use, by bin number
+
+    Public Methods:
+        add(value, count): counts value count times
+        merge(other): adds the counts of another Histogram
+        mean(): returns the mean value
+        quantile(q): returns the value q of the way through the values
+        bin_bounds(number): returns the values bin number counts
+        summary(): returns the counts and quantiles as a dict
+    """
+    def __init__(self, limit=1024):
+        """
+        Args:
+            limit (optional, int): values below it have a bin each, rounded
+                up to a power of two of at least 2 * SUB_BINS, default is
+                1024
+        """
+        self.limit = 1 << max(limit - 1, 2 * SUB_BINS - 1).bit_length()
+        self._limit_bits = self.limit.bit_length()
+        self.count = 0
+        self.total = 0
+        self.low = None
+        self.high = None
+        self.bins = {}
+
+    def add(self, value, count=1):
+        if value < 0:
+            raise ValueError('Histogram values can not be negative, not '
+                             '{0}'.format(value))
+        if value < self.limit:
+            number = value
+        else:
+            bits = value.bit_length()
+            number = (self.limit + (bits - self._limit_bits) * SUB_BINS +
+                      (value >> (bits - _SUB_BITS - 1)) - SUB_BINS)
+        self.bins[number] = self.bins.get(number, 0) + count
+        self.count += count
+        self.total += value * count
+        if self.low is None or value < self.low:
+            self.low = value
+        if self.high is None or value > self.high:
+            self.high = value
+
+    def merge(self, other):
+        """Adds the counts of other, a Histogram of the same limit"""
+        if other.limit != self.limit:
+            raise ValueError('can not merge Histograms with limits {0} and '
+                             '{1}'.format(self.limit, other.limit))
+        for number, count in other.bins.items():
+            self.bins[number] = self.bins.get(number, 0) + count
+        self.count += other.count
+        self.total += other.total
+        for value in (other.low, other.high):
+            if value is not None:
+                if self.low is None or value < self.low:
+                    self.low = value
+                if self.high is None or value > self.high:
+                    self.high = value
+
+    def bin_bounds(self, number):
+        """Returns (first, last), the values counted by bin number"""
+        if number < self.limit:
+            return number, number
+        power, sub = divmod(number - self.limit, SUB_BINS)
+        shift = self._limit_bits + power - _SUB_BITS - 1
+        first = (SUB_BINS + sub) << shift
+        return first, first + (1 << shift) - 1
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def quantile(self, q):
+        """Returns the smallest value with at least q of the values at or
+        below it, the first value of its bin above limit.  None if there
+        are no values
+
+        Args:
+            q (float): between 0 and 1
+        """
+        if not self.count:
+            return None
+        rank = max(1, q * self.count)
+        seen = 0
+        for number in sorted(self.bins):
+            seen += self.bins[number]
+            if seen >= rank:
+                return min(max(self.bin_bounds(number)[0], self.low),
+                           self.high)
+        return self.high
+
+    def summary(self):
+        """Returns a dict with the keys count, mean, min, max, p50, p90,
+        p99 and bins, a list of [first value, last value, count]
+        """
+        result = {'count': self.count,
+                  'mean': self.mean(),
+                  'min': self.low,
+                  'max': self.high}
+        for q in QUANTILES:
+            result['p{0:g}'.format(q * 100)] = self.quantile(q)
+        result['bins'] = [list(self.bin_bounds(number)) + [self.bins[number]]
+                          for number in sorted(self.bins)]
+        return result
+
+
+class GameStats(object):
+    """Counters and metric histograms of a set of finished games
+
+    Attributes:
+        games (int): the games added
+        wins (int): the games won
+        moves (int): the moves made by every game
+        score (int): the scores of every game added up, see
+            Solitaire.score()
+        endings (dict): the games by ENDINGS
+        histograms (dict): a Histogram of every one of METRICS
+
+    Public Methods:
+        add(game, moves, ending): adds a finished game
+        merge(other): adds the games of another GameStats
+        as_dict(): returns the statistics as a dict that json can save
+        save(path): writes the statistics as CSV or JSON
+    """
+    def __init__(self, limit=1024):
+        """
+        Args:
+            limit (optional, int): the exact limit of the histograms, see
+                Histogram, default is 1024
+        """
+        self.games = 0
+        self.wins = 0
+        self.moves = 0
+        self.score = 0
+        self.endings = dict((ending, 0) for ending in ENDINGS)
+        self.histograms = dict((metric, Histogram(limit))
+                               for metric in METRICS)
+
+    def add(self, game, moves, ending):
+        """Adds a game that has been played to its end
+
+        Args:
+            game (Solitaire): the game
+            moves (int): the moves made
+            ending (str): how the game ended, one of ENDINGS
+        """
+        histograms = self.histograms
+        self.games += 1
+        self.moves += moves
+        self.score += game.score()
+        self.endings[ending] += 1
+        histograms['passes'].add(game.recycles + 1)
+        if ending == 'won':
+            self.wins += 1
+            histograms['moves_to_win'].add(moves)
+        else:
+            histograms['cards_left_on_loss'].add(
+                52 - sum([len(home) for home in game.homes]))
+            histograms['stuck_depth'].add(moves)
+
+    def merge(self, other):
+        """Adds the games of other, a GameStats"""
+        self.games += other.games
+        self.wins += other.wins
+        self.moves += other.moves
+        self.score += other.score
+        for ending, count in other.endings.items():
+            self.endings[ending] += count
+        for metric, histogram in other.histograms.items():
+            self.histograms[metric].merge(histogram)
+
+    def as_dict(self):
+        """Returns a dict with the keys games, wins, win_rate, moves,
+        score, endings and metrics, a Histogram.summary() of every metric
+        """
+        return {'games': self.games,
+                'wins': self.wins,
+                'win_rate': self.wins / self.games if self.games else 0.0,
+                'moves': self.moves,
+                'score': self.score,
+                'endings': dict(self.endings),
+                'metrics': dict((metric, histogram.summary()) for
+                                metric, histogram in self.histograms.items())}
+
+    def save(self, path):
+        """Writes the statistics to path, replacing it: as CSV, one row per
+        metric, if path ends with .csv, otherwise as JSON
+        """
+        temporary = path + '.tmp'
+        if path.lower().endswith('.csv'):
+            columns = (['metric', 'count', 'mean', 'min', 'max'] +
+                       ['p{0:g}'.format(q * 100) for q in QUANTILES])
+            with open(temporary, 'w') as stats_file:
+                writer = csv.writer(stats_file, lineterminator='\n')
+                writer.writerow(columns)
+                for metric in METRICS:
+                    summary = self.histograms[metric].summary()
+                    writer.writerow([metric] + [summary[column] for column
+                                                in columns[1:]])
+                for name in ('games', 'wins', 'moves', 'score'):
+                    writer.writerow([name, getattr(self, name)])
+                for ending in ENDINGS:
+                    writer.writerow([ending, self.endings[ending]])
+        else:
+            with open(temporary, 'w') as stats_file:
+                json.dump(self.as_dict(), stats_file, indent=2,
+                          sort_keys=True)
+        os.rename(temporary, path)
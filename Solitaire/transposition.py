@@ -0,0 +1,258 @@
+"""A transposition table of fixed size for the solver
+
+The table is an open addressed array of packed entries: a 64 bit key and
+a 32 bit value, ENTRY_BYTES bytes each, so its memory does not grow
+however long a search runs.  Slots are grouped into buckets of BUCKET
+slots and a key can only be in the bucket its value modulo the number of
+buckets picks.  When a bucket is full the oldest entry in it is evicted
+to make room, and goes to the overflow table if there is one, else it is
+forgotten.  Forgetting a position only costs the solver time: it will be
+searched again when it comes up.
+
+A table can live in a memory mapped file instead of in memory, so a large
+overflow table on disk keeps a long solve going when memory runs out.  The
+file is kept when the table is closed and opened again by a table of the
+same size, so a search can be resumed, see solver.resume().
+
+Key 0 marks an empty slot, it is stored as key 1.
+
+Classes:
+    TranspositionTable: the table
+"""
+import array
+import mmap
+import os
+import struct
+
+ENTRY_BYTES = 12
+BUCKET = 4
+MAGIC = b'SOLTT\x00\x00\x02'
+_HEADER = struct.Struct('<8sQ')
+_COUNTERS = struct.Struct('<7Q')
+
+
+class TranspositionTable(object):
+    """A map of 64 bit keys to 32 bit values in fixed memory
+
+    Attributes:
+        size (int): the number of slots, a multiple of BUCKET
+        path (str): the file the slots are mapped from, None if they are
+            in memory
+        overflow (TranspositionTable): where evicted entries go, None if
+            they are forgotten
+        entries (int): the slots in use
+        hits (int): get() calls that found their key, in this table or the
+            overflow table
+        overflow_hits (int): the hits found in the overflow table
+        misses (int): get() calls that did not
+        stores (int): new keys stored
+        evictions (int): entries evicted to make room
+
+    Public Methods:
+        get(key, default): returns the value of key, or default
+        stats(): returns the counters as a dict
+        dump(table_file): writes the slots and counters to an open file
+        undump(table_file, path, overflow): creates the table written by
+            dump()
+        flush(): writes a mapped table to its file
+        close(): flushes and releases a mapped table
+    """
+    def __init__(self, size=1 << 20, path=None, overflow=None):
+        """
+        Args:
+            size (optional, int): the number of slots, rounded up to a
+                multiple of BUCKET, default is 1 << 20 (12 MB)
+            path (optional, str): keep the slots in this memory mapped
+                file, which is opened again if it holds a table of this
+                size, default is None (in memory)
+            overflow (optional, TranspositionTable): where evicted entries
+                go, default is None
+        """
+        self._buckets = max(1, -(-size // BUCKET))
+        self.size = self._buckets * BUCKET
+        self.path = path
+        self.overflow = overflow
+        self.entries = self.hits = self.overflow_hits = self.misses = 0
+        self.stores = self.evictions = 0
+        self._map = None
+        if path is None:
+            self._keys = array.array('Q', [0]) * self.size
+            self._values = array.array('I', [0]) * self.size
+        else:
+            self._open(path)
+
+    def _open(self, path):
+        length = _HEADER.size + self.size * ENTRY_BYTES
+        reopen = (os.path.exists(path) and os.path.getsize(path) == length)
+        descriptor = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if reopen:
+                with open(path, 'rb') as table_file:
+                    magic, size = _HEADER.unpack(
+                        table_file.read(_HEADER.size))
+                reopen = magic == MAGIC and size == self.size
+            if not reopen:
+                os.ftruncate(descriptor, 0)
+                os.ftruncate(descriptor, length)
+            self._map = mmap.mmap(descriptor, length)
+        finally:
+            os.close(descriptor)
+        self._map[:_HEADER.size] = _HEADER.pack(MAGIC, self.size)
+        view = memoryview(self._map)
+        end = _HEADER.size + self.size * 8
+        self._keys = view[_HEADER.size:end].cast('Q')
+        self._values = view[end:].cast('I')
+        view.release()
+        if reopen:
+            for start in range(0, self.size, 1 << 16):
+                keys = self._keys[start:start + (1 << 16)].tolist()
+                self.entries += len(keys) - keys.count(0)
+
+    def __len__(self):
+        return self.entries
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def get(self, key, default=None):
+        """Returns the value of key, looking in the overflow table if it
+        is not here, or default if it is in neither
+        """
+        key = key or 1
+        keys = self._keys
+        first = key % self._buckets * BUCKET
+        for slot in range(first, first + BUCKET):
+            found = keys[slot]
+            if found == key:
+                self.hits += 1
+                return self._values[slot]
+            if not found:
+                break
+        if self.overflow is not None:
+            value = self.overflow._find(key)
+            if value is not None:
+                self.hits += 1
+                self.overflow_hits += 1
+                return value
+        self.misses += 1
+        return default
+
+    def _find(self, key):
+        """get() without the counters, for a table used as overflow"""
+        keys = self._keys
+        first = key % self._buckets * BUCKET
+        for slot in range(first, first + BUCKET):
+            found = keys[slot]
+            if found == key:
+                return self._values[slot]
+            if not found:
+                break
+        return None
+
+    def __setitem__(self, key, value):
+        """Stores value, 0 to 2 ** 32 - 1, under key, evicting the oldest entry
+        of the bucket if it is full
+        """
+        key = key or 1
+        keys = self._keys
+        values = self._values
+        first = key % self._buckets * BUCKET
+        for slot in range(first, first + BUCKET):
+            found = keys[slot]
+            if found == key:
+                values[slot] = value
+                return
+            if not found:
+                keys[slot] = key
+                values[slot] = value
+                self.entries += 1
+                self.stores += 1
+                return
+        # Entries are kept oldest first, shift the bucket down one
+        last = first + BUCKET - 1
+        evicted_key, evicted_value = keys[first], values[first]
+        for slot in range(first, last):
+            keys[slot] = keys[slot + 1]
+            values[slot] = values[slot + 1]
+        keys[last] = key
+        values[last] = value
+        self.stores += 1
+        self.evictions += 1
+        if self.overflow is not None:
+            self.overflow[evicted_key] = evicted_value
+
+    def stats(self):
+        """Returns a dict with the keys size, entries, hits,
+        overflow_hits, misses, stores, evictions and overflow, the stats()
+        of the overflow table or None
+        """
+        return {'size': self.size,
+                'entries': self.entries,
+                'hits': self.hits,
+                'overflow_hits': self.overflow_hits,
+                'misses': self.misses,
+                'stores': self.stores,
+                'evictions': self.evictions,
+                'overflow': (self.overflow.stats()
+                             if self.overflow is not None else None)}
+
+    def dump(self, table_file):
+        """Writes the counters, and the slots unless they are mapped from a
+        file, to table_file.  A mapped table is flushed instead
+
+        Args:
+            table_file (file): a file open for binary writing
+        """
+        table_file.write(_COUNTERS.pack(
+            self.size, self.entries, self.hits, self.overflow_hits,
+            self.misses, self.stores, self.evictions))
+        if self._map is None:
+            table_file.write(self._keys.tobytes())
+            table_file.write(self._values.tobytes())
+        else:
+            self.flush()
+
+    @classmethod
+    def undump(cls, table_file, path=None, overflow=None):
+        """Creates the table written by dump()
+
+        Args:
+            table_file (file): a file open for binary reading
+            path (optional, str): the file a mapped table was mapped from,
+                default is None
+            overflow (optional, TranspositionTable): where evicted entries
+                go, default is None
+        """
+        counters = _COUNTERS.unpack(table_file.read(_COUNTERS.size))
+        table = cls(counters[0], path, overflow)
+        if path is None:
+            table._keys = array.array('Q')
+            table._keys.frombytes(table_file.read(table.size * 8))
+            table._values = array.array('I')
+            table._values.frombytes(table_file.read(table.size * 4))
+            table.entries = counters[1]
+        # A mapped table counted its entries when the file was opened, it
+        # may have been written to after the dump
+        (table.hits, table.overflow_hits, table.misses, table.stores,
+         table.evictions) = counters[2:]
+        return table
+
+    def flush(self):
+        if self._map is not None:
+            self._map.flush()
+
+    def close(self):
+        if self._map is not None:
+            self._keys.release()
+            self._values.release()
+            self._map.flush()
+            self._map.close()
+            self._map = None
+        if self.overflow is not None:
+            self.overflow.close()
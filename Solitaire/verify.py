@@ -0,0 +1,268 @@
+"""Replays a corpus of recorded games to check them, and builds an index of
+checkpoints to jump to any move of a recorded game
+
+Every game is dealt again from its deal number and every move byte is
+replayed through Solitaire.make_move (move_pile for moves, deal for deals),
+undo and redo.  A move that is not legal, an undo or redo with nothing to
+undo or redo, or a result that differs from the recorded one is reported.
+
+Moves are counted in record bytes: move k of a game is the position after
+its first k bytes, undo and redo bytes included.
+
+The index file holds a checkpoint every checkpoint_every moves of every
+game: Solitaire.save() of the game, which keeps the undo and redo
+journals, so undo bytes after the checkpoint replay correctly.  A sorted
+table of (record offset, move, position) at the end of the file is binary
+searched, so reaching a move replays at most checkpoint_every - 1 moves.
+
+Functions:
+    replay(record, checkpoint_every): replays a GameRecord
+    verify(path, workers, checkpoint_every, index_path): replays every
+        game of a corpus file across a pool of worker processes
+Classes:
+    CheckpointIndex: reads an index file and rebuilds games at any move
+
+Command line:
+    python -m Solitaire.verify games.rec --workers 8 --index games.idx
+"""
+from __future__ import print_function, division
+import argparse
+import bisect
+import multiprocessing
+import mmap
+import os
+import struct
+import sys
+import time
+
+from .record import REDO, RecordReader, UNDO
+from .solitaire import Solitaire
+
+INDEX_MAGIC = b'SOLIDX\x00\x01'
+_ENTRY = struct.Struct('<QIQ')
+_TRAILER = struct.Struct('<QQ')
+
+
+def replay(record, checkpoint_every=0):
+    """Replays a recorded game.  Returns (game, error, checkpoints): the
+    game after the last legal move, None or a description of the first
+    problem, and a list of (move, checkpoint bytes)
+
+    Args:
+        record (GameRecord): the game to replay
+        checkpoint_every (optional, int): moves between checkpoints, 0 for
+            no checkpoints, default is 0
+    """
+    game = Solitaire(record.deal_number)
+    checkpoints = []
+    for number, byte in enumerate(bytearray(record.moves)):
+        if checkpoint_every and number and number % checkpoint_every == 0:
+            checkpoints.append((number, game.save()))
+        if byte == UNDO:
+            legal = game.undo()
+        elif byte == REDO:
+            legal = game.redo()
+        else:
+            source, destination = divmod(byte, 12)
+            # make_move() would also accept moves onto the draw pile and
+            # between foundation piles, which are never played
+            legal = (source < 12 and (destination > 0 or source == 0) and
+                     not (source >= 8 and destination >= 8) and
+                     game.make_move((source, destination)))
+        if not legal:
+            return game, 'move {0}: byte {1} is not legal'.format(
+                number, byte), checkpoints
+    if game.check_win() != record.won:
+        return game, 'recorded {0} but replay {1}'.format(
+            'won' if record.won else 'lost',
+            'won' if game.check_win() else 'lost'), checkpoints
+    return game, None, checkpoints
+
+
+def _verify_chunk(args):
+    """Worker task: replays the records at offsets.  Returns (games, wins,
+    failures, checkpoints) where failures is a list of (offset,
+    deal_number, error) and checkpoints a list of (offset, move, bytes)
+    """
+    path, offsets, checkpoint_every = args
+    wins = 0
+    failures = []
+    checkpoints = []
+    with RecordReader(path) as reader:
+        for offset in offsets:
+            record = reader.record_at(offset)
+            game, error, game_checkpoints = replay(record, checkpoint_every)
+            if error is not None:
+                failures.append((offset, record.deal_number, error))
+            elif record.won:
+                wins += 1
+            checkpoints.extend((offset, move, data)
+                               for move, data in game_checkpoints)
+    return len(offsets), wins, failures, checkpoints
+
+
+def verify(path, workers=None, checkpoint_every=64, index_path=None,
+           chunk_size=500):
+    """Replays every game of a corpus file.  Returns a dict with the keys
+    games, wins, failures (a list of (offset, deal_number, error)) and
+    seconds
+
+    Args:
+        path (str): the corpus file
+        workers (optional, int): the number of worker processes, default
+            is None (one per cpu).  1 replays every game in this process
+        checkpoint_every (optional, int): moves between checkpoints,
+            default is 64
+        index_path (optional, str): the index file to write, default is
+            None (no index)
+        chunk_size (optional, int): the number of games sent to a worker
+            at a time, default is 500
+    """
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    if index_path is None:
+        checkpoint_every = 0
+    began = time.time()
+    with RecordReader(path) as reader:
+        offsets = [record.offset for record in reader]
+    tasks = [(path, offsets[first:first + chunk_size], checkpoint_every)
+             for first in range(0, len(offsets), chunk_size)]
+    if workers == 1:
+        results = map(_verify_chunk, tasks)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(workers)
+        results = pool.imap_unordered(_verify_chunk, tasks)
+    games = wins = 0
+    failures = []
+    table = []
+    index_file = None
+    try:
+        if index_path is not None:
+            index_file = open(index_path, 'wb')
+            index_file.write(INDEX_MAGIC)
+        for chunk_games, chunk_wins, chunk_failures, checkpoints in results:
+            games += chunk_games
+            wins += chunk_wins
+            failures.extend(chunk_failures)
+            for offset, move, data in checkpoints:
+                table.append((offset, move, index_file.tell()))
+                index_file.write(struct.pack('<I', len(data)) + data)
+        if index_file is not None:
+            table.sort()
+            table_position = index_file.tell()
+            for entry in table:
+                index_file.write(_ENTRY.pack(*entry))
+            index_file.write(_TRAILER.pack(table_position, len(table)))
+    finally:
+        if index_file is not None:
+            index_file.close()
+        if pool is not None:
+            pool.close()
+            pool.join()
+    failures.sort()
+    return {'games': games,
+            'wins': wins,
+            'failures': failures,
+            'seconds': time.time() - began}
+
+
+class CheckpointIndex(object):
+    """Reads an index file written by verify() and rebuilds recorded games
+    at any move
+
+    Public Methods:
+        game_at(record, move): returns the game after move moves
+        close(): unmaps the file
+    """
+    def __init__(self, path):
+        """
+        Args:
+            path (str): the index file
+        """
+        with open(path, 'rb') as index_file:
+            size = os.fstat(index_file.fileno()).st_size
+            if size < len(INDEX_MAGIC) + _TRAILER.size:
+                raise ValueError('{0} is not a checkpoint index'.format(path))
+            self._map = mmap.mmap(index_file.fileno(), 0,
+                                  access=mmap.ACCESS_READ)
+        if self._map[:len(INDEX_MAGIC)] != INDEX_MAGIC:
+            self._map.close()
+            raise ValueError('{0} is not a checkpoint index'.format(path))
+        self._table, self._count = _TRAILER.unpack_from(
+            self._map, size - _TRAILER.size)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, item):
+        """Returns the (offset, move, position) table entry number item"""
+        return _ENTRY.unpack_from(self._map, self._table + item * _ENTRY.size)
+
+    def game_at(self, record, move):
+        """Returns the game of record after its first move moves, starting
+        from the closest checkpoint at or before move
+
+        Args:
+            record (GameRecord): a record of the corpus the index was built
+                from
+            move (int): the number of record bytes to replay
+        """
+        if not 0 <= move <= len(record.moves):
+            raise ValueError('move {0} is not in a game of {1} moves'.format(
+                move, len(record.moves)))
+        # Entries sort as (offset, move, position), so the entry before the
+        # first one past (record.offset, move) is the closest checkpoint
+        found = bisect.bisect_right(self, (record.offset, move, 1 << 64)) - 1
+        start = 0
+        game = None
+        if found >= 0:
+            offset, checkpoint_move, position = self[found]
+            if offset == record.offset:
+                length = struct.unpack_from('<I', self._map, position)[0]
+                game = Solitaire.load(
+                    self._map[position + 4:position + 4 + length])
+                start = checkpoint_move
+        if game is None:
+            game = Solitaire(record.deal_number)
+        for byte in bytearray(record.moves[start:move]):
+            if byte == UNDO:
+                game.undo()
+            elif byte == REDO:
+                game.redo()
+            else:
+                game.make_move(divmod(byte, 12))
+        return game
+
+    def close(self):
+        self._map.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Replay a game record file and report problems')
+    parser.add_argument('path', help='game record file')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='worker processes, default is one per cpu')
+    parser.add_argument('--index', help='write a checkpoint index file')
+    parser.add_argument('--every', type=int, default=64,
+                        help='moves between checkpoints, default is 64')
+    args = parser.parse_args(argv)
+    result = verify(args.path, args.workers, args.every, args.index)
+    for offset, deal_number, error in result['failures']:
+        print('Offset {0}, deal {1}: {2}'.format(offset, deal_number, error))
+    print('Games:    {0}'.format(result['games']))
+    print('Wins:     {0}'.format(result['wins']))
+    print('Failures: {0}'.format(len(result['failures'])))
+    print('Seconds:  {0:.1f}'.format(result['seconds']))
+    return 1 if result['failures'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,30 @@
+"""Random keys for Zobrist hashing of solitaire positions
+
+A position is hashed as the XOR of one key for every card and the card it
+sits on, plus one key for the flip of every pile.  A card at the bottom of
+pile p sits on BOTTOM + p, using the Solitaire.all_piles pile numbers.
+Moving any number of cards from one pile to another only changes what the
+bottom moved card sits on, so the hash is updated in constant time.
+
+Canonical hashes, see canonical.py, ignore which tableau pile or which
+foundation pile holds the cards: every tableau pile bottom is
+TABLEAU_BOTTOM and every foundation pile bottom FOUNDATION_BOTTOM, and
+instead of its flip a tableau pile adds the FACE_UP_KEYS key of its first
+face up card.
+
+CARD_KEYS[card * 64 + under] is the key of card index card sitting on
+under, FLIP_KEYS[pile * 53 + flip] the key of pile number pile having flip
+flip.  The keys come from a fixed seed, so hashes are the same in every
+process.
+"""
+import random
+
+BOTTOM = 52
+TABLEAU_BOTTOM = BOTTOM + 1
+FOUNDATION_BOTTOM = BOTTOM + 8
+
+_random = random.Random(0x5017a12e)
+CARD_KEYS = tuple(_random.getrandbits(64) for _ in range(52 * 64))
+FLIP_KEYS = tuple(_random.getrandbits(64) for _ in range(12 * 53))
+FACE_UP_KEYS = tuple(_random.getrandbits(64) for _ in range(52))
+del _random
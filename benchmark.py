@@ -0,0 +1,321 @@
+"""Benchmarks for the hot paths of the solitaire engine
+Every benchmark plays the same numbered deals, so runs can be compared.
+Results are printed in microseconds per operation and can be saved as JSON.
+A saved run can be used as a baseline: benchmarks that are slower than the
+baseline by more than the threshold are flagged and the exit status is 1.
+
+- python benchmark.py: runs every benchmark
+- python benchmark.py --output base.json: saves the results
+- python benchmark.py --compare base.json --threshold 0.1: flags benchmarks
+  more than 10% slower than base.json
+- python benchmark.py automove board_str: runs only the named benchmarks
+"""
+from __future__ import print_function, division
+import argparse
+import json
+import platform
+import subprocess
+import sys
+from copy import deepcopy
+from timeit import default_timer as timer
+
+from Solitaire.automove import AutoMove
+from Solitaire.playing_cards import Deck
+from Solitaire.render import Renderer
+from Solitaire.simulate import play_game
+from Solitaire.solitaire import Solitaire
+
+BENCHMARKS = []
+
+
+def benchmark(function):
+    """Adds a benchmark.  function(deals, positions) makes its untimed setup
+    and returns a function that runs the timed part and returns the number
+    of operations it ran
+    """
+    BENCHMARKS.append((function.__name__, function))
+    return function
+
+
+def positions(deals, moves=25):
+    """Returns snapshots of the deals after up to moves AutoMove moves, so
+    the benchmarks see piles with face up runs and cards at home
+    """
+    states = []
+    for deal_number in deals:
+        game = Solitaire(deal_number)
+        auto_move = AutoMove()
+        for _ in range(moves):
+            if not auto_move(game):
+                break
+        states.append(game.snapshot())
+    return states
+
+
+@benchmark
+def deck_shuffle(deals, states):
+    def run():
+        for deal_number in deals:
+            Deck().shuffle(deal_number)
+        return len(deals)
+    return run
+
+
+@benchmark
+def setup(deals, states):
+    def run():
+        for deal_number in deals:
+            Solitaire(deal_number)
+        return len(deals)
+    return run
+
+
+@benchmark
+def move_pile_probe(deals, states):
+    games = [Solitaire.from_snapshot(state) for state in states]
+
+    def run():
+        for game in games:
+            piles = game.all_piles
+            for source in piles[:8]:
+                for destination in piles[1:]:
+                    game.move_pile(source, destination, False)
+        return len(games) * 8 * 11
+    return run
+
+
+@benchmark
+def move_home_probe(deals, states):
+    games = [Solitaire.from_snapshot(state) for state in states]
+
+    def run():
+        for game in games:
+            for source in game.all_piles[:8]:
+                game.move_home(source, False)
+        return len(games) * 8
+    return run
+
+
+@benchmark
+def cascade_home(deals, states):
+    games = [Solitaire.from_snapshot(state) for state in states]
+
+    def run():
+        for game in games:
+            if game.cascade_home():
+                game.undo()
+        return len(games)
+    return run
+
+
+@benchmark
+def legal_moves(deals, states):
+    games = [Solitaire.from_snapshot(state) for state in states]
+
+    def run():
+        for game in games:
+            game.legal_moves()
+        return len(games)
+    return run
+
+
+@benchmark
+def automove(deals, states):
+    games = [Solitaire.from_snapshot(state) for state in states]
+
+    def run():
+        count = 0
+        for game in games:
+            auto_move = AutoMove()
+            for _ in range(20):
+                if not auto_move(game):
+                    break
+                count += 1
+        return count
+    return run
+
+
+@benchmark
+def playout(deals, states):
+    def run():
+        for deal_number in deals:
+            play_game(deal_number)
+        return len(deals)
+    return run
+
+
+@benchmark
+def deepcopy_undo(deals, states):
+    games = [Solitaire.from_snapshot(state) for state in states]
+
+    def run():
+        for index, game in enumerate(games):
+            saved = deepcopy(game)
+            game.deal()
+            games[index] = saved
+        return len(games)
+    return run
+
+
+@benchmark
+def snapshot_undo(deals, states):
+    games = [Solitaire.from_snapshot(state) for state in states]
+
+    def run():
+        for game in games:
+            saved = game.snapshot()
+            game.deal()
+            game.restore(saved)
+        return len(games)
+    return run
+
+
+@benchmark
+def journal_undo(deals, states):
+    games = [Solitaire.from_snapshot(state) for state in states]
+
+    def run():
+        for game in games:
+            game.deal()
+            game.undo()
+        return len(games)
+    return run
+
+
+@benchmark
+def board_str(deals, states):
+    games = [Solitaire.from_snapshot(state) for state in states]
+
+    def run():
+        for game in games:
+            str(game)
+        return len(games)
+    return run
+
+
+@benchmark
+def render_frame(deals, states):
+    games = [Solitaire(deal_number) for deal_number in deals]
+
+    def run():
+        count = 0
+        for game in games:
+            renderer = Renderer()
+            auto_move = AutoMove()
+            renderer.frame(game)
+            for _ in range(20):
+                if not auto_move(game):
+                    break
+                renderer.frame(game)
+                count += 1
+        return count
+    return run
+
+
+@benchmark
+def cold_start(deals, states):
+    """Starts interpreters that import the engine like a worker process"""
+    command = [sys.executable, '-c',
+               'import Solitaire.simulate, Solitaire.verify, '
+               'Solitaire.estimate']
+
+    def run():
+        for _ in range(5):
+            subprocess.check_call(command)
+        return 5
+    return run
+
+
+def run_benchmarks(names=None, deals=range(100), repeat=5):
+    """Runs benchmarks and returns {name: microseconds per operation}, the
+    best of repeat runs
+
+    Args:
+        names (optional, list of str): the benchmarks to run, default is
+            None (all)
+        deals (optional, sequence of ints): the deal numbers every
+            benchmark uses, default is range(100)
+        repeat (optional, int): the number of runs of each benchmark
+    """
+    deals = list(deals)
+    states = positions(deals)
+    results = {}
+    for name, function in BENCHMARKS:
+        if names and name not in names:
+            continue
+        best = None
+        for _ in range(repeat):
+            run = function(deals, states)
+            began = timer()
+            operations = run()
+            seconds = timer() - began
+            if operations and (best is None or
+                               seconds / operations < best):
+                best = seconds / operations
+        results[name] = best * 1e6 if best is not None else None
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Returns the names of benchmarks more than threshold (a fraction)
+    slower than in baseline
+    """
+    return sorted(name for name, micros in results.items()
+                  if baseline.get(name) and micros is not None and
+                  micros > baseline[name] * (1 + threshold))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Time the hot paths of the solitaire engine')
+    parser.add_argument('names', nargs='*',
+                        help='benchmarks to run, default is all: ' +
+                        ', '.join(name for name, _ in BENCHMARKS))
+    parser.add_argument('--deals', type=int, default=100,
+                        help='number of deals, default is 100')
+    parser.add_argument('--start', type=int, default=0,
+                        help='first deal number, default is 0')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='runs of each benchmark, the best is kept, '
+                        'default is 5')
+    parser.add_argument('--output', help='save the results to a JSON file')
+    parser.add_argument('--compare', help='JSON file of a baseline run')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='slowdown flagged by --compare, default is 0.1')
+    args = parser.parse_args(argv)
+    results = run_benchmarks(args.names,
+                             range(args.start, args.start + args.deals),
+                             args.repeat)
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)['results']
+    for name, _ in BENCHMARKS:
+        if name not in results:
+            continue
+        if results[name] is None:
+            # No operations were counted
+            print('{0:<16} {1:>10}'.format(name, 'n/a'))
+            continue
+        line = '{0:<16} {1:>10.2f} us'.format(name, results[name])
+        if baseline.get(name):
+            line += '  {0:+.1%}'.format(results[name] / baseline[name] - 1)
+        print(line)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump({'python': platform.python_version(),
+                       'platform': platform.platform(),
+                       'deals': [args.start, args.deals],
+                       'repeat': args.repeat,
+                       'results': results}, output_file, indent=2,
+                      sort_keys=True)
+    slower = compare(results, baseline, args.threshold)
+    if slower:
+        print('Slower than {0} by more than {1:.0%}: {2}'.format(
+            args.compare, args.threshold, ', '.join(slower)))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
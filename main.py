@@ -2,9 +2,10 @@
 - The following inputs are valid:
   - 1 or <blank>: Draws a card from the deck
   - 2: Moves card(s) from one pile to another
-  - 3: Automatically moves all valid cards to the foundation piles
+  - 3: Automatically moves all valid cards to the foundation piles, a single Undo takes them all back
   - 4: Undo the last move
-  - 5: Start a new game
+  - 5: Start a new game, "5 N" starts deal number N
+  - a: Let AutoMove make a move, "a S" looks ahead for S seconds first
   - 0: Quit current game
 - When moving a card the following inputs are used to specify a pile
   - 0: Draw Pile
@@ -12,13 +13,21 @@
   - H: The Foundation Piles (used when moving to foundation piles)
   - H1-H4: The Foundation Piles from left to right (used when moving from the foundation piles)
 
+"python main.py games.rec" appends every game played to games.rec.
+
 The four foundation piles always hold the same suit.  From left to right they are Spade, Heart, Club, Diamond.
 """
 from __future__ import print_function
+from Solitaire.automove import AutoMove, LookaheadMove
+from Solitaire.record import RecordWriter
+from Solitaire.render import Renderer
 from Solitaire.solitaire import Solitaire
-from copy import deepcopy
+import sys
 from time import sleep
 
+# The most seconds "a S" looks ahead for
+MAX_LOOKAHEAD = 60.0
+
 
 def create_complete_game():
     """Used for debug, creates a game where the first 4 tableau piles are
@@ -62,6 +71,7 @@ def create_complete_game():
     test_game.piles[4] = CardPile()
     test_game.piles[5] = CardPile()
     test_game.piles[6] = CardPile()
+    test_game.rehash()
     return test_game
 
 
@@ -123,129 +133,79 @@ def move(game, selection=None):
     return False
 
 
-def weight_move(game, move):
-    """Takes a move and weights it according to how productive the move will be, lower weight holds higher precedence
-    Weights:
-    0: move card to foundation
-    1: move card from waste to tableau
-    2: move whole pile from tableau to tableau
-    3: move partial pile from tableau to tableau
-    4: move card from foundation to tableau
-    5: deal cards from deck to waste
-    99: lowest precedence to prevent pile switching loop
-    Returns (int): precedence
+def run_game(record=None):
+    """The games main loop.
 
     Args:
-        game (Solitaire): The game currently being played
-        move (tuple): (from pile, destination pile)
+        record (optional, str): a file every game is appended to, see
+            Solitaire/record.py, default is None
     """
-    # move home
-    if move[1] in game.homes:
-        return 0
-    # move from home
-    elif move[0] in game.homes:
-        return 5
-    # deal from deck
-    elif move[1] is game.deck:
-        return 4
-    # move from waste
-    elif move[0] is game.deck:
-        return 1
-    # top king to empty pile
-    elif len(move[1]) == 0 and move[0].flip == 0:
-        return 99
-    # full pile
-    elif len(move[1]) == 0 or move[1][-1].value - 1 == move[0][move[0].flip].value:
-        return 2
-    # partial pile
-    else:
-        return 3
-
-
-class AutoMove(object):
-    def __init__(self):
-        self.moves = {}
-        self.best_move = None
-        self.first_cycle = None
-
-    def __call__(self, game):
-        """Makes one valid move
-        Return True if a move was performed
-
-        Args:
-            game (Solitaire): The game where the cards will be moved
-        """
-        if (self.best_move is not None and self.best_move[0] is not game.deck and
-                game.move_pile(self.best_move[1], self.best_move[0], move=False)):
-            self.moves[(self.best_move[1], self.best_move[0])] = 99
-        for move in list(self.moves.keys()):
-            if not game.move_pile(move[0], move[1], move=False):
-                del self.moves[move]
-        if (game.deck, game.deck) not in self.moves and len(game.deck) > 0:
-            self.moves[(game.deck, game.deck)] = weight_move(game, (game.deck, game.deck))
-        for source_pile in [game.deck] + game.piles + game.homes:
-            for destination_pile in game.homes + game.piles:
-                if source_pile in game.homes and destination_pile in game.homes:
-                    continue
-                if ((source_pile, destination_pile) not in self.moves and
-                        game.move_pile(source_pile, destination_pile, move=False)):
-                    self.moves[(source_pile, destination_pile)] = weight_move(game, (source_pile, destination_pile))
-        self.best_move = min(self.moves, key=self.moves.get)
-        del self.moves[self.best_move]
-        if self.best_move[1] is game.deck:
-            return game.deal()
-        else:
-            return game.move_pile(*self.best_move)
-
-
-def run_game():
-    """The games main loop."""
+    writer = RecordWriter(record) if record else None
     game = Solitaire()  # Create new game
-    move_stack = []
+    if writer:
+        writer.record(game)
     auto_move = AutoMove()
-    print('\n', game, sep='')
+    lookahead = LookaheadMove(max_time=1.0, max_nodes=None)
+    renderer = Renderer()
+    print(renderer.frame(game), end='')
     while True:  # Main Loop
-        move_stack.append(deepcopy(game))
         selection = input('|1: Deal|2: Move Card'
                           '|3: Move Cards Home|4: Undo|5:New Game\n: ').split()
+        # Start under the board again, so prompts never scroll it
+        print(renderer.below(), end='')
         if len(selection) == 0 or selection[0] == '1':
             game.deal()
-            print('\n', game, sep='')
+            print(renderer.frame(game), end='')
         elif selection[0] == '2':
             selection.pop(0)
             if move(game, selection):
-                print('\n', game, sep='')
-            else:
-                move_stack.pop()
-
+                print(renderer.frame(game), end='')
         elif selection[0] == '3':
-            while any(game.move_home(pile) for pile in game.piles + [game.deck]):
+            before = Solitaire.from_snapshot(game.snapshot())
+            for frame in renderer.frames(before, game.cascade_home()):
                 sleep(0.2)
-                print('\n', game, sep='')
-                move_stack.append(deepcopy(game))
-            move_stack.pop()
+                print(frame, end='')
         elif selection[0] == '4':
-            move_stack.pop()
-            if len(move_stack) > 0:
-                game = move_stack.pop()
-                print('\n', game, sep='')
+            if game.undo():
+                print(renderer.frame(game), end='')
         elif selection[0] == '0':
             break
         elif selection[0] == 'DEBUG':
+            if game.recorder:
+                game.recorder.finish()
             game = create_complete_game()
-            print('\n', game, sep='')
+            print(renderer.frame(game), end='')
         elif selection[0] == '5':
-            game = Solitaire()
-            move_stack = []
-            print('\n', game, sep='')
-        elif selection[0] == 'a':
-            if auto_move(game):
-                print('\n', game, sep='')
+            if game.recorder:
+                game.recorder.finish()
+            if len(selection) > 1 and selection[1].isdigit():
+                game = Solitaire(int(selection[1]))
             else:
-                move_stack.pop()
+                game = Solitaire()
+            if writer:
+                writer.record(game)
+            print(renderer.frame(game), end='')
+            print('Deal', game.deal_number)
+        elif selection[0] == 'a':
+            bot = auto_move
+            if len(selection) > 1:
+                try:
+                    seconds = float(selection[1])
+                except ValueError:
+                    continue
+                # Also refuses inf and nan, which would look ahead for ever
+                if not 0 < seconds <= MAX_LOOKAHEAD:
+                    print('Look ahead for at most', MAX_LOOKAHEAD, 'seconds')
+                    continue
+                lookahead.max_time = seconds
+                bot = lookahead
+            if bot(game):
+                print(renderer.frame(game), end='')
         if game.check_win():
             print('YOU WIN!!!!')
             break
+    if writer:
+        writer.close()
 
 
 if __name__ == '__main__':
@@ -253,4 +213,4 @@ if __name__ == '__main__':
         input = raw_input
     except NameError:
         pass
-    run_game()
+    run_game(sys.argv[1] if len(sys.argv) > 1 else None)
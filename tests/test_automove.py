@@ -0,0 +1,83 @@
+"""Tests of the solitaire bots"""
+import random
+
+from Solitaire.automove import AutoMove, shuffle_hidden
+from Solitaire.solitaire import Solitaire
+
+
+def hidden_slots(state, piles):
+    """Returns the snapshot() offsets of the face down cards of piles"""
+    slots = []
+    offset = 24
+    for number in range(12):
+        if number in piles:
+            slots.extend(range(offset, offset + state[2 * number + 1]))
+        offset += state[2 * number]
+    return slots
+
+
+def test_shuffle_hidden_moves_only_unseen_cards():
+    """Tests that the face down cards are shuffled among themselves and
+    every other card stays
+    """
+    game = Solitaire(4)
+    game.deal()
+    state = bytearray(game.snapshot())
+    slots = hidden_slots(state, range(8))
+    shuffled = bytearray(shuffle_hidden(bytes(state), random.Random(1)))
+    assert shuffled != state
+    assert sorted(shuffled[slot] for slot in slots) == \
+        sorted(state[slot] for slot in slots)
+    for slot in set(range(len(state))) - set(slots):
+        assert shuffled[slot] == state[slot]
+
+
+def test_shuffle_hidden_keeps_the_dealt_draw_pile():
+    """Tests that after the waste pile is turned over, the draw pile keeps
+    its order, as every card of it has been seen
+    """
+    game = Solitaire(4)
+    while not game.recycles:
+        game.deal()
+    state = bytearray(game.snapshot())
+    deck = hidden_slots(state, [0])
+    assert deck
+    for seed in range(20):
+        shuffled = bytearray(shuffle_hidden(bytes(state), random.Random(seed),
+                                            game.recycles))
+        assert [shuffled[slot] for slot in deck] == \
+            [state[slot] for slot in deck]
+
+
+def test_changed_piles_pick_the_same_moves():
+    """Tests that AutoMove, which only looks again at the piles changed
+    since its last call, makes the same moves as an AutoMove that looks
+    at every pile every time, while undo, redo, cascade_home() and other
+    moves change the game between calls
+    """
+    for deal_number in range(20):
+        game = Solitaire(deal_number)
+        rescanned = Solitaire(deal_number)
+        auto_move = AutoMove()
+        full_scan = AutoMove()
+        rng = random.Random(deal_number)
+        for _ in range(300):
+            action = rng.random()
+            if action < 0.05:
+                game.undo()
+                rescanned.undo()
+            elif action < 0.08:
+                game.redo()
+                rescanned.redo()
+            elif action < 0.1:
+                game.cascade_home()
+                rescanned.cascade_home()
+            elif action < 0.15 and game.legal_moves():
+                move = rng.choice(game.legal_moves())
+                game.make_move(move)
+                rescanned.make_move(move)
+            else:
+                # A game it has not seen gets a scan of every pile
+                full_scan.game = None
+                assert auto_move(game) == full_scan(rescanned)
+            assert game.undo_stack == rescanned.undo_stack
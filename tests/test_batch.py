@@ -0,0 +1,36 @@
+"""Tests of the NumPy batch engine"""
+import pytest
+
+pytest.importorskip('numpy')
+
+from Solitaire.batch import play_greedy, play_objects  # noqa: E402
+from Solitaire.simulate import play_game  # noqa: E402
+
+
+def test_batch_engine_matches_solitaire_objects():
+    """Tests that the batch engine plays deals move for move like
+    GreedyMove on Solitaire objects
+    """
+    deal_numbers = range(300)
+    won, moves, home_cards = play_greedy(deal_numbers)
+    expected = play_objects(deal_numbers)
+    assert won.tolist() == expected[0]
+    assert moves.tolist() == expected[1]
+    assert home_cards.tolist() == expected[2]
+
+
+def test_batch_engine_wins_about_as_often_as_automove():
+    """Tests that the greedy policy wins about as many deals as AutoMove,
+    and gets about as many cards to the foundation piles, rather than
+    going round in circles
+    """
+    deal_numbers = range(300)
+    won, _, home_cards = play_greedy(deal_numbers)
+    auto_wins = auto_cards = 0
+    for deal_number in deal_numbers:
+        # The standard score is the number of cards on the foundations
+        game_won, _, score = play_game(deal_number)
+        auto_wins += game_won
+        auto_cards += score
+    assert abs(int(won.sum()) - auto_wins) <= 0.02 * len(deal_numbers)
+    assert home_cards.sum() >= 0.9 * auto_cards
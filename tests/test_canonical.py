@@ -0,0 +1,93 @@
+"""Tests of the canonical position keys in Solitaire.canonical"""
+import random
+
+from Solitaire.automove import AutoMove
+from Solitaire.canonical import canonical_hash
+from Solitaire.solitaire import Solitaire
+from Solitaire.solver import Solver
+
+
+def shuffle_piles(state, rng):
+    """Returns a snapshot() with the tableau piles and the foundation piles
+    put in a random order
+    """
+    state = bytearray(state)
+    piles = []
+    offset = 24
+    for number in range(12):
+        length = state[2 * number]
+        piles.append((state[2 * number:2 * number + 2],
+                      state[offset:offset + length]))
+        offset += length
+    tableau, homes = piles[1:8], piles[8:]
+    rng.shuffle(tableau)
+    rng.shuffle(homes)
+    piles = piles[:1] + tableau + homes
+    return bytes(b''.join(bytes(header) for header, _ in piles) +
+                 b''.join(bytes(cards) for _, cards in piles))
+
+
+def played(deal_number, moves):
+    game = Solitaire(deal_number)
+    auto_move = AutoMove()
+    for _ in range(moves):
+        if not auto_move(game):
+            break
+    return game
+
+
+def test_pile_order_does_not_change_the_key():
+    """Tests that reordering the tableau and foundation piles keeps the
+    canonical key and hash, and that other positions get other keys
+    """
+    rng = random.Random(0)
+    keys = set()
+    for deal_number in range(30):
+        game = played(deal_number, rng.randrange(80))
+        state = game.snapshot()
+        moved = Solitaire.from_snapshot(shuffle_piles(state, rng))
+        assert moved.canonical_key() == game.canonical_key()
+        assert canonical_hash(moved.snapshot()) == canonical_hash(state)
+        assert len(game.canonical_key()) <= 72
+        keys.add(game.canonical_key())
+    assert len(keys) == 30
+
+
+def test_king_to_either_empty_pile():
+    """Tests that a king moved to one empty pile or another gives the
+    same key, while the exact state_hash differs
+    """
+    # The King of Spades on the waste pile, tableau piles 1 and 2 empty
+    deck = list(range(12)) + [12]
+    tableau = [[], []] + [list(range(13 + 8 * pile, min(21 + 8 * pile, 52)))
+                          for pile in range(5)]
+    piles = [(deck, len(deck) - 1)] + [(cards, max(len(cards) - 1, 0))
+                                       for cards in tableau] + [([], 0)] * 4
+    state = bytes(bytearray(
+        [value for cards, flip in piles for value in (len(cards), flip)] +
+        [card for cards, _ in piles for card in cards]))
+    first = Solitaire.from_snapshot(state)
+    assert first.move_pile(first.deck, first.all_piles[1])
+    second = Solitaire.from_snapshot(state)
+    assert second.move_pile(second.deck, second.all_piles[2])
+    assert first.state_hash != second.state_hash
+    assert first.canonical_key() == second.canonical_key()
+
+
+def test_solver_keeps_the_canonical_hash():
+    """Tests that the solver's move by move hash is canonical_hash()"""
+    rng = random.Random(1)
+    for deal_number in range(10):
+        game = played(deal_number, rng.randrange(40))
+        solver = Solver(game)
+        assert solver.key() == canonical_hash(game.snapshot())
+        records = []
+        for _ in range(150):
+            moves = solver.moves()
+            if not moves:
+                break
+            records.append(solver.apply(rng.choice(moves)))
+            assert solver.key() == solver.rehash()
+        while records:
+            solver.undo(records.pop())
+        assert solver.key() == canonical_hash(game.snapshot())
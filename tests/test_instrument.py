@@ -0,0 +1,53 @@
+"""Tests of the opt-in engine instrumentation"""
+from Solitaire import instrument
+from Solitaire.automove import AutoMove
+from Solitaire.solitaire import Solitaire
+
+
+def test_counts_a_game_and_disable_restores():
+    """Tests the counters of a game won by AutoMove, and that disable()
+    puts the original methods back
+    """
+    originals = [(cls, name, cls.__dict__[name])
+                 for cls, names in instrument.METHODS for name in names]
+    instrument.reset()
+    instrument.enable()
+    try:
+        assert instrument.enabled()
+        assert Solitaire.__dict__['deal'] is not originals[0][2]
+        game = Solitaire(33)
+        auto_move = AutoMove()
+        calls = 0
+        while not game.check_win():
+            auto_move(game)
+            calls += 1
+        journal = list(game.undo_stack)
+        assert not game.move_pile(game.piles[0], game.piles[1], False)
+        for _ in range(3):
+            game.undo()
+        for _ in range(2):
+            game.redo()
+        stats = instrument.stats()
+    finally:
+        instrument.disable()
+    assert not instrument.enabled()
+    for cls, name, original in originals:
+        assert cls.__dict__[name] is original
+    deals = [entry for entry in journal if entry[0] == entry[1] == 0]
+    moves = [entry for entry in journal if entry[0] != entry[1]]
+    assert stats['totals'] == {
+        'probes': 1,
+        'moves': len(moves),
+        'deals': len(deals),
+        'recycles': sum([entry[3] for entry in deals]),
+        'flips': sum([entry[3] for entry in moves]),
+        'undos': 3,
+        'redos': 2}
+    assert [entry['deal_number'] for entry in stats['games']] == [33]
+    methods = stats['methods']
+    assert methods['AutoMove.__call__']['calls'] == calls
+    assert sum(stats['candidates'].values()) == calls
+    assert methods['Solitaire.undo']['calls'] == 3
+    for counts in methods.values():
+        assert sum(counts['histogram']) == counts['calls']
+    assert methods['Solitaire.legal_moves']['calls'] == calls
@@ -0,0 +1,198 @@
+"""Tests of the cards and decks in Solitaire.playing_cards"""
+import re
+
+import pytest
+
+from Solitaire.playing_cards import (BLACK, RED, Card, Deck, deal_permutation,
+                                     seed_deal_number)
+
+ANSI_CODE = re.compile('\033\\[[0-9;]*m')
+
+
+def plain(card):
+    """Returns str(card) without its ANSI color codes"""
+    return ANSI_CODE.sub('', str(card))
+
+
+def test_default_card_creation():
+    """Tests if card constructor with no arguments creates the Ace of Spades"""
+    test_card = Card()
+    ace_spades = Card(1, 'Spade')
+    assert test_card == ace_spades
+
+
+def test_cards_are_shared():
+    """Tests that the same card object is returned for the same card and
+    that copies do not create new cards
+    """
+    from copy import copy, deepcopy
+    import pickle
+    card = Card(12, 'Heart')
+    assert card is Card(12, 'Heart')
+    assert card is copy(card)
+    assert card is deepcopy([card])[0]
+    assert card is pickle.loads(pickle.dumps(card))
+    assert card.index == 24
+    assert card.color == RED
+    assert Card(12, 'Club').color == BLACK
+
+
+def test_card_repr_all_52():
+    """Tests creation of all 52 cards"""
+    spades = [Card(x, 'Spade') for x in range(1, 14)]
+    hearts = [Card(x, 'Heart') for x in range(1, 14)]
+    clubs = [Card(x, 'Club') for x in range(1, 14)]
+    diamonds = [Card(x, 'Diamond') for x in range(1, 14)]
+    spades_repr = [repr('Value = 1, Suit = Spade'),
+                   repr('Value = 2, Suit = Spade'),
+                   repr('Value = 3, Suit = Spade'),
+                   repr('Value = 4, Suit = Spade'),
+                   repr('Value = 5, Suit = Spade'),
+                   repr('Value = 6, Suit = Spade'),
+                   repr('Value = 7, Suit = Spade'),
+                   repr('Value = 8, Suit = Spade'),
+                   repr('Value = 9, Suit = Spade'),
+                   repr('Value = 10, Suit = Spade'),
+                   repr('Value = 11, Suit = Spade'),
+                   repr('Value = 12, Suit = Spade'),
+                   repr('Value = 13, Suit = Spade')]
+    hearts_repr = [repr('Value = 1, Suit = Heart'),
+                   repr('Value = 2, Suit = Heart'),
+                   repr('Value = 3, Suit = Heart'),
+                   repr('Value = 4, Suit = Heart'),
+                   repr('Value = 5, Suit = Heart'),
+                   repr('Value = 6, Suit = Heart'),
+                   repr('Value = 7, Suit = Heart'),
+                   repr('Value = 8, Suit = Heart'),
+                   repr('Value = 9, Suit = Heart'),
+                   repr('Value = 10, Suit = Heart'),
+                   repr('Value = 11, Suit = Heart'),
+                   repr('Value = 12, Suit = Heart'),
+                   repr('Value = 13, Suit = Heart')]
+    clubs_repr = [repr('Value = 1, Suit = Club'),
+                  repr('Value = 2, Suit = Club'),
+                  repr('Value = 3, Suit = Club'),
+                  repr('Value = 4, Suit = Club'),
+                  repr('Value = 5, Suit = Club'),
+                  repr('Value = 6, Suit = Club'),
+                  repr('Value = 7, Suit = Club'),
+                  repr('Value = 8, Suit = Club'),
+                  repr('Value = 9, Suit = Club'),
+                  repr('Value = 10, Suit = Club'),
+                  repr('Value = 11, Suit = Club'),
+                  repr('Value = 12, Suit = Club'),
+                  repr('Value = 13, Suit = Club')]
+    diamonds_repr = [repr('Value = 1, Suit = Diamond'),
+                     repr('Value = 2, Suit = Diamond'),
+                     repr('Value = 3, Suit = Diamond'),
+                     repr('Value = 4, Suit = Diamond'),
+                     repr('Value = 5, Suit = Diamond'),
+                     repr('Value = 6, Suit = Diamond'),
+                     repr('Value = 7, Suit = Diamond'),
+                     repr('Value = 8, Suit = Diamond'),
+                     repr('Value = 9, Suit = Diamond'),
+                     repr('Value = 10, Suit = Diamond'),
+                     repr('Value = 11, Suit = Diamond'),
+                     repr('Value = 12, Suit = Diamond'),
+                     repr('Value = 13, Suit = Diamond')]
+    assert [repr(x) for x in spades] == spades_repr
+    assert [repr(x) for x in hearts] == hearts_repr
+    assert [repr(x) for x in clubs] == clubs_repr
+    assert [repr(x) for x in diamonds] == diamonds_repr
+
+
+def test_card_string_all_52():
+    """Tests if the string representation of all cards is correct, the
+    text between the ANSI color codes and the colors
+    """
+    spades = [Card(x, 'Spade') for x in range(1, 14)]
+    hearts = [Card(x, 'Heart') for x in range(1, 14)]
+    clubs = [Card(x, 'Club') for x in range(1, 14)]
+    diamonds = [Card(x, 'Diamond') for x in range(1, 14)]
+    spades_str = ['A S', '2 S', '3 S', '4 S', '5 S', '6 S', '7 S',
+                  '8 S', '9 S', 'T S', 'J S', 'Q S', 'K S']
+    hearts_str = ['A H', '2 H', '3 H', '4 H', '5 H', '6 H', '7 H',
+                  '8 H', '9 H', 'T H', 'J H', 'Q H', 'K H']
+    clubs_str = ['A C', '2 C', '3 C', '4 C', '5 C', '6 C', '7 C',
+                 '8 C', '9 C', 'T C', 'J C', 'Q C', 'K C']
+    diamonds_str = ['A D', '2 D', '3 D', '4 D', '5 D', '6 D', '7 D',
+                    '8 D', '9 D', 'T D', 'J D', 'Q D', 'K D']
+    assert [plain(x) for x in spades] == spades_str
+    assert [plain(x) for x in hearts] == hearts_str
+    assert [plain(x) for x in clubs] == clubs_str
+    assert [plain(x) for x in diamonds] == diamonds_str
+    # Black on white for spades and clubs, red on white for the others
+    assert all(str(x).startswith('\033[47;30m') for x in spades + clubs)
+    assert all(str(x).startswith('\033[47;31m') for x in hearts + diamonds)
+
+
+def test_invalid_cards():
+    """Tests if bad values in card creation will raise an exception"""
+    with pytest.raises(ValueError):
+        Card(0, 'Spade')
+    with pytest.raises(ValueError):
+        Card(1, 'Spades')
+    with pytest.raises(ValueError):
+        Card(14, 'SPADE')
+
+
+def test_full_deck_creation():
+    """Tests that all 52 cards are created in order from the
+    default constructor
+    """
+    deck = Deck()
+    full_deck = Deck()
+    full_deck.deck = [Card(value, suit) for suit in
+                      ['Spade', 'Heart', 'Club', 'Diamond']
+                      for value in range(1, 14)]
+    assert deck.deck == full_deck.deck
+
+
+def test_deck_shuffle():
+    """Tests that the deck is shuffled each time shuffle() is called"""
+    deck = Deck()
+    deck_str = str(deck)
+    shuffled = str(deck)
+    assert deck_str == shuffled
+    for _ in range(10):
+        deck.shuffle()
+        shuffled = str(deck)
+        assert deck_str != shuffled
+        deck_str = shuffled
+
+
+def test_deck_shuffle_deal_number():
+    """Tests that a deal number always gives the same order and that
+    different deal numbers give different orders
+    """
+    deck = Deck()
+    deck.shuffle(42)
+    same = Deck()
+    same.shuffle(42)
+    other = Deck()
+    other.shuffle(43)
+    assert deck.deck == same.deck
+    assert deck.deck != other.deck
+    assert sorted(deal_permutation(42)) == list(range(52))
+    assert seed_deal_number('bug 17') == seed_deal_number('bug 17')
+
+
+def test_deck_deal():
+    """Tests that cards are dealt from the end of the deck and removed
+    when dealt
+    """
+    deck = Deck()
+    assert Card(13, 'Diamond') == deck.deal()
+    assert Card(13, 'Diamond') != deck.deal()
+    assert Card(11, 'Diamond') == deck.deal()
+
+
+def test_empty_deck():
+    """Tests that IndexError is raised when trying to deal from an
+    empty deck
+    """
+    deck = Deck()
+    while len(deck) > 0:
+        deck.deal()
+    with pytest.raises(IndexError):
+        deck.deal()
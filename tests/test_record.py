@@ -0,0 +1,74 @@
+"""Tests of the game record files"""
+import random
+
+import pytest
+
+from Solitaire.automove import AutoMove
+from Solitaire.record import (MAGIC, REDO, UNDO, RecordReader, RecordWriter,
+                              decode_move, encode_move)
+from Solitaire.solitaire import Solitaire
+
+
+def play_recorded(writer, deal_number, count=60):
+    """Records a game of count random moves, undos and redos.  Returns
+    the move bytes expected in its record
+    """
+    game = Solitaire(deal_number)
+    recorder = writer.record(game)
+    rng = random.Random(deal_number)
+    expected = bytearray()
+    for _ in range(count):
+        if rng.random() < 0.15 and game.undo():
+            expected.append(UNDO)
+            if rng.random() < 0.5 and game.redo():
+                expected.append(REDO)
+        else:
+            move = rng.choice(game.legal_moves())
+            game.make_move(move)
+            expected.append(encode_move(*move))
+    recorder.finish()
+    return bytes(expected)
+
+
+def test_records_read_back(tmp_path):
+    """Tests that recorded games read back with their deal, move bytes
+    and result
+    """
+    path = str(tmp_path / 'games.rec')
+    with RecordWriter(path) as writer:
+        expected = [(deal_number, play_recorded(writer, deal_number), False)
+                    for deal_number in range(5)]
+        game = Solitaire(33)
+        writer.record(game)
+        auto_move = AutoMove()
+        while not game.check_win():
+            auto_move(game)
+    assert writer.games == 6
+    with open(path, 'rb') as corpus:
+        assert corpus.read(len(MAGIC)) == MAGIC
+    with RecordReader(path) as reader:
+        records = list(reader)
+        assert [(record.deal_number, bytes(record.moves), record.won)
+                for record in records[:5]] == expected
+        assert records[5].deal_number == 33 and records[5].won
+        assert reader.record_at(records[2].offset) == records[2]
+    assert all(UNDO in moves and REDO in moves for _, moves, _ in expected)
+
+
+def test_move_bytes():
+    """Tests that every move byte decodes to its move"""
+    for source in range(12):
+        for destination in range(12):
+            byte = encode_move(source, destination)
+            assert byte < UNDO
+            assert decode_move(byte) == (source, destination)
+    assert decode_move(UNDO) == UNDO
+    assert decode_move(REDO) == REDO
+
+
+def test_not_a_record_file(tmp_path):
+    """Tests that a file without the magic is refused"""
+    path = tmp_path / 'other.rec'
+    path.write_bytes(b'not a record file')
+    with pytest.raises(ValueError):
+        RecordReader(str(path))
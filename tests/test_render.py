@@ -0,0 +1,110 @@
+"""Tests of the text board and the ANSI renderer"""
+import random
+import re
+
+from Solitaire.render import Renderer, board
+from Solitaire.solitaire import Solitaire
+
+ANSI = re.compile(r'\x1b\[([0-9;]*)([A-Za-z])')
+
+
+def plain(text):
+    """Returns text without its ANSI codes"""
+    return ANSI.sub('', text)
+
+
+def shown(text):
+    """Returns text as a screen shows it: no trailing spaces or lines"""
+    return '\n'.join(line.rstrip() for line in text.split('\n')).rstrip('\n')
+
+
+class Screen(object):
+    """A terminal that understands the ANSI codes Renderer writes"""
+    def __init__(self, rows=60, width=40):
+        self.lines = [[' '] * width for _ in range(rows)]
+        self.row = self.column = 0
+
+    def write(self, text):
+        for match in re.finditer(r'\x1b\[([0-9;]*)([A-Za-z])|\n|.', text):
+            if match.group(2) == 'H':
+                numbers = match.group(1).split(';')
+                self.row = int(numbers[0] or 1) - 1
+                self.column = int(numbers[1]) - 1 if len(numbers) > 1 else 0
+            elif match.group(2) == 'J':
+                clear_all = match.group(1) == '2'
+                for row in range(len(self.lines)):
+                    if clear_all or row > self.row:
+                        self.clear(row, 0)
+                    elif row == self.row:
+                        self.clear(row, self.column)
+            elif match.group(2) == 'K':
+                self.clear(self.row, 0)
+            elif match.group(2) is None:
+                if match.group() == '\n':
+                    self.row += 1
+                    self.column = 0
+                else:
+                    self.lines[self.row][self.column] = match.group()
+                    self.column += 1
+
+    def clear(self, row, column):
+        line = self.lines[row]
+        line[column:] = [' '] * (len(line) - column)
+
+    def text(self):
+        """Returns the screen as shown() returns text"""
+        return shown('\n'.join(''.join(line) for line in self.lines))
+
+
+def test_board_text():
+    """Tests the board of a new deal without its colours"""
+    assert plain(board(Solitaire(1))).split('\n') == [
+        '***  ---       ---  ---  ---  ---  ',
+        '',
+        'T H  ***  ***  ***  ***  ***  ***  ',
+        '---  4 C  ***  ***  ***  ***  ***  ',
+        '---  ---  K C  ***  ***  ***  ***  ',
+        '---  ---  ---  T D  ***  ***  ***  ',
+        '---  ---  ---  ---  5 D  ***  ***  ',
+        '---  ---  ---  ---  ---  5 C  ***  ',
+        '---  ---  ---  ---  ---  ---  7 C  ',
+        '']
+
+
+def test_frames_draw_the_board():
+    """Tests that after every frame the screen shows board(), while later
+    frames only redraw what changed
+    """
+    for deal_number in range(5):
+        game = Solitaire(deal_number)
+        renderer = Renderer(rows=60)
+        screen = Screen()
+        first = renderer.frame(game)
+        screen.write(first)
+        rng = random.Random(deal_number)
+        for _ in range(100):
+            if rng.random() < 0.2:
+                game.undo()
+            else:
+                game.make_move(rng.choice(game.legal_moves()))
+            frame = renderer.frame(game)
+            assert len(frame) < len(first)
+            screen.write(frame)
+            assert screen.text() == shown(plain(board(game)))
+
+
+def test_below_redraws_a_board_that_may_have_scrolled():
+    """Tests that below() moves under the board, and that a terminal too
+    short for the board and the prompts gets a whole frame next
+    """
+    game = Solitaire(1)
+    renderer = Renderer(rows=60)
+    assert renderer.below() == ''
+    renderer.frame(game)
+    # Two rows above the tableau, seven tableau rows
+    assert renderer.below() == '\x1b[10;1H\x1b[J'
+    game.deal()
+    assert not renderer.frame(game).startswith('\x1b[2J')
+    renderer.rows = 14
+    renderer.below()
+    assert renderer.frame(game).startswith('\x1b[2J\x1b[H')
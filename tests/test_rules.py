@@ -0,0 +1,189 @@
+"""Tests of the rule variants in Solitaire.rules"""
+import pickle
+import random
+
+import pytest
+
+from Solitaire.rules import DRAW_ONE, PRESETS, STANDARD, VEGAS, Rules
+from Solitaire.simulate import simulate
+from Solitaire.solitaire import Solitaire
+
+VARIANTS = [STANDARD, DRAW_ONE, VEGAS,
+            Rules(build='suit', empty='any'),
+            Rules(draw=1, build='any', home_suits=True, from_home=False)]
+
+
+def accepted(game, source, destination):
+    """Returns True if move_pile() or deal() makes the move, undoing it"""
+    if source == destination == 0:
+        moved = game.deal()
+    else:
+        piles = game.all_piles
+        moved = game.move_pile(piles[source], piles[destination])
+    if moved:
+        game.undo()
+    return moved
+
+
+@pytest.mark.parametrize('rules', VARIANTS, ids=repr)
+def test_legal_moves_match_move_pile(rules):
+    """Tests that legal_moves() lists exactly the moves move_pile() and
+    deal() accept while a game is played through
+    """
+    for deal_number in range(5):
+        game = Solitaire(deal_number, rules=rules)
+        for _ in range(60):
+            legal = game.legal_moves()
+            every = [(0, 0)] + [(source, destination)
+                                for source in range(12)
+                                for destination in range(1, 12)
+                                if source != destination]
+            assert sorted(legal) == [move for move in every
+                                     if accepted(game, *move)]
+            if not legal:
+                break
+            game.make_move(legal[len(legal) // 2])
+
+
+@pytest.mark.parametrize('rules', VARIANTS, ids=repr)
+def test_legal_moves_of_piles(rules):
+    """Tests that legal_moves(piles) lists the moves of legal_moves() from
+    or to the piles in the mask, in the same order
+    """
+    masks = [0, 1, 3, 0x102, 0x881, 0xffe] + [1 << pile for pile in range(12)]
+    for deal_number in range(5):
+        game = Solitaire(deal_number, rules=rules)
+        for _ in range(60):
+            legal = game.legal_moves()
+            for mask in masks:
+                assert game.legal_moves(mask) == [
+                    move for move in legal
+                    if (mask >> move[0] | mask >> move[1]) & 1]
+            if not legal:
+                break
+            game.make_move(legal[len(legal) // 2])
+
+
+def move_order(move):
+    """Sorts moves the way legal_moves() orders them: the deal, then by
+    source pile, foundation piles before tableau piles
+    """
+    source, destination = move
+    return source, 0 < destination < 8, destination
+
+
+@pytest.mark.parametrize('rules', VARIANTS, ids=repr)
+def test_legal_moves_order(rules):
+    """Tests that legal_moves() lists moves by source and then destination,
+    empty tableau piles in their place among the others
+    """
+    mixed = 0
+    for deal_number in range(10):
+        game = Solitaire(deal_number, rules=rules)
+        rng = random.Random(deal_number)
+        for _ in range(300):
+            legal = game.legal_moves()
+            assert legal == sorted(legal, key=move_order)
+            for mask in (1, 1 << 1, 1 << 7):
+                assert game.legal_moves(mask) == sorted(
+                    game.legal_moves(mask), key=move_order)
+            filled = [bool(game.piles[destination - 1].pile)
+                      for source, destination in legal
+                      if source == 0 < destination < 8]
+            if False in filled and True in filled[filled.index(False):]:
+                mixed += 1
+            if not legal:
+                break
+            game.make_move(rng.choice(legal))
+    if rules.empty == 'any':
+        # The draw pile card fit an empty pile before a pile with cards
+        assert mixed
+
+
+def test_empty_pile_rules():
+    """Tests that only a king fills an empty pile unless empty is 'any'"""
+    for rules, takes_any in ((STANDARD, False), (Rules(empty='any'), True)):
+        accepts = rules.tableau_accepts[52]
+        assert accepts & (1 << 12)                  # King of Spades
+        assert bool(accepts & 1) == takes_any       # Ace of Spades
+
+
+def test_pass_limit():
+    """Tests that the waste pile is turned over at most passes - 1 times
+    and that undo gives the pass back
+    """
+    game = Solitaire(3, rules=VEGAS)
+    while game.deal():
+        pass
+    recycles = game.recycles
+    assert recycles == VEGAS.passes - 1
+    assert (0, 0) not in game.legal_moves()
+    while game.recycles == recycles:
+        game.undo()
+    assert game.recycles == recycles - 1
+    assert game.deal()
+
+
+def test_vegas_score():
+    """Tests that Vegas scoring pays 5 a card less 52 for the deal"""
+    game = Solitaire(0, rules=VEGAS)
+    assert game.score() == -52
+    assert VEGAS.score(52) == 208
+    assert STANDARD.score(10) == 10
+
+
+def test_rules_pickle_and_compare():
+    """Tests that rules survive pickling and compare by value"""
+    for rules in PRESETS.values():
+        assert pickle.loads(pickle.dumps(rules)) == rules
+    assert Rules(draw=1) == DRAW_ONE
+    assert Rules(draw=1) != STANDARD
+    with pytest.raises(ValueError):
+        Rules(build='color')
+
+
+def test_save_keeps_recycles():
+    """Tests that load() counts the passes already made"""
+    game = Solitaire(1, rules=VEGAS)
+    while game.recycles == 0:
+        game.deal()
+    loaded = Solitaire.load(game.save())
+    assert loaded.recycles == game.recycles
+    assert loaded.snapshot() == game.snapshot()
+
+
+@pytest.mark.parametrize('rules', VARIANTS + [Rules(passes=1, empty='any')],
+                         ids=repr)
+def test_save_keeps_rules(rules):
+    """Tests that load() plays by the rules of the saved game, and that
+    games saved without rules load with the rules they are given
+    """
+    game = Solitaire(2, rules=rules)
+    for _ in range(30):
+        moves = game.legal_moves()
+        if not moves:
+            break
+        game.make_move(moves[-1])
+    data = game.save()
+    assert Rules.unpack(rules.pack()) == rules
+    loaded = Solitaire.load(data)
+    assert loaded.rules == rules
+    assert loaded.snapshot() == game.snapshot()
+    assert loaded.undo_stack == game.undo_stack
+    assert loaded.legal_moves() == game.legal_moves()
+    if rules == STANDARD:
+        assert Solitaire.load(data, rules=VEGAS).rules == VEGAS
+    else:
+        # The rules follow the journal, standard games save without them
+        loaded.rules = STANDARD
+        assert data == loaded.save() + rules.pack()
+
+
+def test_only_standard_games_are_recorded(tmp_path):
+    """Tests that simulate() refuses to record a rule variant"""
+    with pytest.raises(ValueError):
+        simulate(1, workers=1, record=str(tmp_path / 'games.rec'),
+                 rules=VEGAS)
+    result = simulate(4, workers=1, rules=VEGAS)
+    assert result['games'] == 4
+    assert -52 <= result['score_per_game'] <= 208
@@ -0,0 +1,127 @@
+"""Tests of the game server"""
+import asyncio
+import os
+import re
+import socket
+import threading
+import time
+
+import pytest
+
+from Solitaire.server import END_OF_REPLY, Client, GameServer
+from Solitaire.solitaire import Solitaire
+
+
+@pytest.fixture
+def server_path(tmp_path, request):
+    """Runs a GameServer on a Unix socket in another thread, yields the
+    socket path.  Sessions are saved to disk if the test is parametrized
+    with indirect=True and a true value
+    """
+    path = str(tmp_path / 'server.sock')
+    directory = (str(tmp_path / 'sessions')
+                 if getattr(request, 'param', False) else None)
+    loop = asyncio.new_event_loop()
+    task = loop.create_task(GameServer(directory).serve(path=path))
+    thread = threading.Thread(target=loop.run_forever)
+    thread.start()
+    while not os.path.exists(path):
+        time.sleep(0.01)
+    yield path
+
+    async def stop():
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    asyncio.run_coroutine_threadsafe(stop(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+
+def test_lookahead_does_not_hold_up_other_connections(server_path):
+    """Tests that a connection gets its reply while another one looks
+    ahead
+    """
+    with Client(path=server_path) as thinker, \
+            Client(path=server_path) as player:
+        thinking = threading.Thread(target=thinker.command, args=('a 1',))
+        thinking.start()
+        time.sleep(0.2)
+        began = time.time()
+        player.command('1')
+        waited = time.time() - began
+        thinking.join()
+    assert waited < 0.5
+
+
+def test_deal_move_and_undo(server_path):
+    """Tests the replies to a deal, a move and an undo against the same
+    game played locally
+    """
+    with Client(path=server_path) as client:
+        deal_number = int(re.match(r'Session \d+, deal (\d+)\n\n',
+                                   client.greeting).group(1))
+        game = Solitaire(deal_number)
+        assert client.greeting.endswith('\n\n{0}'.format(game))
+        assert client.command('4') == 'Nothing to undo'
+        moves = []
+        while not moves:
+            game.deal()
+            assert client.command('1') == str(game)
+            moves = [(source, destination)
+                     for source, destination in game.legal_moves()
+                     if 0 < destination < 8]
+        source, destination = moves[0]
+        name = str(source) if source < 8 else 'h{0}'.format(source - 7)
+        before = str(game)
+        assert game.make_move((source, destination))
+        assert client.command('2 {0} {1}'.format(name, destination)) == \
+            str(game)
+        assert client.command('4') == before
+        assert client.command('2 0 0') == 'Usage: 2 SOURCE DESTINATION'
+
+
+def test_replies_end_with_a_dot_line(server_path):
+    """Tests that every reply, one line or many, ends with END_OF_REPLY
+    on a line of its own
+    """
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    connection.connect(server_path)
+    stream = connection.makefile('rwb')
+    try:
+        for line in (None, '1', '4', 'nonsense'):
+            if line is not None:
+                stream.write(line.encode('utf-8') + b'\n')
+                stream.flush()
+            reply = []
+            while not reply or reply[-1] != END_OF_REPLY + '\n':
+                text = stream.readline().decode('utf-8')
+                assert text, 'connection closed inside a reply'
+                reply.append(text)
+            assert len(reply) > 1
+        stream.write(b'0\n')
+        stream.flush()
+        assert stream.read() == 'Bye\n{0}\n'.format(END_OF_REPLY).encode()
+    finally:
+        stream.close()
+        connection.close()
+
+
+@pytest.mark.parametrize('server_path', [False, True], indirect=True,
+                         ids=['in memory', 'saved'])
+def test_resume_the_session_in_play(server_path):
+    """Tests that resuming the session a connection is playing, played or
+    not, replies with its board and keeps the session
+    """
+    with Client(path=server_path) as client:
+        session_id = re.match(r'Session (\d+),', client.greeting).group(1)
+        heading = client.greeting.split('\n\n')[0]
+        assert client.command('resume ' + session_id) == client.greeting
+        board = client.command('1')
+        assert client.command('resume ' + session_id) == \
+            '{0}\n\n{1}'.format(heading, board)
+        assert client.command('4') != 'Nothing to undo'
+        assert client.command('resume 999') == 'No session 999'
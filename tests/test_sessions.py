@@ -0,0 +1,103 @@
+"""Tests of the session store"""
+import asyncio
+import os
+import random
+
+from Solitaire.server import Session
+from Solitaire.sessions import SessionStore
+
+
+def played_session(session_id):
+    """Returns a Session of deal session_id with a few random moves, one of
+    them undone
+    """
+    session = Session(session_id, session_id)
+    rng = random.Random(session_id)
+    for _ in range(20):
+        session.game.make_move(rng.choice(session.game.legal_moves()))
+    session.game.undo()
+    return session
+
+
+def test_least_recently_used_are_saved(tmp_path):
+    """Tests that sessions beyond max_sessions go to disk least recently
+    used first, and come back unchanged
+    """
+    directory = str(tmp_path)
+    store = SessionStore(Session, directory, max_sessions=2)
+    saved = {}
+    for session_id in (1, 2, 3):
+        session = played_session(session_id)
+        saved[session_id] = session.save()
+        store.add(session)
+    assert len(store) == 3 and store.in_memory() == 2
+    assert store.saves == 1
+    assert os.listdir(directory) == ['1.session']
+    assert 1 in store and store.peek(1) is None
+    assert store.loads == 0
+    assert store.get(1).save() == saved[1]
+    assert store.loads == 1
+    # Getting session 1 made session 2 the least recently used
+    assert store.peek(2) is None
+    assert store.peek(3) is not None
+    assert os.listdir(directory) == ['2.session']
+
+
+def test_spill_idle_and_resume(tmp_path):
+    """Tests that spill_idle() saves the idle sessions and that another
+    store on the same directory finds them
+    """
+    directory = str(tmp_path)
+    store = SessionStore(Session, directory)
+    saved = {}
+    for session_id in (1, 2, 3):
+        session = played_session(session_id)
+        saved[session_id] = session.save()
+        store.add(session)
+    assert store.spill_idle(60) == 0
+    assert store.spill_idle(0) == 3
+    assert store.in_memory() == 0
+    store = SessionStore(Session, directory)
+    assert len(store) == 3 and store.in_memory() == 0
+    assert store.next_id() == 4
+    for session_id in (3, 1, 2):
+        session = store.get(session_id)
+        assert session.session_id == session_id
+        assert session.save() == saved[session_id]
+    store.remove(2)
+    assert 2 not in store
+    assert not os.listdir(directory)
+
+
+def test_memory_only_store_keeps_everything():
+    """Tests that a store without a directory never saves"""
+    store = SessionStore(Session, max_sessions=1)
+    for session_id in (1, 2, 3):
+        store.add(Session(session_id, session_id))
+    assert store.in_memory() == 3
+    assert store.spill_idle(0) == 0
+    assert store.saves == 0
+
+
+def test_sessions_in_use_stay_in_memory(tmp_path):
+    """Tests that a session whose lock is held is not saved, the next least
+    recently used one is saved instead, and that it can be saved once its
+    lock is released
+    """
+    store = SessionStore(Session, str(tmp_path), max_sessions=2)
+    held = played_session(1)
+    store.add(held)
+
+    async def play_while_held():
+        async with held.lock:
+            store.add(played_session(2))
+            store.add(played_session(3))
+            assert store.peek(1) is held
+            assert store.peek(2) is None
+            assert store.spill_idle(0) == 1
+            assert store.peek(1) is held
+    asyncio.run(play_while_held())
+    assert store.in_memory() == 1
+    assert store.spill_idle(0) == 1
+    assert store.peek(1) is None
+    assert store.get(1).save() == held.save()
@@ -0,0 +1,216 @@
+"""Tests of the Solitaire game"""
+import random
+
+from Solitaire.solitaire import BATCH, Solitaire
+
+
+def play_random(game, count, seed=0):
+    """Makes count random legal moves, fewer if the game runs out of
+    moves.  Returns the snapshot() before every move and after the last
+    """
+    rng = random.Random(seed)
+    states = [game.snapshot()]
+    for _ in range(count):
+        moves = game.legal_moves()
+        if not moves:
+            break
+        assert game.make_move(rng.choice(moves))
+        states.append(game.snapshot())
+    return states
+
+
+def layout(piles):
+    """Returns a snapshot() of piles, a list of 12 (card indexes, flip) in
+    all_piles order
+    """
+    header = []
+    cards = []
+    for pile, flip in piles:
+        header.extend((len(pile), flip))
+        cards.extend(pile)
+    return bytes(bytearray(header + cards))
+
+
+def test_undo_and_redo_walk_the_journal():
+    """Tests that undo() takes random moves back to the deal, position by
+    position, and redo() plays them again
+    """
+    for deal_number in range(5):
+        game = Solitaire(deal_number)
+        states = play_random(game, 200, deal_number)
+        assert len(game.undo_stack) == len(states) - 1
+        for state in reversed(states[:-1]):
+            assert game.undo()
+            assert game.snapshot() == state
+        assert not game.undo_stack
+        assert not game.undo()
+        for state in states[1:]:
+            assert game.redo()
+            assert game.snapshot() == state
+        assert not game.redo_stack
+        assert not game.redo()
+
+
+def test_new_move_clears_redo():
+    """Tests that a move made after undo() forgets the undone moves"""
+    game = Solitaire(3)
+    play_random(game, 10)
+    game.undo()
+    game.undo()
+    assert len(game.redo_stack) == 2
+    game.deal()
+    assert not game.redo_stack
+
+
+def test_pile_onto_itself_is_refused():
+    """Tests that no pile can be moved onto itself"""
+    game = Solitaire(1)
+    state = game.snapshot()
+    for pile in game.all_piles:
+        assert not game.move_pile(pile, pile)
+    assert game.snapshot() == state
+    assert not game.undo_stack
+
+
+def test_foundation_source_gives_its_top_card():
+    """Tests that a move from a foundation pile takes its top card only,
+    and undo() puts it back
+    """
+    # Ace to 3 of spades home, the 4 of hearts on tableau pile 1
+    spades = [0, 1, 2]
+    rest = [card for card in range(52) if card not in spades + [16]]
+    piles = [(rest, len(rest)), ([16], 0)] + [([], 0)] * 6 + \
+        [(spades, 0)] + [([], 0)] * 3
+    game = Solitaire.from_snapshot(layout(piles))
+    tableau, home = game.all_piles[1], game.all_piles[8]
+    assert game.move_pile(home, tableau)
+    assert [card.index for card in tableau] == [16, 2]
+    assert [card.index for card in home] == [0, 1]
+    assert game.undo_stack[-1] == (8, 1, 1, False)
+    # Foundation cards only go on tableau cards
+    assert not game.move_pile(home, game.all_piles[2])
+    assert game.undo()
+    assert game.snapshot() == layout(piles)
+
+
+def test_incremental_hash_matches_rehash():
+    """Tests that state_hash, kept up to date move by move, equals the
+    hash computed from scratch through moves, deals, recycles, undo, redo
+    and cascade_home()
+    """
+    recycled = False
+    for deal_number in range(30):
+        game = Solitaire(deal_number)
+        rng = random.Random(deal_number)
+        for _ in range(300):
+            action = rng.random()
+            if action < 0.1:
+                game.undo()
+            elif action < 0.15:
+                game.redo()
+            elif action < 0.2:
+                game.cascade_home()
+            else:
+                moves = game.legal_moves()
+                if moves:
+                    game.make_move(rng.choice(moves))
+            recycled = recycled or game.recycles > 0
+            expected = Solitaire.from_snapshot(game.snapshot()).state_hash
+            assert game.state_hash == expected
+    assert recycled
+
+
+def test_load_restores_save():
+    """Tests that load(save()) keeps the deal, the position and both
+    journals, so undo() and redo() carry on
+    """
+    game = Solitaire(7)
+    play_random(game, 120, 7)
+    for _ in range(5):
+        game.undo()
+    loaded = Solitaire.load(game.save())
+    assert loaded.deal_number == 7
+    assert loaded.snapshot() == game.snapshot()
+    assert loaded.undo_stack == game.undo_stack
+    assert loaded.redo_stack == game.redo_stack
+    assert loaded.recycles == game.recycles
+    assert loaded.state_hash == game.state_hash
+    while game.redo():
+        assert loaded.redo()
+        assert loaded.snapshot() == game.snapshot()
+    while game.undo():
+        assert loaded.undo()
+        assert loaded.snapshot() == game.snapshot()
+    assert not loaded.undo()
+
+
+def cascade_layout():
+    """Returns a snapshot() with the ace of spades home, the 2 of hearts
+    under the 2 of spades on tableau pile 1, the ace of hearts on pile 2,
+    the 3 of hearts on pile 3 and the 3 of spades on the waste pile
+    """
+    placed = [0, 14, 1, 13, 15, 2]
+    rest = [card for card in range(52) if card not in placed]
+    return layout([(rest + [2], len(rest)), ([14, 1], 0), ([13], 0),
+                   ([15], 0)] + [([], 0)] * 4 + [([0], 0)] +
+                  [([], 0)] * 3)
+
+
+def test_cascade_home_order():
+    """Tests that cascade_home() moves the cards repeated move_home() calls
+    would, in the same order, as one undoable move
+    """
+    game = Solitaire.from_snapshot(cascade_layout())
+    moves = game.cascade_home()
+    assert moves == [(1, 8), (2, 9), (1, 9), (3, 9), (0, 8)]
+    assert [len(home) for home in game.homes] == [3, 3, 0, 0]
+    assert game.undo_stack[-1] == (BATCH, BATCH, 5, False)
+    assert len(game.undo_stack) == 6
+    after = game.snapshot()
+    assert game.undo()
+    assert game.snapshot() == cascade_layout()
+    assert not game.undo_stack
+    assert len(game.redo_stack) == 6
+    assert game.redo()
+    assert game.snapshot() == after
+    assert game.undo_stack[-1] == (BATCH, BATCH, 5, False)
+    assert not game.redo_stack
+    assert game.cascade_home() == []
+
+
+def test_cascade_home_safe_only():
+    """Tests that safe_only leaves cards a tableau card may still need to
+    be put on: the 3 of hearts for the black twos, the 3 of spades for the
+    red ones
+    """
+    game = Solitaire.from_snapshot(cascade_layout())
+    assert game.cascade_home(safe_only=True) == [(1, 8), (2, 9), (1, 9)]
+    game = Solitaire.from_snapshot(cascade_layout())
+    game.move_home(game.piles[0])
+    game.move_home(game.piles[1])
+    # A single move is journaled like move_home()
+    assert game.cascade_home(safe_only=True) == [(1, 9)]
+    assert game.undo_stack[-1] == (1, 9, 1, False)
+    assert game.undo()
+    assert game.undo_stack[-1] == (2, 9, 1, False)
+
+
+def test_cascade_home_matches_move_home():
+    """Tests that cascade_home() ends where move_home() called on the first
+    tableau pile that can move, else the waste pile, ends
+    """
+    for deal_number in range(30):
+        game = Solitaire(deal_number)
+        play_random(game, 80, deal_number)
+        expected = Solitaire.from_snapshot(game.snapshot())
+        moves = []
+        moved = True
+        while moved:
+            moved = False
+            for number in list(range(1, 8)) + [0]:
+                if expected.move_home(expected.all_piles[number]):
+                    moves.append(expected.undo_stack[-1][:2])
+                    moved = True
+                    break
+        assert game.cascade_home() == moves
+        assert game.snapshot() == expected.snapshot()
@@ -0,0 +1,50 @@
+"""Tests of the exact solver"""
+from Solitaire.automove import AutoMove
+from Solitaire.solitaire import Solitaire
+from Solitaire.solver import SOLVED, UNKNOWN, UNSOLVABLE, solve
+
+
+def replay(game, moves):
+    """Makes moves on game.  Returns True if every move was legal and the
+    game is won
+    """
+    return all(game.make_move(move) for move in moves) and game.check_win()
+
+
+def test_solution_wins():
+    """Tests that the moves of a solved deal win it, and that the solver
+    leaves the game alone
+    """
+    for deal_number in (1, 3):
+        game = Solitaire(deal_number)
+        state = game.snapshot()
+        result = solve(game)
+        assert result.status == SOLVED
+        assert game.snapshot() == state
+        assert replay(game, result.moves)
+
+
+def test_unsolvable_deal():
+    """Tests that deals that can not be won are proved so, and that a
+    budget too small to prove it gives no answer
+    """
+    for deal_number in (0, 25):
+        assert solve(Solitaire(deal_number)).status == UNSOLVABLE
+    result = solve(Solitaire(0), max_nodes=100)
+    assert result.status == UNKNOWN
+    assert result.moves is None
+
+
+def test_honest_solves_near_win():
+    """Tests that honest mode wins a position a few moves from a win,
+    through the game's own solve()
+    """
+    game = Solitaire(33)
+    auto_move = AutoMove()
+    while not game.check_win():
+        assert auto_move(game)
+    for _ in range(10):
+        game.undo()
+    result = game.solve(thoughtful=False)
+    assert result.status == SOLVED
+    assert replay(game, result.moves)
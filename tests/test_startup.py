@@ -0,0 +1,70 @@
+"""Tests that the engine starts quickly with only the standard library, as
+every worker process of simulate, verify and estimate imports it
+"""
+import os
+import subprocess
+import sys
+from timeit import default_timer as timer
+
+# Importing the engine may take at most this many times as long as
+# starting a bare interpreter, both timed in the same run so a slow or busy
+# machine slows both down
+COLD_START_BUDGET = 10
+ENGINE = ('Solitaire.automove', 'Solitaire.estimate', 'Solitaire.record',
+          'Solitaire.simulate', 'Solitaire.solitaire', 'Solitaire.solver',
+          'Solitaire.verify')
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run(code):
+    """Runs code in a new interpreter and returns its output"""
+    return subprocess.check_output([sys.executable, '-c', code],
+                                   cwd=ROOT).decode('utf-8')
+
+
+def test_engine_imports_only_stdlib():
+    """Tests that importing the engine loads no third party module"""
+    # __main__ and multiprocessing's __mp_main__ are not imports
+    listing = ('import sys\n'
+               'print(" ".join(set(name.split(".")[0] '
+               'for name in sys.modules if name[:2] != "__")))\n')
+    # Site hooks may load modules before any code runs
+    started = set(run(listing).split())
+    loaded = set(run(''.join('import {0}\n'.format(name)
+                             for name in ENGINE) + listing).split())
+    for name in ('colorama', 'nose', 'numpy'):
+        assert name not in loaded
+    if hasattr(sys, 'stdlib_module_names'):
+        assert loaded - started - set(sys.stdlib_module_names) == {
+            'Solitaire'}
+
+
+def test_render_waits_for_first_frame():
+    """Tests that colorama is only set up when a frame is drawn"""
+    code = ('import sys\n'
+            'from Solitaire.render import Renderer\n'
+            'from Solitaire.solitaire import Solitaire\n'
+            'game = Solitaire(1)\n'
+            'str(game)\n'
+            'print(__import__("Solitaire.render").render._terminal_ready)\n'
+            'Renderer().frame(game)\n'
+            'print(__import__("Solitaire.render").render._terminal_ready)\n')
+    assert run(code).split() == ['False', 'True']
+
+
+def test_cold_start_budget():
+    """Tests that importing the engine in a new interpreter takes at most
+    COLD_START_BUDGET times as long as starting the interpreter, the best
+    of 5 starts of each
+    """
+    code = ''.join('import {0}\n'.format(name) for name in ENGINE)
+    best = {}
+    # Alternated, so a busy spell slows both down
+    for _ in range(5):
+        for source in ('pass', code):
+            began = timer()
+            run(source)
+            seconds = timer() - began
+            best[source] = min(best.get(source, seconds), seconds)
+    bare = best['pass']
+    assert best[code] - bare < COLD_START_BUDGET * bare
@@ -0,0 +1,75 @@
+"""Tests of the streaming game statistics in Solitaire.stats"""
+import csv
+import json
+import random
+
+from Solitaire.simulate import simulate
+from Solitaire.stats import METRICS, SUB_BINS, GameStats, Histogram
+
+
+def test_exact_quantiles_below_limit():
+    """Tests that quantiles of values below the limit are exact"""
+    values = list(range(1, 101))
+    histogram = Histogram(limit=128)
+    for value in values:
+        histogram.add(value)
+    assert histogram.quantile(0.5) == 50
+    assert histogram.quantile(0.9) == 90
+    assert histogram.quantile(1.0) == 100
+    assert histogram.mean() == 50.5
+    assert (histogram.low, histogram.high) == (1, 100)
+
+
+def test_log_bins_above_limit():
+    """Tests that every value above the limit falls in a bin that holds it
+    and is at most 1 / SUB_BINS of the value wide
+    """
+    histogram = Histogram(limit=64)
+    for value in list(range(64, 5000)) + [10 ** 9, 2 ** 40 - 1]:
+        counted = Histogram(limit=64)
+        counted.add(value)
+        first, last = counted.bin_bounds(list(counted.bins)[0])
+        assert first <= value <= last
+        assert last - first + 1 <= max(1, value // SUB_BINS)
+        histogram.add(value)
+    assert len(histogram.bins) < 120
+
+
+def test_merge_matches_one_histogram():
+    """Tests that merged histograms equal one that saw every value"""
+    rng = random.Random(1)
+    values = [rng.randrange(5000) for _ in range(2000)]
+    whole = Histogram()
+    parts = [Histogram(), Histogram(), Histogram()]
+    for number, value in enumerate(values):
+        whole.add(value)
+        parts[number % 3].add(value)
+    merged = Histogram()
+    for part in parts:
+        merged.merge(part)
+    assert merged.summary() == whole.summary()
+
+
+def test_simulate_stats(tmp_path):
+    """Tests that simulate() summarises every game and saves CSV and JSON
+    that agree with its counts
+    """
+    json_path = str(tmp_path / 'stats.json')
+    result = simulate(40, workers=1, chunk_size=7, stats_path=json_path)
+    stats = result['stats']
+    assert isinstance(stats, GameStats)
+    assert stats.games == 40
+    assert sum(stats.endings.values()) == 40
+    assert stats.histograms['passes'].count == 40
+    assert stats.histograms['moves_to_win'].count == result['wins']
+    assert stats.histograms['stuck_depth'].count == 40 - result['wins']
+    with open(json_path) as stats_file:
+        saved = json.load(stats_file)
+    assert saved['games'] == 40
+    assert sorted(saved['metrics']) == sorted(METRICS)
+    csv_path = str(tmp_path / 'stats.csv')
+    stats.save(csv_path)
+    with open(csv_path) as stats_file:
+        rows = dict((row[0], row[1:]) for row in csv.reader(stats_file))
+    assert rows['games'] == ['40']
+    assert rows['passes'][0] == '40'
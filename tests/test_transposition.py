@@ -0,0 +1,146 @@
+"""Tests of the bounded transposition table and solver checkpoints"""
+import io
+import os
+
+import pytest
+
+from Solitaire.automove import AutoMove
+from Solitaire.solitaire import Solitaire
+from Solitaire.solver import SOLVED, UNKNOWN, UNSOLVABLE, resume, solve
+from Solitaire.transposition import BUCKET, TranspositionTable
+
+
+def bucket_keys(table, count):
+    """Returns count keys that all fall in the first bucket of table"""
+    return [1 + number * (table.size // BUCKET) for number in range(count)]
+
+
+def test_full_bucket_evicts_the_oldest_entry():
+    """Tests that a full bucket forgets its oldest entry, and that the
+    counters add up
+    """
+    table = TranspositionTable(64)
+    keys = bucket_keys(table, BUCKET + 1)
+    for value, key in enumerate(keys):
+        table[key] = value
+    assert keys[0] not in table
+    assert [table.get(key) for key in keys[1:]] == list(range(1, BUCKET + 1))
+    table[keys[1]] = 99
+    assert table[keys[1]] == 99
+    stats = table.stats()
+    assert stats['entries'] == BUCKET
+    assert stats['stores'] == BUCKET + 1
+    assert stats['evictions'] == 1
+    assert stats['hits'] == BUCKET + 1
+    assert stats['misses'] == 1
+
+
+def test_evicted_entries_go_to_the_overflow_file(tmp_path):
+    """Tests that a mapped overflow table catches evicted entries and
+    keeps them when it is opened again
+    """
+    path = str(tmp_path / 'overflow.tt')
+    table = TranspositionTable(8, overflow=TranspositionTable(1024, path))
+    keys = bucket_keys(table, 3 * BUCKET)
+    for key in keys:
+        table[key] = key & 0xffff
+    assert all(table.get(key) == key & 0xffff for key in keys)
+    assert table.overflow_hits == 2 * BUCKET
+    table.close()
+    reopened = TranspositionTable(1024, path)
+    assert len(reopened) == 2 * BUCKET
+    assert reopened.get(keys[0]) == keys[0] & 0xffff
+    reopened.close()
+
+
+def test_undump_keeps_the_entries_of_the_file(tmp_path):
+    """Tests that a mapped table undumped after its file was written to
+    counts the entries in the file, not the ones dumped
+    """
+    path = str(tmp_path / 'table.tt')
+    table = TranspositionTable(64, path)
+    table[5] = 1
+    dumped = io.BytesIO()
+    table.dump(dumped)
+    table[6] = 2
+    table.close()
+    dumped.seek(0)
+    loaded = TranspositionTable.undump(dumped, path)
+    assert len(loaded) == 2
+    assert loaded.get(6) == 2
+    loaded.close()
+
+
+def test_overflow_needs_a_table_size(tmp_path):
+    """Tests that an overflow file without a table_size is refused"""
+    with pytest.raises(ValueError):
+        solve(Solitaire(1), overflow=str(tmp_path / 'overflow.tt'))
+
+
+def test_dump_and_undump():
+    """Tests that an in memory table and its counters survive dump()"""
+    table = TranspositionTable(256)
+    for key in range(0, 5000, 7):
+        table[key] = key % 1000
+    table.get(12345)
+    dumped = io.BytesIO()
+    table.dump(dumped)
+    dumped.seek(0)
+    loaded = TranspositionTable.undump(dumped)
+    assert loaded.stats() == table.stats()
+    assert all(loaded.get(key) == table.get(key)
+               for key in range(0, 5000, 7))
+
+
+def test_bounded_solve_agrees():
+    """Tests that a solve with a small table finds the same answers"""
+    for deal_number, status in ((1, SOLVED), (3, SOLVED), (25, UNSOLVABLE)):
+        result = solve(Solitaire(deal_number), table_size=1024)
+        assert result.status == status
+        assert result.table['size'] == 1024
+        if result.moves:
+            game = Solitaire(deal_number)
+            for move in result.moves:
+                assert game.make_move(move)
+            assert game.check_win()
+
+
+def test_bounded_honest_solve_does_not_go_round():
+    """Tests that an honest solve with a table too small to keep its
+    moves finds them again without going round in circles
+    """
+    game = Solitaire(33)
+    auto_move = AutoMove()
+    while not game.check_win():
+        assert auto_move(game)
+    for _ in range(25):
+        game.undo()
+    whole = solve(game, thoughtful=False)
+    result = solve(game, thoughtful=False, max_nodes=20000, table_size=8)
+    assert result.status == whole.status == SOLVED
+    assert result.table['evictions'] > 0
+    for move in result.moves:
+        assert game.make_move(move)
+    assert game.check_win()
+
+
+def test_resume_from_checkpoint(tmp_path):
+    """Tests that a solve stopped by its budget carries on from its
+    checkpoint to the same answer, with an overflow file
+    """
+    path = str(tmp_path / 'solve.checkpoint')
+    whole = solve(Solitaire(7))
+    result = solve(Solitaire(7), max_nodes=3000, table_size=4096,
+                   overflow=str(tmp_path / 'overflow.tt'), checkpoint=path)
+    assert result.status == UNKNOWN
+    assert os.path.exists(path)
+    runs = 1
+    while result.status == UNKNOWN:
+        result = resume(path, max_nodes=3000)
+        runs += 1
+    assert runs > 2
+    assert result.status == whole.status == SOLVED
+    game = Solitaire(7)
+    for move in result.moves:
+        assert game.make_move(move)
+    assert game.check_win()
@@ -0,0 +1,83 @@
+"""Tests of replaying recorded games and the checkpoint index"""
+import random
+
+from Solitaire.automove import AutoMove
+from Solitaire.record import (REDO, UNDO, RecordReader, RecordWriter,
+                              decode_move, encode_move)
+from Solitaire.solitaire import Solitaire
+from Solitaire.verify import CheckpointIndex, verify
+
+
+def write_corpus(path):
+    """Records five games of random moves, undos and redos, and a win"""
+    with RecordWriter(path) as writer:
+        for deal_number in range(5):
+            game = Solitaire(deal_number)
+            recorder = writer.record(game)
+            rng = random.Random(deal_number)
+            for _ in range(80):
+                if rng.random() < 0.15 and game.undo():
+                    if rng.random() < 0.5:
+                        game.redo()
+                else:
+                    game.make_move(rng.choice(game.legal_moves()))
+            recorder.finish()
+        game = Solitaire(33)
+        writer.record(game)
+        auto_move = AutoMove()
+        while not game.check_win():
+            auto_move(game)
+
+
+def play_byte(game, byte):
+    """Plays one record byte on game"""
+    if byte == UNDO:
+        assert game.undo()
+    elif byte == REDO:
+        assert game.redo()
+    else:
+        assert game.make_move(decode_move(byte))
+
+
+def test_verify_and_rebuild(tmp_path):
+    """Tests that recorded games replay without failures, and that the
+    index rebuilds every move of every game, journals included
+    """
+    path = str(tmp_path / 'games.rec')
+    index_path = str(tmp_path / 'games.idx')
+    write_corpus(path)
+    result = verify(path, workers=1, checkpoint_every=8,
+                    index_path=index_path, chunk_size=2)
+    assert result['games'] == 6
+    assert result['wins'] == 1
+    assert result['failures'] == []
+    with RecordReader(path) as reader, CheckpointIndex(index_path) as index:
+        assert len(index)
+        for record in reader:
+            game = Solitaire(record.deal_number)
+            for move in range(len(record.moves) + 1):
+                rebuilt = index.game_at(record, move)
+                assert rebuilt.snapshot() == game.snapshot()
+                assert rebuilt.undo_stack == game.undo_stack
+                assert rebuilt.redo_stack == game.redo_stack
+                if move < len(record.moves):
+                    play_byte(game, bytearray(record.moves)[move])
+
+
+def test_corrupted_byte_is_reported(tmp_path):
+    """Tests that a move byte that can not be played is reported with its
+    game
+    """
+    path = tmp_path / 'games.rec'
+    write_corpus(str(path))
+    with RecordReader(str(path)) as reader:
+        record = list(reader)[3]
+    data = bytearray(path.read_bytes())
+    # Deal number, then the move bytes: a move between foundation piles
+    data[record.offset + 8 + 10] = encode_move(9, 10)
+    path.write_bytes(bytes(data))
+    result = verify(str(path), workers=1)
+    assert result['games'] == 6
+    assert [(offset, deal_number) for offset, deal_number, _
+            in result['failures']] == [(record.offset, record.deal_number)]
+    assert result['failures'][0][2].startswith('move 10:')